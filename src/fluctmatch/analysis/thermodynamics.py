@@ -31,6 +31,7 @@ from os import path
 import numpy as np
 import pandas as pd
 from fluctmatch.fluctmatch import charmmfluctmatch
+from fluctmatch.fluctmatch import windows
 
 
 def calculate_thermo(subdir, **kwargs):
@@ -38,6 +39,10 @@ def calculate_thermo(subdir, **kwargs):
                                             "fluctmatch.xplor.psf"))
     trajectory = path.join(subdir, kwargs.pop("trajectory", "cg.dcd"))
     window = path.basename(subdir)
+    manifest = kwargs.pop("manifest", dict())
+    if window in manifest:
+        trajectory = windows.cg_trajectory(manifest[window])
+        kwargs["window"] = manifest[window]
 
     cfm = charmmfluctmatch.CharmmFluctMatch(
         topology, trajectory, outdir=subdir, **kwargs)
@@ -79,10 +84,16 @@ def create_thermo_tables(datadir, outdir, **kwargs):
         Path for CHARMM executable
     charmm_version : int, optional
         CHARMM version
+    thermo : str, optional
+        Calculate the thermodynamic properties with "charmm" or "python"
+
+    The windows of a manifest in `datadir` read their frames of the
+    coarse-grain trajectory of the manifest.
     """
     subdirs = (_ for _ in glob.iglob(path.join(datadir, "*")) if path.isdir(_))
 
-    calc_thermo = functools.partial(calculate_thermo, **kwargs)
+    calc_thermo = functools.partial(
+        calculate_thermo, manifest=windows.find_manifest(datadir), **kwargs)
     pool = mp.Pool(maxtasksperchild=2)
     results = pool.map_async(calc_thermo, subdirs)
     pool.close()
@@ -0,0 +1,165 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import logging
+import logging.config
+import os
+from os import path
+
+import click
+from fluctmatch.commands.options import (
+    engine_options,
+    split_options,
+)
+from fluctmatch.fluctmatch import campaign
+
+
+@click.command(
+    "campaign", short_help="Run fluctuation matching for every window.")
+@click.option(
+    "--data",
+    "datadir",
+    metavar="DIR",
+    default=path.join(os.getcwd(), "data"),
+    show_default=True,
+    type=click.Path(exists=True, file_okay=False, resolve_path=True),
+    help="Directory with a subdirectory for each window",
+)
+@click.option(
+    "-s",
+    "topology",
+    metavar="FILE",
+    default="fluctmatch.xplor.psf",
+    show_default=True,
+    type=click.STRING,
+    help="Topology file within each window",
+)
+@click.option(
+    "-f",
+    "trajectory",
+    metavar="FILE",
+    default="cg.dcd",
+    show_default=True,
+    type=click.STRING,
+    help="Trajectory file within each window",
+)
+@click.option(
+    "-l",
+    "--logfile",
+    metavar="LOG",
+    show_default=True,
+    default=path.join(os.getcwd(), "campaign.log"),
+    type=click.Path(exists=False, file_okay=True, resolve_path=True),
+    help="Log file",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    "n_workers",
+    metavar="NJOBS",
+    type=click.IntRange(1, None, clamp=True),
+    help="Maximum number of windows run simultaneously [default: CPUs]",
+)
+@click.option(
+    "--memory",
+    metavar="MB",
+    type=click.FLOAT,
+    help="Memory needed per window [default: estimated from topology]",
+)
+@engine_options
+@click.option(
+    "--warm-start",
+    "warm_start",
+    is_flag=True,
+    help="Run windows in time order, starting from the preceding window",
+)
+@click.option(
+    "--restart",
+    is_flag=True,
+    help="Restart every window from its files, including windows that a "
+    "previous campaign did not start",
+)
+def cli(
+        datadir,
+        topology,
+        trajectory,
+        logfile,
+        n_workers,
+        memory,
+        warm_start,
+        restart,
+        **options
+):
+    logging.config.dictConfig({
+        "version": 1,
+        "disable_existing_loggers": False,  # this fixes the problem
+        "formatters": {
+            "standard": {
+                "class": "logging.Formatter",
+                "format": "%(name)-12s %(levelname)-8s %(message)s",
+            },
+            "detailed": {
+                "class": "logging.Formatter",
+                "format":
+                "%(asctime)s %(name)-15s %(levelname)-8s %(message)s",
+                "datefmt": "%m-%d-%y %H:%M",
+            },
+        },
+        "handlers": {
+            "console": {
+                "class": "logging.StreamHandler",
+                "level": "INFO",
+                "formatter": "standard",
+            },
+            "file": {
+                "class": "logging.FileHandler",
+                "filename": logfile,
+                "level": "INFO",
+                "mode": "w",
+                "formatter": "detailed",
+            }
+        },
+        "root": {
+            "level": "INFO",
+            "handlers": ["console", "file"]
+        },
+    })
+    logger = logging.getLogger(__name__)
+
+    run, kwargs = split_options(options)
+    fm_campaign = campaign.Campaign(
+        datadir,
+        topology=topology,
+        trajectory=trajectory,
+        engine=run["engine"],
+        n_workers=n_workers,
+        memory=memory,
+        warm_start=warm_start,
+        restart=restart,
+        **kwargs)
+
+    logger.info("Running fluctuation matching for the windows in {}".format(
+        datadir))
+    table = fm_campaign.run(
+        nma_exec=run["nma_exec"], tol=run["tol"], n_cycles=run["n_cycles"])
+    logger.info("Campaign status:\n{}".format(table.to_string()))
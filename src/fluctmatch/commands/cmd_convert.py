@@ -29,8 +29,17 @@ from os import path
 
 import click
 from fluctmatch import (_DESCRIBE, _MODELS)
+from fluctmatch.models.cache import TrajectoryCache
 from fluctmatch.models.core import modeller
-from fluctmatch.fluctmatch.utils import write_charmm_files
+from fluctmatch.fluctmatch.utils import (
+    write_charmm_files,
+    write_trajectory,
+    write_window_targets,
+)
+from fluctmatch.fluctmatch.windows import (
+    read_manifest,
+    write_manifest,
+)
 
 
 @click.command(
@@ -163,6 +172,45 @@ from fluctmatch.fluctmatch.utils import write_charmm_files
     is_flag=True,
     help="Convert the trajectory file",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    "n_workers",
+    metavar="NJOBS",
+    default=1,
+    show_default=True,
+    type=click.IntRange(1, None, clamp=True),
+    help="Number of processes that read the trajectory",
+)
+@click.option(
+    "--tmpdir",
+    metavar="DIR",
+    type=click.Path(exists=True, file_okay=False, resolve_path=True),
+    help="Directory of the temporary files of the processes",
+)
+@click.option(
+    "--cache",
+    "cache_dir",
+    metavar="DIR",
+    type=click.Path(exists=False, file_okay=False, resolve_path=True),
+    help="Cache the coarse-grain trajectory in this directory",
+)
+@click.option(
+    "--cache-size",
+    metavar="GB",
+    type=click.FloatRange(0, None, clamp=True),
+    default=10.0,
+    show_default=True,
+    help="Maximum size of the trajectory cache",
+)
+@click.option(
+    "--manifest",
+    metavar="FILE",
+    type=click.Path(exists=True, dir_okay=False, resolve_path=True),
+    help="Write the files of each window of a manifest into its "
+    "subdirectory next to the manifest, and the coarse-grain trajectory "
+    "from which the windows read their frames next to the manifest",
+)
 @click.option(
     "--list",
     "model_list",
@@ -186,6 +234,11 @@ def cli(
         nonbonded,
         mass,
         write_traj,
+        n_workers,
+        tmpdir,
+        cache_dir,
+        cache_size,
+        manifest,
         model_list,
 ):
     logging.config.dictConfig({
@@ -230,7 +283,13 @@ def cli(
         return
 
     kwargs = dict()
+    if cache_dir is not None:
+        kwargs["cache"] = TrajectoryCache(cache_dir,
+                                          int(cache_size * 1024**3))
+    if "ENM" in (_.upper() for _ in model):
+        kwargs["n_workers"] = n_workers
     universe = modeller(topology, trajectory, com=com, model=model, **kwargs)
+    kwargs.pop("cache", None)
 
     kwargs.update(
         dict(
@@ -245,8 +304,34 @@ def cli(
             cheq=not cheq,
             nonbonded=not nonbonded,
             write_traj=write_traj,
+            n_workers=n_workers,
+            tmpdir=tmpdir,
         ))
     if mass:
         logger.info("Setting all bead masses to 1.0.")
         universe.atoms.mass = 1.0
-    write_charmm_files(universe, **kwargs)
+    if manifest is None:
+        write_charmm_files(universe, **kwargs)
+        return
+
+    # The windows read their frames of one coarse-grain trajectory with all
+    # frames of the atomistic trajectory.
+    data_dir = path.dirname(manifest)
+    windows = read_manifest(manifest)
+    traj_file = ".".join((prefix, "dcd"))
+    write_trajectory(universe, path.join(data_dir, traj_file), **kwargs)
+    write_manifest(
+        manifest,
+        [_._replace(cg_trajectory=traj_file) for _ in windows.values()])
+
+    # The coarse-grain files and the initial targets of every window. The
+    # targets of all windows are determined in one pass.
+    for name, window in iteritems(windows):
+        logger.info("Writing the files of window {}...".format(name))
+        window_kwargs = dict(kwargs)
+        window_kwargs.update(
+            outdir=path.join(data_dir, name), window=window, write_traj=False)
+        write_charmm_files(universe, **window_kwargs)
+    write_window_targets(
+        universe, [(_.name, _.start, _.stop) for _ in windows.values()],
+        data_dir, **kwargs)
@@ -20,6 +20,7 @@ from __future__ import (
     print_function,
     unicode_literals,
 )
+from future.builtins import dict
 
 import logging
 import logging.config
@@ -27,8 +28,19 @@ import os
 from os import path
 
 import click
-from MDAnalysis.lib.util import which
-from fluctmatch.fluctmatch import charmmfluctmatch
+from fluctmatch.commands.options import (
+    engine_options,
+    split_options,
+)
+from fluctmatch.fluctmatch import (
+    charmmfluctmatch,
+    numpyfluctmatch,
+)
+
+_ENGINES = dict(
+    CHARMM=charmmfluctmatch.CharmmFluctMatch,
+    NUMPY=numpyfluctmatch.NumpyFluctMatch,
+)
 
 
 @click.command("run_fm", short_help="Run fluctuation matching.")
@@ -68,80 +80,14 @@ from fluctmatch.fluctmatch import charmmfluctmatch
     type=click.Path(exists=False, file_okay=False, resolve_path=True),
     help="Directory",
 )
+@engine_options
 @click.option(
-    "-e",
-    "--exec",
-    "nma_exec",
+    "--warm-start",
+    "warm_start",
     metavar="FILE",
-    envvar="CHARMMEXEC",
-    default=which("charmm"),
-    show_default=True,
-    type=click.Path(exists=False, file_okay=True, resolve_path=True),
-    help="CHARMM executable file",
-)
-@click.option(
-    "-t",
-    "--temperature",
-    metavar="TEMP",
-    type=click.FLOAT,
-    default=300.0,
-    show_default=True,
-    help="Temperature of simulation",
-)
-@click.option(
-    "-n",
-    "--ncycles",
-    "n_cycles",
-    metavar="NCYCLES",
-    type=click.IntRange(1, None, clamp=True),
-    default=250,
-    show_default=True,
-    help="Number of simulation cycles",
-)
-@click.option(
-    "--tol",
-    metavar="TOL",
-    type=click.FLOAT,
-    default=1.e-4,
-    show_default=True,
-    help="Tolerance level between simulations",
-)
-@click.option(
-    "-p",
-    "--prefix",
-    metavar="PREFIX",
-    default="fluctmatch",
-    show_default=True,
-    type=click.STRING,
-    help="Prefix for filenames",
-)
-@click.option(
-    "-c",
-    "--charmm",
-    "charmm_version",
-    metavar="VERSION",
-    default=41,
-    show_default=True,
-    type=click.IntRange(27, None, clamp=True),
-    help="CHARMM version",
-)
-@click.option(
-    "--extended / --standard",
-    "extended",
-    default=True,
-    help="Output using the extended or standard columns",
-)
-@click.option(
-    "--nb / --no-nb",
-    "nonbonded",
-    default=True,
-    help="Include nonbonded section in CHARMM parameter file",
-)
-@click.option(
-    "--resid / --no-resid",
-    "resid",
-    default=True,
-    help="Include segment IDs in internal coordinate files",
+    type=click.Path(exists=True, file_okay=True, resolve_path=True),
+    help="Parameter file with initial force constants (e.g., a neighboring "
+    "window's dist.prm)",
 )
 @click.option(
     "--restart",
@@ -153,16 +99,9 @@ def cli(
         trajectory,
         logfile,
         outdir,
-        nma_exec,
-        temperature,
-        n_cycles,
-        tol,
-        prefix,
-        charmm_version,
-        extended,
-        resid,
-        nonbonded,
+        warm_start,
         restart,
+        **options
 ):
     logging.config.dictConfig({
         "version": 1,
@@ -200,19 +139,13 @@ def cli(
     })
     logger = logging.getLogger(__name__)
 
-    kwargs = dict(
-        prefix=prefix,
-        outdir=outdir,
-        temperature=temperature,
-        charmm_version=charmm_version,
-        extended=extended,
-        resid=resid,
-        nonbonded=nonbonded,
-    )
-    cfm = charmmfluctmatch.CharmmFluctMatch(topology, trajectory, **kwargs)
+    run, kwargs = split_options(options)
+    cfm = _ENGINES[run["engine"]](
+        topology, trajectory, outdir=outdir, **kwargs)
 
     logger.info("Initializing the parameters.")
-    cfm.initialize(nma_exec=nma_exec, restart=restart)
+    cfm.initialize(
+        nma_exec=run["nma_exec"], restart=restart, warm_start=warm_start)
     logger.info("Running fluctuation matching.")
-    cfm.run(nma_exec=nma_exec, tol=tol, n_cycles=n_cycles)
+    cfm.run(nma_exec=run["nma_exec"], tol=run["tol"], n_cycles=run["n_cycles"])
     logger.info("Fluctuation matching successfully completed.")
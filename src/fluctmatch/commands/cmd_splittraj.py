@@ -20,11 +20,7 @@ from __future__ import (
     print_function,
     unicode_literals,
 )
-from future.builtins import (
-    dict,
-    range,
-    zip,
-)
+from future.builtins import dict
 from future.utils import viewkeys
 
 import functools
@@ -35,8 +31,10 @@ import os
 from os import path
 
 import click
+from MDAnalysis.coordinates.core import reader
 from MDAnalysis.lib import util as mdutil
 from fluctmatch.fluctmatch import utils
+from fluctmatch.fluctmatch import windows
 
 _CONVERT = dict(
     GMX=utils.split_gmx,
@@ -152,8 +150,15 @@ _CONVERT = dict(
     type=click.IntRange(2, None, clamp=True),
     help="Size of each subtrajectory",
 )
+@click.option(
+    "--manifest",
+    is_flag=True,
+    help="Write a manifest of the frames of each window instead of the "
+    "subtrajectories; the times are converted to frames with the time step "
+    "of the trajectory",
+)
 def cli(program, toppar, topology, trajectory, data, index, outfile, logfile,
-        system, start, stop, window_size):
+        system, start, stop, window_size, manifest):
     logging.config.dictConfig({
         "version": 1,
         "disable_existing_loggers": False,  # this fixes the problem
@@ -190,6 +195,17 @@ def cli(program, toppar, topology, trajectory, data, index, outfile, logfile,
     })
     logger = logging.getLogger(__name__)
 
+    virtual = windows.half_overlapping(start, stop, window_size, trajectory)
+    if manifest:
+        with reader(trajectory) as traj:
+            virtual = windows.time_frames(virtual, traj.ts.time, traj.dt)
+        try:
+            os.makedirs(data)
+        except OSError:
+            pass
+        windows.write_manifest(path.join(data, windows.MANIFEST), virtual)
+        return
+
     if program == "GMX" and mdutil.which("gmx") is None:
         logger.error("Gromacs 5.0+ is required. "
                      "If installed, please ensure that it is in your path.")
@@ -201,12 +217,7 @@ def cli(program, toppar, topology, trajectory, data, index, outfile, logfile,
         raise OSError("CHARMM is required. If installed, "
                       "please ensure that it is in your path.")
 
-    half_size = window_size // 2
-    beg = start - half_size if start >= window_size else start
-    values = zip(
-        range(beg, stop + 1, half_size),
-        range(beg + window_size - 1, stop + 1, half_size))
-    values = [((y // half_size) - 1, x, y) for x, y in values]
+    values = [(int(_.name), _.start + 1, _.stop) for _ in virtual]
 
     func = functools.partial(
         _CONVERT[program],
@@ -115,8 +115,15 @@ from fluctmatch.analysis import thermodynamics
     type=click.IntRange(27, None, clamp=True),
     help="CHARMM version",
 )
+@click.option(
+    "--method",
+    type=click.Choice(["charmm", "python"]),
+    default="charmm",
+    show_default=True,
+    help="Calculate the quasi-harmonic thermodynamics with CHARMM or NumPy",
+)
 def cli(datadir, logfile, outdir, topology, trajectory, nma_exec, temperature,
-        charmm_version):
+        charmm_version, method):
     logging.config.dictConfig({
         "version": 1,
         "disable_existing_loggers": False,  # this fixes the problem
@@ -169,4 +176,5 @@ def cli(datadir, logfile, outdir, topology, trajectory, nma_exec, temperature,
         trajectory=trajectory,
         temperature=temperature,
         nma_exec=nma_exec,
-        charmm_version=charmm_version)
+        charmm_version=charmm_version,
+        thermo=method)
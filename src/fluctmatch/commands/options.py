@@ -0,0 +1,251 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+"""Command line options shared by the fluctuation matching commands."""
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.utils import viewkeys
+
+import click
+from MDAnalysis.lib.util import which
+from fluctmatch.fluctmatch import (
+    campaign,
+    updates,
+)
+
+# Options of the engines, which run_fm and campaign share
+_ENGINE_OPTIONS = [
+    click.option(
+        "-e",
+        "--exec",
+        "nma_exec",
+        metavar="FILE",
+        envvar="CHARMMEXEC",
+        default=which("charmm"),
+        show_default=True,
+        type=click.Path(exists=False, file_okay=True, resolve_path=True),
+        help="CHARMM executable file",
+    ),
+    click.option(
+        "--engine",
+        type=click.Choice(viewkeys(campaign.ENGINES)),
+        default="CHARMM",
+        show_default=True,
+        help="Program used for the normal mode analysis",
+    ),
+    click.option(
+        "--init",
+        "init",
+        type=click.Choice(["charmm", "python", "file"]),
+        help="Calculate the target bond averages and fluctuations with CHARMM "
+        "or in Python, or read existing init.average.ic and init.fluct.ic "
+        "files [default: charmm for CHARMM, python for NUMPY]",
+    ),
+    click.option(
+        "--target-tol",
+        "target_tol",
+        metavar="TOL",
+        type=click.FloatRange(0, None),
+        help="Stop reading the trajectory for the python targets once the "
+        "relative error of the bond fluctuations is below TOL",
+    ),
+    click.option(
+        "--solver",
+        type=click.Choice(["dense", "sparse"]),
+        default="dense",
+        show_default=True,
+        help="Hessian solver for the NUMPY engine; sparse bounds the memory "
+        "by the number of bonds but still solves for every atom",
+    ),
+    click.option(
+        "--update",
+        type=click.Choice(viewkeys(updates.UPDATES)),
+        default="linear",
+        show_default=True,
+        help="Force constant update strategy",
+    ),
+    click.option(
+        "--history",
+        metavar="NHIST",
+        type=click.IntRange(1, None, clamp=True),
+        help="Number of previous cycles used by the anderson/broyden update",
+    ),
+    click.option(
+        "--mixing",
+        metavar="BETA",
+        type=click.FLOAT,
+        help="Mixing parameter for the anderson update [default: 1.0]",
+    ),
+    click.option(
+        "--damping",
+        metavar="DAMP",
+        type=click.FLOAT,
+        help="Step damping for the broyden update [default: 0.8]",
+    ),
+    click.option(
+        "--radius",
+        metavar="RADIUS",
+        type=click.FLOAT,
+        help="Initial relative trust radius for the newton update "
+        "[default: 0.5]",
+    ),
+    click.option(
+        "--newton-cutoff",
+        "newton_cutoff",
+        metavar="CUTOFF",
+        type=click.FLOAT,
+        default=10.0,
+        show_default=True,
+        help="Distance between bond midpoints coupled by the newton update",
+    ),
+    click.option(
+        "-t",
+        "--temperature",
+        metavar="TEMP",
+        type=click.FLOAT,
+        default=300.0,
+        show_default=True,
+        help="Temperature of simulation",
+    ),
+    click.option(
+        "-n",
+        "--ncycles",
+        "n_cycles",
+        metavar="NCYCLES",
+        type=click.IntRange(1, None, clamp=True),
+        default=250,
+        show_default=True,
+        help="Number of simulation cycles",
+    ),
+    click.option(
+        "--tol",
+        metavar="TOL",
+        type=click.FLOAT,
+        default=1.e-4,
+        show_default=True,
+        help="Tolerance level between simulations",
+    ),
+    click.option(
+        "--minimize",
+        type=click.Choice(["average", "previous"]),
+        default="average",
+        show_default=True,
+        help="Start each minimization from the average structure or from the "
+        "minimized structure of the previous cycle until convergence",
+    ),
+    click.option(
+        "--checkpoint",
+        metavar="NCYCLES",
+        type=click.IntRange(0, None, clamp=True),
+        default=10,
+        show_default=True,
+        help="Number of cycles between checkpoints (0 to checkpoint only at "
+        "the end)",
+    ),
+    click.option(
+        "-p",
+        "--prefix",
+        metavar="PREFIX",
+        default="fluctmatch",
+        show_default=True,
+        type=click.STRING,
+        help="Prefix for filenames",
+    ),
+    click.option(
+        "-c",
+        "--charmm",
+        "charmm_version",
+        metavar="VERSION",
+        default=41,
+        show_default=True,
+        type=click.IntRange(27, None, clamp=True),
+        help="CHARMM version",
+    ),
+    click.option(
+        "--extended / --standard",
+        "extended",
+        default=True,
+        help="Output using the extended or standard columns",
+    ),
+    click.option(
+        "--nb / --no-nb",
+        "nonbonded",
+        default=True,
+        help="Include nonbonded section in CHARMM parameter file",
+    ),
+    click.option(
+        "--resid / --no-resid",
+        "resid",
+        default=True,
+        help="Include segment IDs in internal coordinate files",
+    ),
+    click.option(
+        "--session",
+        is_flag=True,
+        help="Keep one CHARMM process running for all cycles",
+    ),
+]
+
+# Options that are not passed to the constructor of the engine
+_RUN_OPTIONS = ("nma_exec", "engine", "n_cycles", "tol")
+
+
+def engine_options(func):
+    """Add the options of the fluctuation matching engines to a command.
+
+    Parameters
+    ----------
+    func : callable
+        Command function
+
+    Returns
+    -------
+    callable
+        The command function with the options
+    """
+    for option in reversed(_ENGINE_OPTIONS):
+        func = option(func)
+    return func
+
+
+def split_options(options):
+    """Separate the options of the engine from the run options.
+
+    Parameters
+    ----------
+    options : dict
+        Values of the options added by :func:`engine_options`
+
+    Returns
+    -------
+    run : dict
+        Executable, engine, number of cycles, and tolerance
+    kwargs : dict
+        Keyword arguments of the engine; options without a value are left
+        to the defaults of the engine.
+    """
+    run = {key: options[key] for key in _RUN_OPTIONS}
+    kwargs = {
+        key: value
+        for key, value in options.items()
+        if key not in _RUN_OPTIONS and value is not None
+    }
+    return run, kwargs
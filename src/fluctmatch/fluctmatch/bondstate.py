@@ -0,0 +1,290 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+"""Array-backed bond parameters for the fluctuation matching cycles.
+
+The parameter and target tables are arranged once in a fixed bond order, so
+each cycle only works with contiguous arrays. Internal coordinate tables
+from the normal mode analysis are mapped into that order with a permutation
+that is determined from the first table and reused thereafter.
+
+The state can be saved to a NumPy ``.npz`` checkpoint together with the
+remaining parameter sections and the error history, so that a restart reads
+a single binary file instead of the parameter and internal coordinate files.
+"""
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.builtins import open
+from future.utils import (
+    native_str,
+    raise_with_traceback,
+)
+
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class BondState(object):
+    """Force constants, equilibrium distances, and targets of the bonds.
+
+    Attributes
+    ----------
+    index : :class:`~pandas.MultiIndex`
+        Bond names (I, J) in the bond order of the arrays
+    kb : :class:`~numpy.ndarray`
+        Force constants
+    b0 : :class:`~numpy.ndarray`
+        Equilibrium distances
+    target_fluct : :class:`~numpy.ndarray`
+        Target bond fluctuations
+    target_avg : :class:`~numpy.ndarray`
+        Target average bond distances
+    average : :class:`~numpy.ndarray`
+        Average bond distances of the latest normal mode analysis
+    """
+
+    def __init__(self, index, kb, b0, target_fluct, target_avg):
+        self.index = index
+        self.kb = np.ascontiguousarray(kb, dtype=np.float64)
+        self.b0 = np.ascontiguousarray(b0, dtype=np.float64)
+        self.target_fluct = np.ascontiguousarray(
+            target_fluct, dtype=np.float64)
+        self.target_avg = np.ascontiguousarray(target_avg, dtype=np.float64)
+        self.average = self.target_avg.copy()
+        self._permutation = None
+
+    def __len__(self):
+        return self.kb.size
+
+    @classmethod
+    def from_tables(cls, parameters, target, bond_def=("I", "J")):
+        """Arrange the parameters in the bond order of the targets.
+
+        Parameters
+        ----------
+        parameters : :class:`~pandas.DataFrame`
+            BONDS table of the parameters
+        target : :class:`~pandas.DataFrame`
+            BONDS table of the targets, with the target fluctuations in `Kb`
+            and the target average distances in `b0`
+        bond_def : sequence of str, optional
+            Columns defining a bond
+
+        Returns
+        -------
+        :class:`BondState`
+        """
+        bond_def = list(bond_def)
+        target = target.set_index(bond_def)
+        parameters = parameters.set_index(bond_def).reindex(target.index)
+        if parameters["Kb"].isnull().any():
+            raise_with_traceback(
+                KeyError("The parameters do not include all target bonds."))
+        return cls(target.index, parameters["Kb"].values,
+                   parameters["b0"].values, target["Kb"].values,
+                   target["b0"].values)
+
+    def take(self, table, column="r_IJ"):
+        """Arrange a column of an internal coordinate table in bond order.
+
+        The permutation is determined from the first table and reused for
+        later tables with the same bond order.
+
+        Parameters
+        ----------
+        table : :class:`~pandas.DataFrame`
+            Internal coordinate table with the columns I and J
+        column : str, optional
+            Column to arrange
+
+        Returns
+        -------
+        :class:`~numpy.ndarray`
+        """
+        if self._permutation is None or table.shape[0] != len(self):
+            index = pd.MultiIndex.from_arrays(
+                [table[_].values for _ in self.index.names])
+            permutation = index.get_indexer(self.index)
+            if np.any(permutation < 0):
+                raise_with_traceback(
+                    KeyError("The internal coordinate table does not include "
+                             "all bonds."))
+            self._permutation = permutation
+        return table[column].values[self._permutation]
+
+    def to_table(self, kb=None, b0=None):
+        """Create a BONDS table in bond order.
+
+        Parameters
+        ----------
+        kb : :class:`~numpy.ndarray`, optional
+            Force constants (default: :attr:`kb`)
+        b0 : :class:`~numpy.ndarray`, optional
+            Equilibrium distances (default: :attr:`b0`)
+
+        Returns
+        -------
+        :class:`~pandas.DataFrame`
+        """
+        table = self.index.to_frame(index=False)
+        table["Kb"] = self.kb if kb is None else kb
+        table["b0"] = self.b0 if b0 is None else b0
+        return table
+
+
+def save_checkpoint(filename, state, parameters, errors):
+    """Save the bond state, parameter sections, and error history.
+
+    Parameters
+    ----------
+    filename : str
+        Checkpoint file (.npz)
+    state : :class:`BondState`
+        Current bond state
+    parameters : dict
+        Parameter tables; the BONDS section is taken from `state`
+    errors : array_like
+        Error history with the columns step, Kb_rms, fluct_rms, and b0_rms
+    """
+    text = native_str("U")
+    errors = np.asarray(errors, dtype=np.float64).reshape((-1, 4))
+    arrays = dict(
+        I=np.asarray(state.index.get_level_values(0), dtype=text),
+        J=np.asarray(state.index.get_level_values(1), dtype=text),
+        kb=state.kb,
+        b0=state.b0,
+        target_fluct=state.target_fluct,
+        target_avg=state.target_avg,
+        average=state.average,
+        errors=errors,
+        step=np.array(errors[-1, 0] if errors.size else 0, dtype=np.int64),
+    )
+    for section, table in parameters.items():
+        if section == "BONDS":
+            continue
+        arrays["{}.columns".format(section)] = np.asarray(
+            table.columns, dtype=text)
+        for column in table.columns:
+            values = np.asarray(table[column])
+            if values.dtype == np.object_:
+                values = values.astype(text)
+            arrays["{}.{}".format(section, column)] = values
+
+    # Write to a temporary file first, so that an interruption cannot leave
+    # an incomplete checkpoint behind.
+    temporary = filename + ".tmp.npz"
+    np.savez(temporary, **arrays)
+    os.rename(temporary, filename)
+
+
+def load_checkpoint(filename):
+    """Load a checkpoint written by :func:`save_checkpoint`.
+
+    Parameters
+    ----------
+    filename : str
+        Checkpoint file (.npz)
+
+    Returns
+    -------
+    state : :class:`BondState`
+        Bond state with the average distances of the last cycle
+    parameters : dict
+        Parameter tables, including the BONDS section
+    errors : :class:`~numpy.ndarray`
+        Error history with shape (n_steps, 4)
+    """
+    with np.load(filename) as data:
+        index = pd.MultiIndex.from_arrays([data["I"], data["J"]],
+                                          names=["I", "J"])
+        state = BondState(index, data["kb"], data["b0"], data["target_fluct"],
+                          data["target_avg"])
+        state.average = data["average"].copy()
+        errors = data["errors"].copy()
+
+        parameters = dict()
+        for key in data.files:
+            if not key.endswith(".columns"):
+                continue
+            section = key[:-len(".columns")]
+            columns = data[key].tolist()
+            parameters[section] = pd.DataFrame(
+                {_: data["{}.{}".format(section, _)]
+                 for _ in columns},
+                columns=columns)
+    parameters["BONDS"] = state.to_table()
+    return state, parameters, errors
+
+
+class BondParameterFile(object):
+    """Rewrite the BONDS section of an existing CHARMM parameter file.
+
+    The file is read once, and every later write only formats the force
+    constants and equilibrium distances of the bonds.
+
+    Parameters
+    ----------
+    filename : str
+        CHARMM parameter file written by
+        :class:`~fluctmatch.parameter.PRM.ParamWriter`
+    index : :class:`~pandas.MultiIndex`
+        Bond names (I, J) in the order of the BONDS section
+    """
+    _fmt = "%10.4f%10.4f\n"
+
+    def __init__(self, filename, index):
+        self.filename = filename
+        with open(filename) as prmfile:
+            lines = prmfile.readlines()
+        try:
+            start = [_.strip() for _ in lines].index("BONDS") + 1
+        except ValueError:
+            raise_with_traceback(
+                ValueError("{} has no BONDS section.".format(filename)))
+        stop = start + len(index)
+        self._head = "".join(lines[:start])
+        self._tail = "".join(lines[stop:])
+
+        # Same layout as the BONDS format of ParamWriter
+        self._names = ["%-6s %-6s " % _ for _ in index]
+
+    def write(self, kb, b0):
+        """Write the parameter file with new bond parameters.
+
+        Parameters
+        ----------
+        kb : :class:`~numpy.ndarray`
+            Force constants in the order of the BONDS section
+        b0 : :class:`~numpy.ndarray`
+            Equilibrium distances in the order of the BONDS section
+        """
+        fmt = self._fmt
+        bonds = "".join(
+            [name + fmt % (kb[i], b0[i]) for i, name in enumerate(self._names)])
+        with open(self.filename, "w") as prmfile:
+            prmfile.write(self._head)
+            prmfile.write(bonds)
+            prmfile.write(self._tail)
@@ -0,0 +1,484 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+"""Fluctuation matching of every window in a data directory.
+
+:func:`~fluctmatch.fluctmatch.utils.split_gmx` and
+:func:`~fluctmatch.fluctmatch.utils.split_charmm` write each window of a
+trajectory into its own subdirectory of the data directory, which is the
+layout that :class:`~fluctmatch.analysis.paramtable.ParamTable` reads. A
+:class:`Campaign` runs the fluctuation matching of each window in a pool of
+worker processes and records the status of each window in
+``campaign.json`` within the data directory, so that an interrupted campaign
+resumes with the unfinished windows.
+
+If the data directory has a manifest of virtual windows (see
+:mod:`~fluctmatch.fluctmatch.windows`), each window reads its frames of the
+coarse-grain trajectory of the manifest instead of a trajectory of its own.
+"""
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.builtins import (
+    dict,
+    open,
+    range,
+    str,
+    zip,
+)
+from future.moves import queue
+from future.utils import (
+    native_str,
+    raise_with_traceback,
+)
+
+import errno
+import glob
+import json
+import logging
+import multiprocessing as mp
+import os
+import pickle
+import time
+from os import path
+
+import pandas as pd
+from fluctmatch.fluctmatch import (
+    charmmfluctmatch,
+    numpyfluctmatch,
+    windows as fmwindows,
+)
+
+logger = logging.getLogger(__name__)
+
+ENGINES = dict(
+    CHARMM=charmmfluctmatch.CharmmFluctMatch,
+    NUMPY=numpyfluctmatch.NumpyFluctMatch,
+)
+
+# Memory required in addition to the normal mode analysis (bytes)
+_BASE_MEMORY = 2**28
+
+
+def available_memory():
+    """Determine the available physical memory.
+
+    Returns
+    -------
+    int or None
+        Available memory in bytes, or None if it cannot be determined
+    """
+    try:
+        return (os.sysconf(native_str("SC_PAGE_SIZE")) *
+                os.sysconf(native_str("SC_AVPHYS_PAGES")))
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def estimate_memory(topology):
+    """Estimate the memory needed for the fluctuation matching of a window.
+
+    The normal mode analysis stores the Hessian and its eigenvectors, which
+    are two dense matrices of size 3N x 3N for N atoms.
+
+    Parameters
+    ----------
+    topology : str
+        PSF file of the window
+
+    Returns
+    -------
+    int
+        Memory estimate in bytes
+    """
+    n_atoms = 0
+    with open(topology) as psf:
+        for line in psf:
+            if "!NATOM" in line:
+                n_atoms = int(line.split()[0])
+                break
+    return _BASE_MEMORY + 2 * 8 * (3 * n_atoms)**2
+
+
+def _sort_key(window):
+    name = path.basename(window)
+    return (0, int(name), name) if name.isdigit() else (1, 0, name)
+
+
+# Queue of the worker process on which it announces each window it starts
+_started = None
+
+
+def _init_worker(started):
+    global _started
+    _started = started
+
+
+def _is_alive(pid):
+    """Whether a process exists."""
+    try:
+        os.kill(pid, 0)
+    except OSError as exc:
+        return exc.errno == errno.EPERM
+    return True
+
+
+def _failed(window, error):
+    """Result of a window whose worker did not return one."""
+    return dict(
+        window=window, status="failed", error=error, total=0., run=0.)
+
+
+def _run_pickled(name, arguments):
+    """Run a window whose arguments were pickled by the campaign.
+
+    An error while unpickling is reported as the result of the window, so
+    the campaign does not wait for it forever.
+    """
+    try:
+        arguments = pickle.loads(arguments)
+    except Exception as exc:
+        logger.exception("The arguments of window {} are invalid.".format(
+            name))
+        return _failed(name, "{}: {}".format(type(exc).__name__, exc))
+    return _run_window(*arguments)
+
+
+def _run_window(window, engine, topology, trajectory, restart, warm_start,
+                kwargs, nma_exec, tol, n_cycles):
+    """Run the fluctuation matching of one window in a worker process."""
+    result = dict(window=path.basename(window), status="done", error="")
+    if _started is not None:
+        _started.put((result["window"], os.getpid()))
+    st = time.time()
+    try:
+        cfm = ENGINES[engine](
+            path.join(window, topology),
+            path.join(window, trajectory),
+            outdir=window,
+            **kwargs)
+        result["parameters"] = cfm.filenames["dynamic_prm"]
+        cfm.initialize(
+            nma_exec=nma_exec, restart=restart, warm_start=warm_start)
+        result["initialize"] = time.time() - st
+        cfm.run(nma_exec=nma_exec, tol=tol, n_cycles=n_cycles)
+    except Exception as exc:
+        logger.exception("Fluctuation matching failed in {}".format(window))
+        result["status"] = "failed"
+        result["error"] = "{}: {}".format(type(exc).__name__, exc)
+    result["total"] = time.time() - st
+    result["run"] = result["total"] - result.get("initialize", 0.)
+    if warm_start is not None:
+        result["warm_start"] = warm_start
+    return result
+
+
+class Campaign(object):
+    """Fluctuation matching of the windows within a data directory."""
+
+    status_file = "campaign.json"
+
+    # Seconds between checks for windows whose worker process died
+    poll_interval = 5.
+
+    def __init__(self,
+                 datadir,
+                 topology="fluctmatch.xplor.psf",
+                 trajectory="cg.dcd",
+                 engine="CHARMM",
+                 n_workers=None,
+                 memory=None,
+                 warm_start=False,
+                 restart=False,
+                 **kwargs):
+        """
+        Parameters
+        ----------
+        datadir : str
+            Directory with one subdirectory per window
+        topology : str, optional
+            Name of the topology file within each window
+        trajectory : str, optional
+            Name of the trajectory file within each window; not used for the
+            windows of a manifest
+        engine : {"CHARMM", "NUMPY"}, optional
+            Program used for the normal mode analysis
+        n_workers : int, optional
+            Maximum number of windows run simultaneously (default: number of
+            CPUs)
+        memory : float, optional
+            Memory required by each window (MB). By default, it is estimated
+            from the number of atoms in the topology file of each window.
+        warm_start : bool, optional
+            Run the windows in time order and start each window from the
+            converged force constants of the preceding window. The windows
+            are divided into one contiguous sequence per worker.
+        restart : bool, optional
+            Restart every window from its files. Otherwise, only the windows
+            that an earlier campaign started are restarted.
+
+        Additional keyword arguments are passed to the fluctuation matching
+        class of the engine.
+        """
+        if engine not in ENGINES:
+            raise_with_traceback(
+                KeyError("{} is not an available engine. Please try {}".format(
+                    engine, ", ".join(sorted(ENGINES)))))
+        self.datadir = datadir
+        self.topology = topology
+        self.trajectory = trajectory
+        self.engine = engine
+        self.n_workers = n_workers
+        self.memory = memory
+        self.warm_start = warm_start
+        self.restart = restart
+        self.kwargs = kwargs
+        self.status = dict()
+        self.manifest = fmwindows.find_manifest(datadir)
+        for window in self.manifest.values():
+            fmwindows.cg_trajectory(window)
+
+    @property
+    def windows(self):
+        """Window subdirectories that contain a topology file."""
+        directories = glob.iglob(path.join(self.datadir, "*"))
+        windows = [
+            _ for _ in directories
+            if path.isfile(path.join(_, self.topology))
+        ]
+        return sorted(windows, key=_sort_key)
+
+    def _load_status(self):
+        filename = path.join(self.datadir, self.status_file)
+        try:
+            with open(filename) as status:
+                self.status = json.load(status)
+        except (IOError, OSError, ValueError):
+            self.status = dict()
+
+    def _save_status(self):
+        filename = path.join(self.datadir, self.status_file)
+        with open(filename + ".tmp", "w") as status:
+            status.write(
+                str(json.dumps(self.status, indent=2, sort_keys=True)))
+        os.rename(filename + ".tmp", filename)
+
+    def _finish(self, result):
+        """Record the result of a window."""
+        name = result.pop("window")
+        self.status[name] = result
+        self._save_status()
+        logger.info("Window {}: {} in {:.2f} s".format(
+            name, result["status"], result["total"]))
+        return name
+
+    def _sequences(self, windows, n_workers):
+        """Divide the windows into sequences that run one after another."""
+        if not self.warm_start:
+            return [[_] for _ in windows]
+        size = -(-len(windows) // n_workers)
+        return [windows[_:_ + size] for _ in range(0, len(windows), size)]
+
+    def _submit(self, pool, window, preceding, callback, args):
+        """Submit a window, warm-started from the preceding window."""
+        name = path.basename(window)
+        restart = self.restart or name in self.status
+        warm_start = None
+        if self.warm_start and not restart and preceding is not None:
+            status = self.status.get(path.basename(preceding), dict())
+            if status.get("status") == "done":
+                warm_start = status.get("parameters")
+        self.status[name] = dict(status="running")
+        self._save_status()
+        trajectory, kwargs = self.trajectory, self.kwargs
+        if name in self.manifest:
+            trajectory = fmwindows.cg_trajectory(self.manifest[name])
+            kwargs = dict(kwargs, window=self.manifest[name])
+        # The arguments are pickled here, so that an argument that cannot
+        # be pickled fails its window instead of the task of the pool.
+        try:
+            arguments = pickle.dumps(
+                (window, self.engine, self.topology, trajectory, restart,
+                 warm_start, kwargs) + args, pickle.HIGHEST_PROTOCOL)
+        except Exception as exc:
+            logger.exception(
+                "The arguments of window {} cannot be pickled.".format(name))
+            callback(_failed(name, "{}: {}".format(type(exc).__name__, exc)))
+            return
+        pool.apply_async(_run_pickled, (name, arguments), callback=callback)
+
+    def _results(self, finished, started, n_windows):
+        """Wait for the results of the windows.
+
+        A worker process that is killed, e.g., for lack of memory, never
+        returns the result of its window. The workers announce each window
+        that they start, and a window whose worker no longer exists is
+        reported as failed.
+
+        Parameters
+        ----------
+        finished : :class:`~queue.Queue`
+            Results of the windows
+        started : :class:`~queue.Queue`
+            Name and process ID of each window that a worker starts
+        n_windows : int
+            Number of results to wait for
+
+        Yields
+        ------
+        dict
+            Result of a window
+        """
+        running = dict()
+        done = set()
+        while len(done) < n_windows:
+            try:
+                results = [finished.get(timeout=self.poll_interval)]
+            except queue.Empty:
+                results = []
+            while not started.empty():
+                name, pid = started.get()
+                if name not in done:
+                    running[name] = pid
+            if not results:
+                results = [
+                    _failed(name, "The worker process {:d} exited.".format(
+                        pid)) for name, pid in sorted(running.items())
+                    if not _is_alive(pid)
+                ]
+            for result in results:
+                running.pop(result["window"], None)
+                done.add(result["window"])
+                yield result
+
+    def pool_size(self, windows):
+        """Determine the number of worker processes.
+
+        The pool is limited by the number of CPUs and by the number of the
+        largest windows that fit into the available memory.
+
+        Parameters
+        ----------
+        windows : list of str
+            Window directories to run
+
+        Returns
+        -------
+        int
+        """
+        n_workers = self.n_workers or mp.cpu_count()
+        n_workers = max(1, min(n_workers, len(windows)))
+        if self.memory is not None:
+            memory = self.memory * 2**20
+        else:
+            memory = max(
+                estimate_memory(path.join(_, self.topology))
+                for _ in windows)
+        total = available_memory()
+        if total is not None:
+            n_workers = max(1, min(n_workers, total // int(memory)))
+        logger.info("Running {:d} windows with {:d} workers ({:.0f} MB per "
+                    "window).".format(
+                        len(windows), n_workers, memory / 2.**20))
+        return n_workers
+
+    def run(self, nma_exec=None, tol=1.e-4, n_cycles=250):
+        """Run the fluctuation matching of the unfinished windows.
+
+        Windows that finished in an earlier campaign are skipped, and windows
+        that were interrupted restart from their files. With `warm_start`,
+        each window starts from the converged force constants of the
+        preceding window, if it has finished.
+
+        Parameters
+        ----------
+        nma_exec : str, optional
+            executable file for normal mode analysis
+        tol : float, optional
+            error tolerance
+        n_cycles : int, optional
+            number of fluctuation matching cycles
+
+        Returns
+        -------
+        :class:`~pandas.DataFrame`
+            Status and timings (s) of each window
+        """
+        self._load_status()
+        all_windows = self.windows
+        preceding = dict(zip(all_windows[1:], all_windows[:-1]))
+        windows = [
+            _ for _ in all_windows
+            if self.status.get(path.basename(_), dict()).get("status") !=
+            "done"
+        ]
+        if windows:
+            n_workers = self.pool_size(windows)
+            sequences = self._sequences(windows, n_workers)
+            following = dict()
+            for sequence in sequences:
+                following.update(zip(sequence[:-1], sequence[1:]))
+            locations = {path.basename(_): _ for _ in windows}
+
+            args = (nma_exec, tol, n_cycles)
+            finished = queue.Queue()
+            # The manager receives an announcement before put returns, so
+            # it is not lost if the worker dies right away.
+            manager = mp.Manager()
+            started = manager.Queue()
+            pool = mp.Pool(n_workers, _init_worker, (started, ))
+            try:
+                for sequence in sequences:
+                    self._submit(pool, sequence[0],
+                                 preceding.get(sequence[0]), finished.put,
+                                 args)
+                for result in self._results(finished, started, len(windows)):
+                    window = locations[self._finish(result)]
+                    if window in following:
+                        self._submit(pool, following[window], window,
+                                     finished.put, args)
+            finally:
+                # All windows have returned, or their workers are gone, and
+                # the pool would wait forever for the results of the latter.
+                pool.terminate()
+                manager.shutdown()
+        return self.summary()
+
+    def summary(self):
+        """Summarize the status and timings of the windows.
+
+        Returns
+        -------
+        :class:`~pandas.DataFrame`
+            Status and timings (s) of each window
+        """
+        columns = [
+            "status", "initialize", "run", "total", "warm_start", "error"
+        ]
+        table = pd.DataFrame.from_dict(self.status, orient="index")
+        table = table.reindex(columns=columns)
+        table = table.loc[sorted(table.index, key=_sort_key)]
+        done = table[table["status"] == "done"]
+        if not done.empty:
+            logger.info("{:d} of {:d} windows completed; total time "
+                        "{:.2f} s, mean {:.2f} s per window.".format(
+                            done.shape[0], table.shape[0],
+                            done["total"].sum(), done["total"].mean()))
+        return table
@@ -50,6 +50,8 @@ from future.utils import (
 import copy
 import logging
 import os
+import re
+import shutil
 import subprocess
 import textwrap
 import time
@@ -62,13 +64,19 @@ import MDAnalysis as mda
 from MDAnalysis.lib import util
 from MDAnalysis.coordinates.core import reader
 from fluctmatch.fluctmatch import base as fmbase
+from fluctmatch.fluctmatch import bondstate
+from fluctmatch.fluctmatch import metrics
+from fluctmatch.fluctmatch import quasiharmonic
+from fluctmatch.fluctmatch import session
+from fluctmatch.fluctmatch import updates
+from fluctmatch.fluctmatch import vibrations
+from fluctmatch.fluctmatch import windows as fmwindows
 from fluctmatch.fluctmatch import utils as fmutils
 from fluctmatch.fluctmatch.data import (
     charmm_init,
     charmm_nma,
     charmm_thermo,
 )
-from fluctmatch.intcor import utils as icutils
 from fluctmatch.parameter import utils as prmutils
 
 if PY2:
@@ -76,6 +84,51 @@ if PY2:
 
 logger = logging.getLogger(__name__)
 
+_MINI_STEP = re.compile(r"^\s*(?:MINI|ABNR)>\s+(\d+)\s")
+_MINI_END = re.compile(r"^\s*[A-Z]{3,4} END>\s+(\d+)\s")
+
+
+def _minimization_steps(filename, offset=0):
+    """Count the minimization steps reported in a CHARMM log file.
+
+    Each minimizer ends with a report of its last step (e.g., ``ABNR END>``),
+    which is summed. The ``MINI>`` progress lines are only printed every
+    NPRINT steps, so they are used only if no final report is found.
+
+    Parameters
+    ----------
+    filename : str
+        CHARMM log file
+    offset : int, optional
+        Position in the file from which the log is read
+
+    Returns
+    -------
+    int
+        Total number of steps of all minimizations
+    """
+    total = 0
+    last = -1
+    final = []
+    with open(filename, "rb") as log_file:
+        log_file.seek(offset)
+        for line in log_file:
+            line = line.decode(errors="replace")
+            match = _MINI_END.match(line)
+            if match is not None:
+                final.append(int(match.group(1)))
+                continue
+            match = _MINI_STEP.match(line)
+            if match is None:
+                continue
+            step = int(match.group(1))
+            if step <= last:
+                total += last
+            last = step
+    if final:
+        return sum(final)
+    return total + max(last, 0)
+
 
 class CharmmFluctMatch(fmbase.FluctMatch):
     """Fluctuation matching using CHARMM."""
@@ -149,8 +202,63 @@ class CharmmFluctMatch(fmbase.FluctMatch):
             Include segment IDs in the internal coordinate files.
         nonbonded
             Include the nonbonded section in the parameter file.
+        session
+            Start CHARMM once and send each cycle through standard input
+            instead of starting CHARMM for every cycle (default: False)
+        update
+            Force constant update strategy: "linear", "anderson", or
+            "broyden" (default: "linear")
+        history
+            Number of previous cycles used by Anderson mixing or the Broyden
+            update
+        mixing
+            Mixing parameter of Anderson mixing (default: 1.0)
+        damping
+            Damping of the Broyden step (default: 0.8)
+        radius
+            Initial trust radius of the "newton" update relative to the norm
+            of the force constants (default: 0.5). The Newton update requires
+            :class:`~fluctmatch.fluctmatch.numpyfluctmatch.NumpyFluctMatch`.
+        init
+            Calculate the target bond averages and fluctuations with
+            "charmm" or in one pass through the trajectory with "python",
+            which does not require CHARMM, or use the files written by
+            :func:`~fluctmatch.fluctmatch.utils.write_window_targets` with
+            "file" (default: "charmm")
+        target_tol
+            With "python", stop reading the trajectory once the relative
+            standard error of the target fluctuations, estimated from blocks
+            of frames spread over the trajectory, is at most this value
+            (default: read all frames)
+        thermo
+            Calculate the thermodynamic properties with "charmm" or "python"
+            (default: "charmm")
+        minimize
+            Start the minimization of each cycle from the "average"
+            structure with 100 steepest descent and 2000 ABNR steps, or from
+            the minimized structure of the "previous" cycle with ABNR until
+            the gradient converges (default: "average")
+        maxiter
+            Maximum number of ABNR steps with "previous" (default: 2000)
+        gtol
+            Gradient tolerance of ABNR with "previous" (default: 1e-4)
+        checkpoint
+            Number of cycles between checkpoints (default: 10). The
+            checkpoint file and the parameter files are also written when
+            fluctuation matching finishes.
+        callback
+            Function called with the metrics of each cycle (a dict; see
+            :class:`~fluctmatch.fluctmatch.metrics.CycleMetrics`). The
+            metrics are also appended to metrics.jsonl in the output
+            directory.
+        window
+            A :class:`~fluctmatch.fluctmatch.windows.Window`. The targets
+            and the thermodynamic properties are calculated from its frames
+            of the trajectory, which is the coarse-grain trajectory of the
+            window unless one is given.
         """
         super().__init__(*args, **kwargs)
+        self.window = kwargs.get("window")
         self.dynamic_params = dict()
         self.filenames = dict(
             init_input=path.join(self.outdir, "fluctinit.inp"),
@@ -176,11 +284,14 @@ class CharmmFluctMatch(fmbase.FluctMatch):
             charmm_input=path.join(self.outdir, ".".join((self.prefix,
                                                           "inp"))),
             charmm_log=path.join(self.outdir, ".".join((self.prefix, "log"))),
+            checkpoint=path.join(self.outdir, ".".join((self.prefix,
+                                                        "checkpoint", "npz"))),
             error_data=path.join(self.outdir, "error.dat"),
+            metrics=path.join(self.outdir, "metrics.jsonl"),
             thermo_input=path.join(self.outdir, "thermo.inp"),
             thermo_log=path.join(self.outdir, "thermo.log"),
             thermo_data=path.join(self.outdir, "thermo.dat"),
-            traj_file=self.args[1] if len(self.args) > 1 else path.join(self.outdir, "cg.dcd")
+            traj_file=self._trajectory_file(),
         )
 
         # Boltzmann constant
@@ -190,25 +301,297 @@ class CharmmFluctMatch(fmbase.FluctMatch):
         # Bond factor mol^2-Ang./kcal^2
         self.KFACTOR = 0.02
 
+        # Force constant update strategy
+        self.kb_update = updates.create(
+            kwargs.get("update", "linear"),
+            self.BOLTZ * self.KFACTOR,
+            kt=self.BOLTZ,
+            **{
+                key: kwargs[key]
+                for key in ("history", "mixing", "damping", "radius")
+                if key in kwargs
+            })
+
         # Self consistent error information.
         self.error = pd.DataFrame(
             np.zeros((1, len(self.error_hdr)), dtype=np.int),
             columns=self.error_hdr,
         )
+        self.error_history = []
+
+        # Number of cycles between checkpoints
+        self.checkpoint = kwargs.get("checkpoint", 10)
+
+        # Starting structure of the minimization
+        self.minimize = kwargs.get("minimize", "average")
+        if self.minimize not in ("average", "previous"):
+            raise ValueError(
+                "The minimization must start from either 'average' or "
+                "'previous'.")
+
+        # Timings and convergence metrics of each cycle
+        self.metrics = metrics.CycleMetrics(self.filenames["metrics"],
+                                            kwargs.get("callback"))
+
+    def _trajectory_file(self):
+        if len(self.args) > 1:
+            return self.args[1]
+        if self.window is not None:
+            return fmwindows.cg_trajectory(self.window)
+        return path.join(self.outdir, "cg.dcd")
+
+    def _thermo_trajectory(self):
+        if self.window is not None:
+            return self.filenames["traj_file"]
+        return path.join(self.outdir, self.args[-1])
+
+    @property
+    def frames(self):
+        """First frame and the frame after the last one of the window.
+
+        Returns
+        -------
+        tuple
+            (start, stop); stop is None for the entire trajectory
+        """
+        if self.window is None:
+            return 0, None
+        return self.window.start, self.window.stop
+
+    def _charmm_frames(self):
+        """Frames of the window for the CHARMM templates."""
+        start, stop = self.frames
+        return dict(
+            first_frame="{:d}".format(start),
+            last_frame=("?NFILE - 1"
+                        if stop is None else "{:d}".format(stop - 1)))
 
     def _create_ic_table(self, universe, data):
-        data.set_index(self.bond_def, inplace=True)
-        table = icutils.create_empty_table(universe.atoms)
-        hdr = table.columns
-        table.set_index(self.bond_def, inplace=True)
-        table.drop(
-            [
-                "r_IJ",
-            ], axis=1, inplace=True)
-        table = pd.concat([table, data["r_IJ"]], axis=1)
-        return table.reset_index()[hdr]
-
-    def initialize(self, nma_exec=None, restart=False):
+        return fmutils.create_ic_table(universe, data, self.bond_def)
+
+    def _charmm_script(self, template):
+        """Fill a CHARMM input template for the normal mode analysis.
+
+        Parameters
+        ----------
+        template : str
+            CHARMM input template from
+            :mod:`~fluctmatch.fluctmatch.data.charmm_nma`
+
+        Returns
+        -------
+        str
+            CHARMM input
+        """
+        version = self.kwargs.get("charmm_version", 41)
+        dimension = ("dimension chsize 1000000" if version >= 36 else "")
+        if self.minimize == "previous":
+            start_crd = self.filenames["nma_crd"]
+            minimize = "mini abnr nstep {:d} tolgrd {:g}".format(
+                self.kwargs.get("maxiter", 2000),
+                self.kwargs.get("gtol", 1.e-4))
+        else:
+            start_crd = self.filenames["crd_file"]
+            minimize = "mini   sd nstep 100\n    mini abnr nstep 2000"
+        charmm_inp = template.format(
+            temperature=self.temperature,
+            flex="flex" if version else "",
+            version=version,
+            dimension=dimension,
+            start_crd=start_crd,
+            minimize=minimize,
+            **self.filenames)
+        return textwrap.dedent(charmm_inp[1:])
+
+    def _read_error_data(self):
+        """Determine the last step and prepare the error file.
+
+        The error history restored from a checkpoint replaces the error file.
+        Otherwise, the last step is read from an existing error file, or a new
+        one is created.
+        """
+        if self.error_history:
+            self.error["step"] = int(self.error_history[-1][0])
+            with open(self.filenames["error_data"], "wb") as data:
+                np.savetxt(
+                    data, [
+                        self.error_hdr,
+                    ],
+                    fmt=native_str("%10s"),
+                    delimiter=native_str(""))
+                np.savetxt(
+                    data,
+                    self.error_history,
+                    fmt=native_str("%10d%10.6f%10.6f%10.6f", ),
+                    delimiter=native_str(""),
+                )
+        else:
+            try:
+                if os.stat(self.filenames["error_data"]).st_size > 0:
+                    with open(self.filenames["error_data"], "rb") as data:
+                        error_info = pd.read_csv(
+                            data,
+                            header=0,
+                            comment=native_str("#"),
+                            skipinitialspace=True,
+                            delim_whitespace=True)
+                        if not error_info.empty:
+                            self.error["step"] = error_info["step"].values[-1]
+                            self.error_history = (
+                                error_info[self.error_hdr].values.tolist())
+                else:
+                    raise FileNotFoundError
+            except (FileNotFoundError, OSError):
+                with open(self.filenames["error_data"], "wb") as data:
+                    np.savetxt(
+                        data, [
+                            self.error_hdr,
+                        ],
+                        fmt=native_str("%10s"),
+                        delimiter=native_str(""))
+
+        # Record the update strategy used from this step onward.
+        with open(self.filenames["error_data"], "ab") as data:
+            data.write("# Kb update: {}\n".format(self.kb_update).encode())
+
+    def _write_error_data(self):
+        """Append the current error values to the error file."""
+        self.error_history.append(self.error.values[0].tolist())
+        with open(self.filenames["error_data"], "ab") as error_file:
+            np.savetxt(
+                error_file,
+                self.error,
+                fmt=native_str("%10d%10.6f%10.6f%10.6f", ),
+                delimiter=native_str(""),
+            )
+
+    def _finish_cycle(self, rss=None, **values):
+        """Record the metrics of the current cycle.
+
+        Parameters
+        ----------
+        rss : int, optional
+            Peak resident set size (kB) of the normal mode calculation
+        values
+            Additional metrics (e.g., `minimization_steps`)
+        """
+        values.update({key: self.error[key].values[0]
+                       for key in self.error_hdr[1:]})
+        self.metrics.finish(self.error["step"].values[0], rss=rss, **values)
+
+    def _checkpoint(self, state):
+        """Save a checkpoint and write the parameter files.
+
+        Parameters
+        ----------
+        state : :class:`~fluctmatch.fluctmatch.bondstate.BondState`
+            Current bond state
+        """
+        self.parameters["BONDS"] = state.to_table()
+        self.dynamic_params["BONDS"] = state.to_table(b0=state.average)
+        bondstate.save_checkpoint(self.filenames["checkpoint"], state,
+                                  self.parameters, self.error_history)
+        with mda.Writer(self.filenames["fixed_prm"], **self.kwargs) as prm:
+            prm.write(self.parameters)
+        with mda.Writer(self.filenames["dynamic_prm"], **self.kwargs) as prm:
+            prm.write(self.dynamic_params)
+
+    def _warm_start(self, filename):
+        """Take the initial force constants from another parameter file.
+
+        Bonds are matched by the names of their atoms. Bonds that are missing
+        from the file keep the force constants estimated from the target
+        fluctuations.
+
+        Parameters
+        ----------
+        filename : str
+            CHARMM parameter file, e.g., the converged distance parameter file
+            of a neighboring window
+        """
+        with reader(filename) as prm:
+            kb = prm.read()["BONDS"].set_index(self.bond_def)["Kb"]
+        bonds = self.parameters["BONDS"].set_index(self.bond_def)
+        kb = kb[~kb.index.duplicated()].reindex(bonds.index)
+        found = kb.notnull().values
+        self.parameters["BONDS"]["Kb"] = np.where(
+            found, kb.values, self.parameters["BONDS"]["Kb"].values)
+        logger.info("Initial force constants of {:d} of {:d} bonds taken "
+                    "from {}".format(found.sum(), found.size, filename))
+
+    def _charmm_targets(self, nma_exec=None):
+        """Calculate the target bond averages and fluctuations with CHARMM.
+
+        Parameters
+        ----------
+        nma_exec : str
+            executable file for normal mode analysis
+        """
+        # Write CHARMM input file.
+        if not path.exists(self.filenames["init_input"]):
+            version = self.kwargs.get("charmm_version", 41)
+            dimension = ("dimension chsize 1000000" if version >= 36 else "")
+            with open(self.filenames["init_input"], mode="wb") as charmm_file:
+                logger.info("Writing CHARMM input file.")
+                charmm_inp = charmm_init.init.format(
+                    flex="flex" if version else "",
+                    version=version,
+                    dimension=dimension,
+                    **dict(self.filenames, **self._charmm_frames()))
+                charmm_inp = textwrap.dedent(charmm_inp[1:])
+                charmm_file.write(charmm_inp.encode())
+
+        charmm_exec = (os.environ.get("CHARMMEXEC", util.which("charmm"))
+                       if nma_exec is None else nma_exec)
+        with open(self.filenames["init_log"], "w") as log_file:
+            subprocess.check_call(
+                [charmm_exec, "-i", self.filenames["init_input"]],
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+            )
+
+    def _initial_targets(self):
+        """Calculate the target bond averages and fluctuations in Python.
+
+        The trajectory is read once, and the results are written to the same
+        internal coordinate files that CHARMM would write.
+        """
+        universe = mda.Universe(self.filenames["xplor_psf_file"],
+                                self.filenames["traj_file"])
+        logger.info("Calculating the bond averages and fluctuations from "
+                    "{}...".format(self.filenames["traj_file"]))
+        start, stop = self.frames
+        stats = fmutils.BondStats(
+            universe.atoms,
+            start=start,
+            stop=stop,
+            tol=self.kwargs.get("target_tol")).run()
+        if stats.error is not None:
+            logger.info("The targets were calculated from {:d} frames with "
+                        "a relative error of {:.3g}.".format(
+                            stats.frames_used, stats.error))
+        average, fluct = stats.result
+        for key, data in (("init_avg_ic", average), ("init_fluct_ic", fluct)):
+            table = self._create_ic_table(universe, data)
+            with mda.Writer(self.filenames[key], **self.kwargs) as ic:
+                logger.info("Writing {}...".format(self.filenames[key]))
+                ic.write(table)
+
+    def _existing_targets(self):
+        """Use targets that were written beforehand.
+
+        :func:`~fluctmatch.fluctmatch.utils.write_window_targets` writes the
+        targets of many windows from one pass through the trajectory.
+        """
+        for key in ("init_avg_ic", "init_fluct_ic"):
+            if not path.exists(self.filenames[key]):
+                raise_with_traceback(
+                    IOError("{} does not exist.".format(self.filenames[key])))
+        logger.info("Using the bond averages and fluctuations in {} and "
+                    "{}.".format(self.filenames["init_avg_ic"],
+                                 self.filenames["init_fluct_ic"]))
+
+    def initialize(self, nma_exec=None, restart=False, warm_start=None):
         """Create an elastic network model from a basic coarse-grain model.
 
         Parameters
@@ -218,32 +601,25 @@ class CharmmFluctMatch(fmbase.FluctMatch):
         restart : bool, optional
             Reinitialize the object by reading files instead of doing initial
             calculations.
+        warm_start : str, optional
+            Parameter file from which the initial force constants are taken,
+            such as the distance parameter file of a converged neighboring
+            window. Bonds missing from the file start from
+            :math:`k_B T / \\langle \\Delta r^2 \\rangle`. Only used when the
+            parameter files are created.
         """
         if not restart:
-            # Write CHARMM input file.
-            if not path.exists(self.filenames["init_input"]):
-                version = self.kwargs.get("charmm_version", 41)
-                dimension = (
-                    "dimension chsize 1000000" if version >= 36 else "")
-                with open(
-                    self.filenames["init_input"], mode="wb") as charmm_file:
-                    logger.info("Writing CHARMM input file.")
-                    charmm_inp = charmm_init.init.format(
-                        flex="flex" if version else "",
-                        version=version,
-                        dimension=dimension,
-                        **self.filenames)
-                    charmm_inp = textwrap.dedent(charmm_inp[1:])
-                    charmm_file.write(charmm_inp.encode())
-
-            charmm_exec = (os.environ.get("CHARMMEXEC", util.which("charmm"))
-                           if nma_exec is None else nma_exec)
-            with open(self.filenames["init_log"], "w") as log_file:
-                subprocess.check_call(
-                    [charmm_exec, "-i", self.filenames["init_input"]],
-                    stdout=log_file,
-                    stderr=subprocess.STDOUT,
-                )
+            # A checkpoint of previous parameters is no longer valid.
+            if path.exists(self.filenames["checkpoint"]):
+                os.remove(self.filenames["checkpoint"])
+
+            init = self.kwargs.get("init", "charmm")
+            if init == "python":
+                self._initial_targets()
+            elif init == "file":
+                self._existing_targets()
+            else:
+                self._charmm_targets(nma_exec)
 
             # Write the parameter files.
             with reader(self.filenames["init_fluct_ic"]) as icfile:
@@ -263,6 +639,8 @@ class CharmmFluctMatch(fmbase.FluctMatch):
             self.parameters = copy.deepcopy(self.target)
             self.parameters["BONDS"]["Kb"] = (
                 self.BOLTZ / self.parameters["BONDS"]["Kb"].apply(np.square))
+            if warm_start is not None:
+                self._warm_start(warm_start)
             self.dynamic_params = copy.deepcopy(self.parameters)
             with mda.Writer(self.filenames["fixed_prm"], **self.kwargs) as prm:
                 logger.info("Writing {}...".format(
@@ -273,9 +651,20 @@ class CharmmFluctMatch(fmbase.FluctMatch):
                 logger.info("Writing {}...".format(
                     self.filenames["dynamic_prm"]))
                 prm.write(self.dynamic_params)
+        elif path.exists(self.filenames["checkpoint"]):
+            logger.info("Loading {}...".format(self.filenames["checkpoint"]))
+            state, self.parameters, errors = bondstate.load_checkpoint(
+                self.filenames["checkpoint"])
+            self.error_history = errors.tolist()
+            self.dynamic_params = copy.deepcopy(self.parameters)
+            self.dynamic_params["BONDS"] = state.to_table(b0=state.average)
+            self.target = copy.deepcopy(self.parameters)
+            self.target["BONDS"] = state.to_table(
+                kb=state.target_fluct, b0=state.target_avg)
         else:
             if not path.exists(self.filenames["fixed_prm"]):
-                self.initialize(nma_exec, restart=False)
+                self.initialize(
+                    nma_exec, restart=False, warm_start=warm_start)
             try:
                 # Read the parameter files.
                 logger.info("Loading parameter and internal coordinate files.")
@@ -329,6 +718,12 @@ class CharmmFluctMatch(fmbase.FluctMatch):
                     "executable file or add the charmm path to your PATH "
                     "environment."))
 
+        if self.kb_update.sensitivities:
+            raise_with_traceback(
+                ValueError("The {} update requires the bond covariances, "
+                           "which CHARMM does not provide.".format(
+                               self.kb_update.name)))
+
         # Read the parameters
         if not self.parameters:
             try:
@@ -339,132 +734,236 @@ class CharmmFluctMatch(fmbase.FluctMatch):
 
         # Write CHARMM input file.
         if not path.exists(self.filenames["charmm_input"]):
-            version = self.kwargs.get("charmm_version", 41)
-            dimension = ("dimension chsize 1000000" if version >= 36 else "")
             with open(
                     self.filenames["charmm_input"], mode="wb") as charmm_file:
                 logger.info("Writing CHARMM input file.")
-                charmm_inp = charmm_nma.nma.format(
-                    temperature=self.temperature,
-                    flex="flex" if version else "",
-                    version=version,
-                    dimension=dimension,
-                    **self.filenames)
-                charmm_inp = textwrap.dedent(charmm_inp[1:])
+                charmm_inp = self._charmm_script(charmm_nma.nma)
                 charmm_file.write(charmm_inp.encode())
 
-        # Set the indices for the parameter tables.
-        self.target["BONDS"].set_index(self.bond_def, inplace=True)
-        bond_values = self.target["BONDS"].columns
+        # Arrange the bond parameters in the order of the targets. Only the
+        # BONDS section of the fixed parameter file is rewritten each cycle.
+        state = bondstate.BondState.from_tables(
+            self.parameters["BONDS"], self.target["BONDS"], self.bond_def)
+        state.average = self.dynamic_params["BONDS"].set_index(
+            self.bond_def).reindex(state.index)["b0"].values
+        self.parameters["BONDS"] = state.to_table()
+        with mda.Writer(self.filenames["fixed_prm"], **self.kwargs) as prm:
+            prm.write(self.parameters)
+        fixed_prm = bondstate.BondParameterFile(self.filenames["fixed_prm"],
+                                                state.index)
 
         # Check for restart.
-        try:
-            if os.stat(self.filenames["error_data"]).st_size > 0:
-                with open(self.filenames["error_data"], "rb") as data:
-                    error_info = pd.read_csv(
-                        data,
-                        header=0,
-                        skipinitialspace=True,
-                        delim_whitespace=True)
-                    if not error_info.empty:
-                        self.error["step"] = error_info["step"].values[-1]
-            else:
-                raise FileNotFoundError
-        except (FileNotFoundError, OSError):
-            with open(self.filenames["error_data"], "wb") as data:
-                np.savetxt(
-                    data, [
-                        self.error_hdr,
-                    ],
-                    fmt=native_str("%10s"),
-                    delimiter=native_str(""))
-        self.error["step"] += 1
+        self._read_error_data()
+        step = self.error["step"].values[0]
+
+        # The first cycle starts from the average structure.
+        if (self.minimize == "previous"
+                and not path.exists(self.filenames["nma_crd"])):
+            shutil.copyfile(self.filenames["crd_file"],
+                            self.filenames["nma_crd"])
 
         # Run simulation
         logger.info("Starting fluctuation matching")
+        logger.info("Force constant update: {}".format(self.kb_update))
         st = time.time()
+        self.metrics.reset()
 
-        for i in range(n_cycles):
-            self.error["step"] = i + 1
-            with open(self.filenames["charmm_log"], "w") as log_file:
-                subprocess.check_call(
-                    [charmm_exec, "-i", self.filenames["charmm_input"]],
-                    stdout=log_file,
-                    stderr=subprocess.STDOUT,
-                )
-            self.dynamic_params["BONDS"].set_index(self.bond_def, inplace=True)
-            self.parameters["BONDS"].set_index(self.bond_def, inplace=True)
-
-            # Read the average bond distance.
-            with reader(self.filenames["avg_ic"]) as intcor:
-                avg_ic = intcor.read().set_index(self.bond_def)["r_IJ"]
-
-            # Read the bond fluctuations.
-            with reader(self.filenames["fluct_ic"]) as intcor:
-                fluct_ic = intcor.read().set_index(self.bond_def)["r_IJ"]
-
-            vib_ic = pd.concat([fluct_ic, avg_ic], axis=1)
-            vib_ic.columns = bond_values
-
-            # Calculate the r.m.s.d. between fluctuation and distances
-            # compared with the target values.
-            vib_error = self.target["BONDS"] - vib_ic
-            vib_error = vib_error.apply(np.square).mean(axis=0)
-            vib_error = np.sqrt(vib_error)
-            self.error[self.error.columns[-2:]] = vib_error.T.values
-
-            # Calculate the new force constant.
-            optimized = vib_ic.apply(np.reciprocal).apply(np.square)
-            target = self.target["BONDS"].apply(np.reciprocal).apply(np.square)
-            optimized -= target
-            optimized *= self.BOLTZ * self.KFACTOR
-            vib_ic[bond_values[0]] = (self.parameters["BONDS"][bond_values[0]]
-                                      - optimized[bond_values[0]])
-            vib_ic[bond_values[0]] = (vib_ic[bond_values[0]].where(
-                vib_ic[bond_values[0]] >= 0., 0.))
-
-            # r.m.s.d. between previous and current force constant
-            diff = self.dynamic_params["BONDS"] - vib_ic
-            diff = diff.apply(np.square).mean(axis=0)
-            diff = np.sqrt(diff)
-            self.error[self.error.columns[1]] = diff.values[0]
-
-            # Update the parameters and write to file.
-            self.parameters["BONDS"][bond_values[0]] = (
-                vib_ic[bond_values[0]].copy(deep=True))
-            self.dynamic_params["BONDS"] = vib_ic.copy(deep=True)
-            self.parameters["BONDS"].reset_index(inplace=True)
-            self.dynamic_params["BONDS"].reset_index(inplace=True)
-            with mda.Writer(self.filenames["fixed_prm"], **self.kwargs) as prm:
-                prm.write(self.parameters)
-            with mda.Writer(self.filenames["dynamic_prm"],
-                            **self.kwargs) as prm:
-                prm.write(self.dynamic_params)
+        # Start a persistent CHARMM session, if requested.
+        with session.CharmmSession(charmm_exec,
+                                   self.filenames["charmm_log"]) as charmm:
+            if self.kwargs.get("session", False):
+                with self.metrics.phase("startup"):
+                    charmm.start(self._charmm_script(charmm_nma.session))
+            self._run_cycles(charmm, charmm_exec, state, fixed_prm, step,
+                             tol, n_cycles)
 
-            # Update the error values.
-            with open(self.filenames["error_data"], "ab") as error_file:
-                np.savetxt(
-                    error_file,
-                    self.error,
-                    fmt=native_str("%10d%10.6f%10.6f%10.6f", ),
-                    delimiter=native_str(""),
-                )
+        logger.info("Fluctuation matching completed in {:.6f}".format(
+            time.time() - st))
+
+        # Write the final parameters.
+        self._checkpoint(state)
+
+    def _run_cycles(self, charmm, charmm_exec, state, fixed_prm, step, tol,
+                    n_cycles):
+        """Run the fluctuation matching cycles with CHARMM.
+
+        Parameters
+        ----------
+        charmm : :class:`~fluctmatch.fluctmatch.session.CharmmSession`
+            CHARMM session, which is used if it has been started
+        charmm_exec : str
+            CHARMM executable file, which runs each cycle otherwise
+        state : :class:`~fluctmatch.fluctmatch.bondstate.BondState`
+            Bond parameters and targets
+        fixed_prm : :class:`~fluctmatch.fluctmatch.bondstate.BondParameterFile`
+            Parameter file that is updated each cycle
+        step : int
+            Last step of a previous run
+        tol : float
+            error tolerance
+        n_cycles : int
+            number of fluctuation matching cycles
+        """
+        use_session = charmm.is_running
+        if use_session:
+            cycle = self._charmm_script(charmm_nma.cycle)
+        for i in range(1, n_cycles + 1):
+            self.error["step"] = step + i
+            offset = (path.getsize(self.filenames["charmm_log"])
+                      if use_session else 0)
+            with self.metrics.phase("charmm"):
+                if use_session:
+                    # Measure this cycle of the session only.
+                    metrics.reset_child_rss(charmm.pid)
+                    before = metrics.process_cpu_time(charmm.pid)
+                    charmm.send(cycle)
+                    after = metrics.process_cpu_time(charmm.pid)
+                    rss = metrics.child_rss(charmm.pid)
+                    cpu = (None if before is None or after is None
+                           else after - before)
+                else:
+                    with open(self.filenames["charmm_log"], "w") as log_file:
+                        rss, cpu = metrics.check_call(
+                            [charmm_exec, "-i",
+                             self.filenames["charmm_input"]],
+                            stdout=log_file,
+                            stderr=subprocess.STDOUT,
+                        )
+            self.metrics.add_cpu("charmm", cpu)
+            n_steps = _minimization_steps(self.filenames["charmm_log"], offset)
+
+            with self.metrics.phase("read_ic"):
+                # Read the average bond distance.
+                with reader(self.filenames["avg_ic"]) as intcor:
+                    state.average = state.take(intcor.read())
+
+                # Read the bond fluctuations.
+                with reader(self.filenames["fluct_ic"]) as intcor:
+                    fluct = state.take(intcor.read())
+
+            with self.metrics.phase("update"):
+                # Calculate the r.m.s.d. between fluctuation and distances
+                # compared with the target values.
+                self.error["fluct_rms"] = np.sqrt(
+                    np.mean(np.square(state.target_fluct - fluct)))
+                self.error["b0_rms"] = np.sqrt(
+                    np.mean(np.square(state.target_avg - state.average)))
+
+                # Calculate the new force constant.
+                kb = self.kb_update.update(state.kb, fluct, state.target_fluct)
 
-            if (self.error[self.error.columns[1]] < tol).bool():
+                # r.m.s.d. between previous and current force constant
+                self.error["Kb_rms"] = np.sqrt(
+                    np.mean(np.square(kb - state.kb)))
+                state.kb = kb
+
+            with self.metrics.phase("write"):
+                # Update the force constants for the next cycle.
+                fixed_prm.write(state.kb, state.b0)
+
+                # Update the error values.
+                self._write_error_data()
+
+            converged = (self.error["Kb_rms"] < tol).bool()
+            if (not converged and self.checkpoint
+                    and i % self.checkpoint == 0):
+                with self.metrics.phase("checkpoint"):
+                    self._checkpoint(state)
+            self._finish_cycle(rss, minimization_steps=n_steps)
+            if converged:
                 break
 
-        logger.info("Fluctuation matching completed in {:.6f}".format(
-            time.time() - st))
-        self.target["BONDS"].reset_index(inplace=True)
+    def read_modes(self, cache=True):
+        """Read the normal modes of the last fluctuation matching cycle.
+
+        Parameters
+        ----------
+        cache : bool, optional
+            Use and create the cache files of
+            :func:`~fluctmatch.fluctmatch.vibrations.read_vib`
+
+        Returns
+        -------
+        frequencies : :class:`~numpy.ndarray`
+            Frequencies (in cm\\ :sup:`-1`) of the modes
+        eigenvectors : :class:`~numpy.ndarray`
+            Eigenvectors with shape (n_modes, 3 n_atoms)
+        masses : :class:`~numpy.ndarray`
+            Atomic masses
+        """
+        return vibrations.read_vib(self.filenames["nma_vib"], cache=cache)
 
     def calculate_thermo(self, nma_exec=None):
         """Calculate the thermodynamic properties of the trajectory.
 
+        The quasi-harmonic entropy, enthalpy, and heat capacity of each
+        residue are determined by CHARMM or, if the option `thermo` is
+        "python", by :mod:`~fluctmatch.fluctmatch.quasiharmonic`.
+
         Parameters
         ----------
         nma_exec : str
             executable file for normal mode analysis
         """
+        if self.kwargs.get("thermo", "charmm") == "python":
+            thermo = self._quasiharmonic_thermo()
+        else:
+            thermo = self._charmm_thermo(nma_exec)
+
+        # Write data to file
+        with open(self.filenames["thermo_data"], "wb") as data_file:
+            logger.info("Writing thermodynamics data file.")
+            thermo = thermo.to_csv(
+                index=True,
+                sep=native_str(" "),
+                float_format=native_str("%.4f"),
+                encoding="utf-8")
+            data_file.write(thermo.encode())
+
+    def _quasiharmonic_thermo(self):
+        """Calculate the thermodynamic properties with NumPy.
+
+        Returns
+        -------
+        :class:`~pandas.DataFrame`
+            Entropy, enthalpy, and heat capacity of each residue
+        """
+        universe = mda.Universe(self.filenames["xplor_psf_file"],
+                                self._thermo_trajectory())
+        reference = mda.Universe(self.filenames["xplor_psf_file"],
+                                 self.filenames["crd_file"])
+
+        logger.info("Calculating the covariance of the trajectory.")
+        covariance = quasiharmonic.Covariance(reference.atoms.positions)
+        start, stop = self.frames
+        for _ in universe.trajectory[start:stop]:
+            covariance.update(universe.atoms.positions)
+        frequencies, eigenvectors = quasiharmonic.modes(
+            covariance.covariance, universe.atoms.masses, self.temperature)
+        values = quasiharmonic.residue_thermodynamics(
+            eigenvectors, universe.atoms.resindices, frequencies,
+            self.temperature)
+        logger.info("Calculations completed.")
+
+        index = pd.MultiIndex.from_arrays(
+            [universe.residues.segids, universe.residues.resids],
+            names=["segidI", "resI"])
+        return pd.DataFrame(
+            values, index=index, columns=["Entropy", "Enthalpy", "Heatcap"])
+
+    def _charmm_thermo(self, nma_exec=None):
+        """Calculate the thermodynamic properties with CHARMM.
+
+        Parameters
+        ----------
+        nma_exec : str
+            executable file for normal mode analysis
+
+        Returns
+        -------
+        :class:`~pandas.DataFrame`
+            Entropy, enthalpy, and heat capacity of each residue
+        """
         # Find CHARMM executable
         charmm_exec = (os.environ.get("CHARMMEXEC", util.which("charmm"))
                        if nma_exec is None else nma_exec)
@@ -487,12 +986,12 @@ class CharmmFluctMatch(fmbase.FluctMatch):
                     self.filenames["thermo_input"], mode="wb") as charmm_file:
                 logger.info("Writing CHARMM input file.")
                 charmm_inp = charmm_thermo.thermodynamics.format(
-                    trajectory=path.join(self.outdir, self.args[-1]),
+                    trajectory=self._thermo_trajectory(),
                     temperature=self.temperature,
                     flex="flex" if version else "",
                     version=version,
                     dimension=dimension,
-                    **self.filenames)
+                    **dict(self.filenames, **self._charmm_frames()))
                 charmm_inp = textwrap.dedent(charmm_inp[1:])
                 charmm_file.write(charmm_inp.encode())
 
@@ -528,14 +1027,4 @@ class CharmmFluctMatch(fmbase.FluctMatch):
         thermo = pd.DataFrame(thermo, columns=columns)
         thermo.drop(["RESN", "Atm/res", "Ign.frq"], axis=1, inplace=True)
         thermo.set_index(["segidI", "resI"], inplace=True)
-        thermo = thermo.astype(np.float)
-
-        # Write data to file
-        with open(self.filenames["thermo_data"], "wb") as data_file:
-            logger.info("Writing thermodynamics data file.")
-            thermo = thermo.to_csv(
-                index=True,
-                sep=native_str(" "),
-                float_format=native_str("%.4f"),
-                encoding="utf-8")
-            data_file.write(thermo.encode())
+        return thermo.astype(np.float)
@@ -60,14 +60,18 @@ init = ("""
     ! trajectories are similar.
     ! Calculate the beginning and final times for a trajectory sequence.
     traj query unit @fileu
+
+    ! Steps of the first and last frames of the window
+    calc begin = ?START + {first_frame} * ?SKIP
+    calc stop = ?START + ( {last_frame} ) * ?SKIP
     
     ! Calculate internal coordinate average movement
-    ic dyna aver first @fileu nunit 1 skip ?SKIP
+    ic dyna aver first @fileu nunit 1 skip ?SKIP begin @begin stop @stop
     write ic card resid name {init_avg_ic}
     * Internal coordinate averages
     
     ! Calculate fluctuations in internal coordinate movement
-    ic dyna fluc first @fileu nunit 1 skip ?SKIP
+    ic dyna fluc first @fileu nunit 1 skip ?SKIP begin @begin stop @stop
     write ic card resid name {init_fluct_ic}
     * Internal coordinate fluctuations
     
@@ -49,15 +49,15 @@ nma = ("""
     endif
     read coor card name "{crd_file}"
     coor copy comp
+    read coor card name "{start_crd}"
 
     skip all excl bond
     update inbfrq 0
 
     ener
 
-    ! Minimize structure using steepest descent and ABNR
-    mini   sd nstep 100
-    mini abnr nstep 2000
+    ! Minimize structure
+    {minimize}
 
     coor orie rms mass
     scalar wmain copy mass
@@ -90,3 +90,80 @@ nma = ("""
 
     stop
     """)
+
+# Setup of a persistent CHARMM session. The topology and structure are read
+# once, and `cycle` is sent through standard input for every iteration.
+session = ("""
+    * Persistent normal mode analysis session for parameter fitting.
+    *
+
+    {dimension}
+
+    set version {version}
+    bomlev -5 ! This is for CHARMM 39
+
+    ! Additional information
+    set temp    {temperature}
+    set fileu   10
+    set fluctu  20
+    set vibu    30
+
+    ! Open CHARMM topology and parameter file
+    read rtf  card name "{topology_file}"
+    read para card {flex} name "{fixed_prm}"
+
+    ! Open PSF and coordinate files
+    if @version .ge. 39 then
+        read psf  card name "{xplor_psf_file}"
+    else
+        read psf  card name "{psf_file}"
+    endif
+    read coor card name "{crd_file}"
+    coor copy comp
+
+    skip all excl bond
+    update inbfrq 0
+
+    ioformat extended
+    stream "{stream_file}"
+
+    calc nmode   ?natom * 3
+
+    set nmodes   @nmode
+    set type     temp
+    """)
+
+cycle = ("""
+    ! Reload the parameters and the starting structure
+    read para card {flex} name "{fixed_prm}"
+    read coor card name "{start_crd}"
+    update inbfrq 0
+
+    ener
+
+    ! Minimize structure
+    {minimize}
+
+    coor orie rms mass
+    scalar wmain copy mass
+
+    write coor card name "{nma_crd}"
+
+    ic fill
+    write ic unit @fileu card resid name "{avg_ic}"
+
+    open write unit @fluctu card name "{fluct_ic}"
+    open write unit @vibu   card name "{nma_vib}"
+
+    ! Perform normal mode analysis at desired temperature for vibrational normal
+    ! modes
+    vibran nmode @nmodes
+        diag fini
+        fluc ic @type @temp tfre 0.0 mode 7 thru @nmodes
+        ic save
+        ic write unit @fluctu resid
+        write normal card mode 1 thru @nmodes unit @vibu
+    end
+    close unit @fluctu
+    close unit @vibu
+    """)
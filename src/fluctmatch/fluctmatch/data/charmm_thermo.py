@@ -60,12 +60,16 @@ thermodynamics = ("""
     ! are similar.
     traj query unit @fileu
 
+    ! Steps of the first and last frames of the window
+    calc begin = ?START + {first_frame} * ?SKIP
+    calc stop = ?START + ( {last_frame} ) * ?SKIP
+
     calc nmod = 3*?NATOM
     vibran nmodes @nmod
-        coor dyna sele all end nopr first @fileu nunit @ndcd begin ?START -
-            nskip ?SKIP orient sele all end
-        quasi first @fileu nunit @ndcd nskip ?SKIP begin ?START sele all end -
-            temp @temp thermo resi
+        coor dyna sele all end nopr first @fileu nunit @ndcd begin @begin -
+            stop @stop nskip ?SKIP orient sele all end
+        quasi first @fileu nunit @ndcd nskip ?SKIP begin @begin stop @stop -
+            sele all end temp @temp thermo resi
     end
     calc ts = ?stot * @temp
     close unit @fileu
@@ -0,0 +1,299 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+"""Per-cycle instrumentation of fluctuation matching.
+
+Each cycle of fluctuation matching is divided into phases (e.g., the CHARMM
+run, reading the internal coordinate files, and updating the force
+constants). :class:`CycleMetrics` records the wall and CPU time of each
+phase together with the peak memory of the normal mode calculation and the
+convergence metrics of the cycle. Each cycle is appended as one JSON object
+per line to a file and passed to an optional callback.
+
+The CPU time of a phase is that of the current process. The CPU time of a
+subprocess is measured on its own, either by :func:`check_call` for a
+CHARMM run per cycle or by :func:`process_cpu_time` before and after a
+cycle of a persistent CHARMM session, and added with
+:meth:`CycleMetrics.add_cpu`.
+"""
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.builtins import (
+    dict,
+    open,
+)
+from future.utils import native_str
+
+import contextlib
+import errno
+import json
+import logging
+import os
+import subprocess
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def _cpu_time():
+    """Return the CPU time of the current process."""
+    return sum(os.times()[:2])
+
+
+def self_rss():
+    """Peak resident set size of the current process.
+
+    Returns
+    -------
+    int or None
+        Peak resident set size (kB), if it can be determined
+    """
+    if resource is None:
+        return None
+    return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def child_rss(pid):
+    """Peak resident set size of a running subprocess.
+
+    Parameters
+    ----------
+    pid : int
+        Process ID of the subprocess
+
+    Returns
+    -------
+    int or None
+        Peak resident set size (kB) since the start of the subprocess or
+        the last :func:`reset_child_rss`, if it can be determined
+    """
+    try:
+        with open("/proc/{:d}/status".format(pid)) as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (IOError, OSError, ValueError):
+        pass
+    return None
+
+
+def reset_child_rss(pid):
+    """Reset the peak resident set size of a running subprocess.
+
+    Parameters
+    ----------
+    pid : int
+        Process ID of the subprocess
+    """
+    try:
+        with open("/proc/{:d}/clear_refs".format(pid), mode="w") as refs:
+            refs.write("5")
+    except (IOError, OSError):
+        pass
+
+
+def process_cpu_time(pid):
+    """CPU time of a running subprocess.
+
+    Parameters
+    ----------
+    pid : int
+        Process ID of the subprocess
+
+    Returns
+    -------
+    float or None
+        User and system time (s) of the subprocess, if it can be determined
+    """
+    try:
+        with open("/proc/{:d}/stat".format(pid)) as stat:
+            # The command name in parentheses may contain spaces, so the
+            # fields are counted from its end; utime and stime are the
+            # 14th and 15th fields.
+            fields = stat.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf(native_str("SC_CLK_TCK"))
+        return (int(fields[11]) + int(fields[12])) / ticks
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+
+
+def check_call(args, **kwargs):
+    """Run a command and measure the resources of that subprocess alone.
+
+    Unlike the resource usage of all finished subprocesses, the usage
+    reported by :func:`os.wait4` describes only this subprocess.
+
+    Parameters
+    ----------
+    args : list
+        Command and its arguments
+    kwargs
+        Keyword arguments of :class:`subprocess.Popen`
+
+    Returns
+    -------
+    rss : int or None
+        Peak resident set size (kB) of the subprocess, if it can be
+        determined
+    cpu : float or None
+        User and system time (s) of the subprocess, if it can be determined
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        If the command exits with a nonzero status
+    """
+    process = subprocess.Popen(args, **kwargs)
+    if not hasattr(os, "wait4"):
+        rss = cpu = None
+        returncode = process.wait()
+    else:
+        while True:
+            try:
+                _, status, usage = os.wait4(process.pid, 0)
+                break
+            except OSError as error:
+                if error.errno != errno.EINTR:
+                    raise
+        rss = int(usage.ru_maxrss)
+        cpu = usage.ru_utime + usage.ru_stime
+        if os.WIFSIGNALED(status):
+            returncode = -os.WTERMSIG(status)
+        else:
+            returncode = os.WEXITSTATUS(status)
+        process.returncode = returncode
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, args)
+    return rss, cpu
+
+
+class CycleMetrics(object):
+    """Record timings and convergence metrics of fluctuation matching cycles.
+
+    Phases are timed with :meth:`phase` and accumulate until :meth:`finish`
+    completes the cycle. The record of a cycle contains
+
+    ``step``
+        Cycle number
+    ``time``
+        Time stamp (seconds since the epoch) at the end of the cycle
+    ``wall``, ``cpu``
+        Wall and CPU time (s) since the end of the previous cycle
+    ``phases``
+        Wall and CPU time (s) of each phase
+    ``rss``
+        Peak resident set size (kB) of the normal mode calculation
+    ``Kb_rms``, ``fluct_rms``, ``b0_rms``
+        Convergence metrics
+
+    Parameters
+    ----------
+    filename : str, optional
+        File to which each record is appended as a JSON line
+    callback : callable, optional
+        Function called with each record (a dict)
+    """
+
+    def __init__(self, filename=None, callback=None):
+        self.filename = filename
+        self.callback = callback
+        self.reset()
+
+    def reset(self):
+        """Discard the phases recorded since the previous cycle."""
+        self._phases = dict()
+        self._wall = time.time()
+        self._cpu = _cpu_time()
+        self._child_cpu = 0.
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time a phase of the current cycle.
+
+        Parameters
+        ----------
+        name : str
+            Name of the phase. The time of repeated phases is added.
+        """
+        wall, cpu = time.time(), _cpu_time()
+        try:
+            yield
+        finally:
+            times = self._phases.setdefault(name, dict(wall=0., cpu=0.))
+            times["wall"] += time.time() - wall
+            times["cpu"] += _cpu_time() - cpu
+
+    def add_cpu(self, name, cpu):
+        """Add the CPU time of a subprocess to a phase of the current cycle.
+
+        Parameters
+        ----------
+        name : str
+            Name of the phase
+        cpu : float or None
+            CPU time (s) of the subprocess. Nothing is added if it is None.
+        """
+        if cpu is None:
+            return
+        times = self._phases.setdefault(name, dict(wall=0., cpu=0.))
+        times["cpu"] += cpu
+        self._child_cpu += cpu
+
+    def finish(self, step, rss=None, **values):
+        """Complete a cycle.
+
+        Parameters
+        ----------
+        step : int
+            Cycle number
+        rss : int, optional
+            Peak resident set size (kB)
+        values
+            Additional metrics (e.g., `Kb_rms`)
+
+        Returns
+        -------
+        dict
+            Record of the cycle
+        """
+        now = time.time()
+        record = dict(
+            step=int(step),
+            time=now,
+            wall=now - self._wall,
+            cpu=_cpu_time() - self._cpu + self._child_cpu,
+            phases=self._phases,
+            rss=rss,
+        )
+        record.update({key: float(value) for key, value in values.items()})
+
+        if self.filename is not None:
+            with open(self.filename, mode="a") as metrics:
+                metrics.write(json.dumps(record, sort_keys=True) + "\n")
+        if self.callback is not None:
+            self.callback(record)
+        self.reset()
+        return record
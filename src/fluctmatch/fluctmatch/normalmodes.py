@@ -0,0 +1,471 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+"""Normal mode analysis of an elastic network model using NumPy.
+
+The potential energy follows the CHARMM convention for harmonic bonds,
+:math:`V = \\sum K_b (r - b_0)^2`, so that the force constants and
+equilibrium distances from a CHARMM parameter file can be used directly.
+"""
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import logging
+
+import numpy as np
+from scipy import (
+    linalg,
+    optimize,
+    sparse,
+    spatial,
+)
+from scipy.sparse import linalg as splinalg
+
+logger = logging.getLogger(__name__)
+
+
+def bond_vectors(positions, bonds):
+    """Calculate the bond vectors and bond lengths.
+
+    Parameters
+    ----------
+    positions : :class:`~numpy.ndarray`
+        Coordinates with shape (n_atoms, 3)
+    bonds : :class:`~numpy.ndarray`
+        Atom indices of each bond with shape (n_bonds, 2)
+
+    Returns
+    -------
+    vectors : :class:`~numpy.ndarray`
+        Vectors from atom I to atom J with shape (n_bonds, 3)
+    lengths : :class:`~numpy.ndarray`
+        Bond lengths
+    """
+    vectors = positions[bonds[:, 1]] - positions[bonds[:, 0]]
+    lengths = np.linalg.norm(vectors, axis=1)
+    return vectors, lengths
+
+
+def energy(coordinates, bonds, kb, b0):
+    """Calculate the bond energy and its gradient.
+
+    Parameters
+    ----------
+    coordinates : :class:`~numpy.ndarray`
+        Flattened coordinates with shape (3 * n_atoms,)
+    bonds : :class:`~numpy.ndarray`
+        Atom indices of each bond with shape (n_bonds, 2)
+    kb : :class:`~numpy.ndarray`
+        Force constants (kcal/mol/A^2)
+    b0 : :class:`~numpy.ndarray`
+        Equilibrium distances (A)
+
+    Returns
+    -------
+    float
+        Potential energy (kcal/mol)
+    :class:`~numpy.ndarray`
+        Flattened gradient of the potential energy
+    """
+    positions = coordinates.reshape((-1, 3))
+    vectors, lengths = bond_vectors(positions, bonds)
+    dr = lengths - b0
+    force = (2. * kb * dr / lengths)[:, np.newaxis] * vectors
+
+    gradient = np.zeros_like(positions)
+    np.add.at(gradient, bonds[:, 1], force)
+    np.add.at(gradient, bonds[:, 0], -force)
+    return np.sum(kb * np.square(dr)), gradient.ravel()
+
+
+def minimize(positions, bonds, kb, b0, maxiter=2000, gtol=1.e-4):
+    """Minimize the elastic network using L-BFGS.
+
+    Parameters
+    ----------
+    positions : :class:`~numpy.ndarray`
+        Initial coordinates with shape (n_atoms, 3)
+    bonds : :class:`~numpy.ndarray`
+        Atom indices of each bond with shape (n_bonds, 2)
+    kb : :class:`~numpy.ndarray`
+        Force constants (kcal/mol/A^2)
+    b0 : :class:`~numpy.ndarray`
+        Equilibrium distances (A)
+    maxiter : int, optional
+        Maximum number of minimization steps
+    gtol : float, optional
+        Convergence criterion for the largest gradient component
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Minimized coordinates
+    int
+        Number of minimization steps
+    """
+    result = optimize.minimize(
+        energy,
+        np.asarray(positions, dtype=np.float64).ravel(),
+        args=(bonds, kb, b0),
+        jac=True,
+        method="L-BFGS-B",
+        options=dict(maxiter=maxiter, gtol=gtol),
+    )
+    return result.x.reshape((-1, 3)), result.nit
+
+
+def hessian(positions, bonds, kb, b0, dense=True):
+    """Construct the Hessian of the elastic network.
+
+    Parameters
+    ----------
+    positions : :class:`~numpy.ndarray`
+        Coordinates with shape (n_atoms, 3)
+    bonds : :class:`~numpy.ndarray`
+        Atom indices of each bond with shape (n_bonds, 2)
+    kb : :class:`~numpy.ndarray`
+        Force constants (kcal/mol/A^2)
+    b0 : :class:`~numpy.ndarray`
+        Equilibrium distances (A)
+    dense : bool, optional
+        Return a :class:`~numpy.ndarray` rather than a sparse matrix
+
+    Returns
+    -------
+    The (3 * n_atoms, 3 * n_atoms) Hessian
+    """
+    n_dim = 3 * positions.shape[0]
+    vectors, lengths = bond_vectors(positions, bonds)
+    unit = vectors / lengths[:, np.newaxis]
+    outer = unit[:, :, np.newaxis] * unit[:, np.newaxis, :]
+    blocks = outer + ((1. - b0 / lengths)[:, np.newaxis, np.newaxis] *
+                      (np.eye(3) - outer))
+    blocks *= 2. * kb[:, np.newaxis, np.newaxis]
+
+    # Each bond contributes +block to the diagonal and -block to the
+    # off-diagonal 3x3 submatrices of atoms I and J.
+    xyz = np.arange(3)
+    atom_i = 3 * bonds[:, 0, np.newaxis] + xyz
+    atom_j = 3 * bonds[:, 1, np.newaxis] + xyz
+    rows, cols, data = [], [], []
+    for a, b, sign in ((atom_i, atom_i, 1.), (atom_j, atom_j, 1.),
+                       (atom_i, atom_j, -1.), (atom_j, atom_i, -1.)):
+        rows.append(np.repeat(a, 3, axis=1).ravel())
+        cols.append(np.tile(b, 3).ravel())
+        data.append(sign * blocks.ravel())
+    matrix = sparse.coo_matrix(
+        (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(n_dim, n_dim))
+    return matrix.toarray() if dense else matrix.tocsc()
+
+
+def rigid_body_modes(positions):
+    """Calculate an orthonormal basis of the translations and rotations.
+
+    Parameters
+    ----------
+    positions : :class:`~numpy.ndarray`
+        Coordinates with shape (n_atoms, 3)
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Rigid-body modes with shape (3 * n_atoms, 6)
+    """
+    n_atoms = positions.shape[0]
+    centered = positions - positions.mean(axis=0)
+    modes = np.zeros((6, n_atoms, 3))
+    for k, axis in enumerate(np.eye(3)):
+        modes[k] = axis
+        modes[k + 3] = np.cross(axis, centered)
+    modes, _ = linalg.qr(modes.reshape((6, -1)).T, mode="economic")
+    return modes
+
+
+def covariance(hess, n_modes=6):
+    """Calculate the pseudo-inverse of the Hessian.
+
+    Parameters
+    ----------
+    hess : :class:`~numpy.ndarray`
+        The Hessian of the elastic network
+    n_modes : int, optional
+        Number of rigid-body modes to discard
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        The pseudo-inverse of the Hessian (A^2 mol/kcal)
+    """
+    eigenvalues, eigenvectors = linalg.eigh(hess)
+    eigenvalues = eigenvalues[n_modes:]
+    eigenvectors = eigenvectors[:, n_modes:]
+    return np.dot(eigenvectors / eigenvalues, eigenvectors.T)
+
+
+def bond_fluctuations(cov, positions, bonds, kt):
+    """Calculate the bond-length fluctuations from the covariance matrix.
+
+    Parameters
+    ----------
+    cov : :class:`~numpy.ndarray`
+        Pseudo-inverse of the Hessian
+    positions : :class:`~numpy.ndarray`
+        Coordinates with shape (n_atoms, 3)
+    bonds : :class:`~numpy.ndarray`
+        Atom indices of each bond with shape (n_bonds, 2)
+    kt : float
+        Thermal energy (kcal/mol)
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Bond fluctuations (A)
+    """
+    vectors, lengths = bond_vectors(positions, bonds)
+    unit = vectors / lengths[:, np.newaxis]
+    n_atoms = positions.shape[0]
+    cov = cov.reshape((n_atoms, 3, n_atoms, 3))
+    i, j = bonds.T
+    block = (cov[i, :, i, :] + cov[j, :, j, :] - cov[i, :, j, :] -
+             cov[j, :, i, :])
+    variance = np.einsum("bi,bij,bj->b", unit, block, unit)
+    return np.sqrt(kt * np.clip(variance, 0., None))
+
+
+def bond_pairs(positions, bonds, cutoff):
+    """Find the pairs of bonds whose midpoints are within a cutoff.
+
+    Parameters
+    ----------
+    positions : :class:`~numpy.ndarray`
+        Coordinates with shape (n_atoms, 3)
+    bonds : :class:`~numpy.ndarray`
+        Atom indices of each bond with shape (n_bonds, 2)
+    cutoff : float
+        Maximum distance between the bond midpoints (A)
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Bond indices (a, b) with a < b and shape (n_pairs, 2)
+    """
+    midpoints = 0.5 * (positions[bonds[:, 0]] + positions[bonds[:, 1]])
+    pairs = sorted(spatial.cKDTree(midpoints).query_pairs(cutoff))
+    return np.array(pairs, dtype=np.int64).reshape((-1, 2))
+
+
+def _pair_covariance(block, positions, bonds, pairs, kt):
+    """Project the atomic covariance onto pairs of bonds.
+
+    Parameters
+    ----------
+    block : :class:`~numpy.ndarray`
+        Combined covariance blocks (Ia, Ib) + (Ja, Jb) - (Ia, Jb) - (Ja, Ib)
+        of each pair with shape (n_pairs, 3, 3)
+    positions : :class:`~numpy.ndarray`
+        Coordinates with shape (n_atoms, 3)
+    bonds : :class:`~numpy.ndarray`
+        Atom indices of each bond with shape (n_bonds, 2)
+    pairs : :class:`~numpy.ndarray`
+        Bond indices with shape (n_pairs, 2)
+    kt : float
+        Thermal energy (kcal/mol)
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Covariance between the bond lengths of each pair (A^2)
+    """
+    vectors, lengths = bond_vectors(positions, bonds)
+    unit = vectors / lengths[:, np.newaxis]
+    a, b = pairs.T
+    return kt * np.einsum("bi,bij,bj->b", unit[a], block, unit[b])
+
+
+def bond_covariance(cov, positions, bonds, kt, pairs):
+    """Calculate the covariance between the lengths of pairs of bonds.
+
+    The covariance of two bond lengths gives the sensitivity of the bond
+    fluctuations to the force constants,
+    :math:`\\partial \\langle \\Delta r_a^2 \\rangle / \\partial K_b =
+    -2 \\langle \\Delta r_a \\Delta r_b \\rangle^2 / k_B T`.
+
+    Parameters
+    ----------
+    cov : :class:`~numpy.ndarray`
+        Pseudo-inverse of the Hessian
+    positions : :class:`~numpy.ndarray`
+        Coordinates with shape (n_atoms, 3)
+    bonds : :class:`~numpy.ndarray`
+        Atom indices of each bond with shape (n_bonds, 2)
+    kt : float
+        Thermal energy (kcal/mol)
+    pairs : :class:`~numpy.ndarray`
+        Bond indices with shape (n_pairs, 2)
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Covariance between the bond lengths of each pair (A^2)
+    """
+    n_atoms = positions.shape[0]
+    cov = cov.reshape((n_atoms, 3, n_atoms, 3))
+    ia, ja = bonds[pairs[:, 0]].T
+    ib, jb = bonds[pairs[:, 1]].T
+    block = (cov[ia, :, ib, :] + cov[ja, :, jb, :] - cov[ia, :, jb, :] -
+             cov[ja, :, ib, :])
+    return _pair_covariance(block, positions, bonds, pairs, kt)
+
+
+def sparse_bond_fluctuations(hess,
+                             positions,
+                             bonds,
+                             kt,
+                             batch_size=None,
+                             pairs=None):
+    """Calculate the bond-length fluctuations from a sparse Hessian.
+
+    The six rigid-body degrees of freedom are removed by fixing the
+    Cartesian components that best span the translations and rotations. The
+    remaining Hessian is nonsingular, and because bond lengths are invariant
+    to rigid-body motion, its inverse yields the same bond fluctuations as the
+    pseudo-inverse of the full Hessian. Only the 3x3 blocks of the inverse
+    needed by each bond are kept, so the memory scales with the number of
+    bonds rather than with the square of the number of atoms.
+
+    The time does not scale with the number of bonds: the factorized Hessian
+    is solved for the three unit columns of every atom, which costs the
+    number of atoms times the fill of the factor. An atom without bonds
+    would make the Hessian singular, so every column is needed, and solving
+    once per bond instead would take more solves because an elastic network
+    has several bonds per atom.
+
+    Parameters
+    ----------
+    hess : :class:`~scipy.sparse.spmatrix`
+        The Hessian of the elastic network
+    positions : :class:`~numpy.ndarray`
+        Coordinates with shape (n_atoms, 3)
+    bonds : :class:`~numpy.ndarray`
+        Atom indices of each bond with shape (n_bonds, 2)
+    kt : float
+        Thermal energy (kcal/mol)
+    batch_size : int, optional
+        Number of atoms solved simultaneously. By default, the batch is chosen
+        to keep the workspace below 256 MB.
+    pairs : :class:`~numpy.ndarray`, optional
+        Bond indices with shape (n_pairs, 2) for which the covariance between
+        the bond lengths is also determined
+
+    Returns
+    -------
+    fluct : :class:`~numpy.ndarray`
+        Bond fluctuations (A)
+    coupling : :class:`~numpy.ndarray`
+        Covariance between the bond lengths of each pair (A^2), if `pairs`
+        is given
+    """
+    n_atoms = positions.shape[0]
+    n_dim = 3 * n_atoms
+    if batch_size is None:
+        batch_size = max(1, min(n_atoms, 2**25 // (3 * n_dim)))
+
+    # Fix the six Cartesian components spanning the rigid-body modes.
+    modes = rigid_body_modes(positions)
+    _, _, pivots = linalg.qr(modes.T, mode="economic", pivoting=True)
+    free = np.setdiff1d(np.arange(n_dim), pivots[:6])
+    index = np.full(n_dim, -1, dtype=np.int64)
+    index[free] = np.arange(free.size)
+
+    hess = sparse.csr_matrix(hess)[free][:, free]
+    try:
+        lu = splinalg.splu(
+            hess.tocsc(),
+            permc_spec=str("MMD_AT_PLUS_A"),
+            diag_pivot_thresh=0.,
+            options=dict(SymmetricMode=True))
+    except RuntimeError:
+        logger.exception("The elastic network has more than six zero modes.")
+        raise
+
+    xyz = np.arange(3)
+    order = np.argsort(bonds[:, 0], kind="mergesort")
+    first = np.searchsorted(bonds[order, 0], np.arange(n_atoms + 1))
+    diagonal = np.zeros((n_atoms, 3, 3))
+    offdiagonal = np.zeros((bonds.shape[0], 3, 3))
+
+    # Atom pairs (p, q) whose blocks are needed for the bond pairs
+    if pairs is not None:
+        a, b = pairs.T
+        atom_pairs = np.concatenate([
+            np.stack([bonds[a, m], bonds[b, n]], axis=1)
+            for m in range(2) for n in range(2)
+        ])
+        pair_order = np.argsort(atom_pairs[:, 1], kind="mergesort")
+        pair_first = np.searchsorted(atom_pairs[pair_order, 1],
+                                     np.arange(n_atoms + 1))
+        pair_blocks = np.zeros((atom_pairs.shape[0], 3, 3))
+    for start in range(0, n_atoms, batch_size):
+        stop = min(start + batch_size, n_atoms)
+        columns = np.arange(3 * start, 3 * stop)
+        rows = index[columns]
+        rhs = np.zeros((free.size, columns.size))
+        rhs[rows[rows >= 0], np.where(rows >= 0)[0]] = 1.
+        solution = np.zeros((n_dim, columns.size))
+        solution[free] = lu.solve(rhs)
+
+        # Blocks (I, I) of the atoms in the batch
+        atoms = np.arange(start, stop)
+        rows = 3 * atoms[:, np.newaxis, np.newaxis] + xyz[:, np.newaxis]
+        local = 3 * (atoms - start)[:, np.newaxis, np.newaxis] + xyz
+        diagonal[atoms] = solution[rows, local]
+
+        # Blocks (J, I) of the bonds whose first atom is in the batch
+        selected = order[first[start]:first[stop]]
+        i, j = bonds[selected].T
+        rows = 3 * j[:, np.newaxis, np.newaxis] + xyz[:, np.newaxis]
+        local = 3 * (i - start)[:, np.newaxis, np.newaxis] + xyz
+        offdiagonal[selected] = solution[rows, local]
+
+        # Blocks (P, Q) of the atom pairs whose second atom is in the batch
+        if pairs is not None:
+            selected = pair_order[pair_first[start]:pair_first[stop]]
+            p, q = atom_pairs[selected].T
+            rows = 3 * p[:, np.newaxis, np.newaxis] + xyz[:, np.newaxis]
+            local = 3 * (q - start)[:, np.newaxis, np.newaxis] + xyz
+            pair_blocks[selected] = solution[rows, local]
+
+    vectors, lengths = bond_vectors(positions, bonds)
+    unit = vectors / lengths[:, np.newaxis]
+    i, j = bonds.T
+    variance = (np.einsum("bi,bij,bj->b", unit, diagonal[i], unit) +
+                np.einsum("bi,bij,bj->b", unit, diagonal[j], unit) -
+                2. * np.einsum("bi,bij,bj->b", unit, offdiagonal, unit))
+    fluct = np.sqrt(kt * np.clip(variance, 0., None))
+    if pairs is None:
+        return fluct
+
+    # The blocks were stored in the order (Ia, Ib), (Ia, Jb), (Ja, Ib),
+    # (Ja, Jb).
+    pair_blocks = pair_blocks.reshape((4, -1, 3, 3))
+    block = pair_blocks[0] - pair_blocks[1] - pair_blocks[2] + pair_blocks[3]
+    return fluct, _pair_covariance(block, positions, bonds, pairs, kt)
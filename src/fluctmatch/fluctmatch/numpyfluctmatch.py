@@ -0,0 +1,310 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+"""Fluctuation matching using an in-process normal mode analysis.
+
+The elastic network is minimized and diagonalized with NumPy/SciPy, so no
+CHARMM process is started and no parameter or internal coordinate files are
+exchanged between cycles. The file layout is identical to
+:class:`~fluctmatch.fluctmatch.charmmfluctmatch.CharmmFluctMatch`, and the
+parameter and internal coordinate files are written once the
+self-consistent iteration finishes.
+
+"""
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.builtins import (
+    range,
+    super,
+)
+from future.utils import raise_with_traceback
+
+import logging
+import time
+from os import path
+
+import numpy as np
+import pandas as pd
+import MDAnalysis as mda
+from scipy import sparse
+from fluctmatch.fluctmatch import bondstate
+from fluctmatch.fluctmatch import charmmfluctmatch
+from fluctmatch.fluctmatch import metrics
+from fluctmatch.fluctmatch import normalmodes
+
+logger = logging.getLogger(__name__)
+
+
+class NumpyFluctMatch(charmmfluctmatch.CharmmFluctMatch):
+    """Fluctuation matching using NumPy for the normal mode analysis."""
+
+    def __init__(self, *args, **kwargs):
+        """Initialization of fluctuation matching using NumPy.
+
+        Accepts the same arguments as
+        :class:`~fluctmatch.fluctmatch.charmmfluctmatch.CharmmFluctMatch`.
+
+        Parameters
+        ----------
+        maxiter
+            Maximum number of minimization steps per cycle (default: 2000)
+        gtol
+            Gradient tolerance of the minimization (default: 1e-4)
+        minimize
+            Start the minimization of each cycle from the "average"
+            structure or from the minimized structure of the "previous"
+            cycle (default: "average")
+        solver
+            "dense" diagonalizes the full Hessian; "sparse" factorizes a
+            sparse Hessian and only determines the covariance needed for the
+            bond fluctuations (default: "dense"). The memory of "sparse"
+            scales with the number of bonds, but it solves for every atom,
+            so its time scales with the number of atoms.
+        batch_size
+            Number of atoms solved simultaneously with the sparse solver
+        newton_cutoff
+            Maximum distance between bond midpoints for which the covariance
+            between the bond lengths enters the "newton" update
+            (default: 10.0)
+        init
+            Calculate the target bond averages and fluctuations with
+            "charmm" or "python", or read them from existing files with
+            "file" (default: "python")
+        thermo
+            Calculate the thermodynamic properties with "charmm" or "python"
+            (default: "python")
+        """
+        kwargs.setdefault("init", "python")
+        kwargs.setdefault("thermo", "python")
+        super().__init__(*args, **kwargs)
+        self._maxiter = kwargs.get("maxiter", 2000)
+        self._gtol = kwargs.get("gtol", 1.e-4)
+        self._solver = kwargs.get("solver", "dense").lower()
+        self._batch_size = kwargs.get("batch_size")
+        self._newton_cutoff = kwargs.get("newton_cutoff", 10.0)
+        if self._solver not in ("dense", "sparse"):
+            raise ValueError("The solver must be either 'dense' or 'sparse'.")
+        self.universe = None
+        self.bonds = None
+        self.positions = None
+        self.start = None
+        self.minimization_steps = 0
+        self.pairs = None
+        self.coupling = None
+
+    def _load_network(self):
+        """Load the average structure and the bond indices."""
+        self.universe = mda.Universe(self.filenames["xplor_psf_file"],
+                                     self.filenames["crd_file"])
+        atoms = pd.Series(
+            np.arange(self.universe.atoms.n_atoms),
+            index=self.universe.atoms.names)
+        self.bonds = np.stack(
+            [
+                atoms[self.target["BONDS"]["I"]].values,
+                atoms[self.target["BONDS"]["J"]].values,
+            ],
+            axis=1)
+        self.positions = self.universe.atoms.positions.astype(np.float64)
+        self.start = self.positions
+        if (self.minimize == "previous"
+                and path.exists(self.filenames["nma_crd"])):
+            self.start = mda.Universe(
+                self.filenames["xplor_psf_file"],
+                self.filenames["nma_crd"]).atoms.positions.astype(np.float64)
+        if self.kb_update.sensitivities:
+            self.pairs = normalmodes.bond_pairs(self.positions, self.bonds,
+                                                self._newton_cutoff)
+
+    def normal_modes(self, kb, b0):
+        """Calculate the bond fluctuations and average distances.
+
+        Parameters
+        ----------
+        kb : :class:`~numpy.ndarray`
+            Force constants in the bond order of the target table
+        b0 : :class:`~numpy.ndarray`
+            Equilibrium distances in the bond order of the target table
+
+        Returns
+        -------
+        fluct : :class:`~numpy.ndarray`
+            Bond fluctuations
+        average : :class:`~numpy.ndarray`
+            Bond distances of the minimized structure
+
+        Notes
+        -----
+        The minimization, the assembly of the Hessian, and its
+        diagonalization or factorization are timed as the phases
+        "minimize", "hessian", and "solve" of the current cycle.
+
+        If the force constant update uses sensitivities, the covariance
+        between the lengths of the bond pairs within `newton_cutoff` is
+        stored as a sparse symmetric matrix in :attr:`coupling`.
+        """
+        with self.metrics.phase("minimize"):
+            positions, self.minimization_steps = normalmodes.minimize(
+                self.start,
+                self.bonds,
+                kb,
+                b0,
+                maxiter=self._maxiter,
+                gtol=self._gtol)
+        coupling = None
+        if self._solver == "sparse":
+            with self.metrics.phase("hessian"):
+                hessian = normalmodes.hessian(
+                    positions, self.bonds, kb, b0, dense=False)
+            with self.metrics.phase("solve"):
+                fluct = normalmodes.sparse_bond_fluctuations(
+                    hessian,
+                    positions,
+                    self.bonds,
+                    self.BOLTZ,
+                    batch_size=self._batch_size,
+                    pairs=self.pairs)
+            if self.pairs is not None:
+                fluct, coupling = fluct
+        else:
+            with self.metrics.phase("hessian"):
+                hessian = normalmodes.hessian(positions, self.bonds, kb, b0)
+            with self.metrics.phase("solve"):
+                cov = normalmodes.covariance(hessian)
+                fluct = normalmodes.bond_fluctuations(cov, positions,
+                                                      self.bonds, self.BOLTZ)
+                if self.pairs is not None:
+                    coupling = normalmodes.bond_covariance(
+                        cov, positions, self.bonds, self.BOLTZ, self.pairs)
+        if coupling is not None:
+            n_bonds = self.bonds.shape[0]
+            coupling = sparse.coo_matrix(
+                (coupling, (self.pairs[:, 0], self.pairs[:, 1])),
+                shape=(n_bonds, n_bonds))
+            self.coupling = (coupling + coupling.T).tocsr()
+        _, average = normalmodes.bond_vectors(positions, self.bonds)
+        self.universe.atoms.positions = positions
+        if self.minimize == "previous":
+            self.start = positions
+        return fluct, average
+
+    def run(self, nma_exec=None, tol=1.e-4, n_cycles=250):
+        """Perform a self-consistent fluctuation matching.
+
+        Parameters
+        ----------
+        nma_exec : str
+            executable file for the initialization, if required
+        tol : float, optional
+            error tolerance
+        n_cycles : int, optional
+            number of fluctuation matching cycles
+        """
+        # Read the parameters
+        if not self.parameters:
+            try:
+                self.initialize(nma_exec, restart=True)
+            except IOError:
+                raise_with_traceback(
+                    (IOError("Some files are missing. Unable to restart.")))
+        self._load_network()
+
+        # Arrange the force constants in the same order as the targets.
+        state = bondstate.BondState.from_tables(
+            self.parameters["BONDS"], self.target["BONDS"], self.bond_def)
+        state.average = self.dynamic_params["BONDS"].set_index(
+            self.bond_def).reindex(state.index)["b0"].values
+
+        # Check for restart.
+        self._read_error_data()
+        step = self.error["step"].values[0]
+
+        # Run simulation
+        logger.info("Starting fluctuation matching")
+        logger.info("Force constant update: {}".format(self.kb_update))
+        st = time.time()
+        self.metrics.reset()
+
+        for i in range(1, n_cycles + 1):
+            self.error["step"] = step + i
+            fluct, state.average = self.normal_modes(state.kb, state.b0)
+
+            with self.metrics.phase("update"):
+                # Calculate the r.m.s.d. between fluctuation and distances
+                # compared with the target values.
+                self.error["fluct_rms"] = np.sqrt(
+                    np.mean(np.square(state.target_fluct - fluct)))
+                self.error["b0_rms"] = np.sqrt(
+                    np.mean(np.square(state.target_avg - state.average)))
+
+                # Calculate the new force constant.
+                kb = self.kb_update.update(
+                    state.kb, fluct, state.target_fluct,
+                    coupling=self.coupling)
+
+                # r.m.s.d. between previous and current force constant
+                self.error["Kb_rms"] = np.sqrt(
+                    np.mean(np.square(kb - state.kb)))
+                state.kb = kb
+
+            # Update the error values.
+            with self.metrics.phase("write"):
+                self._write_error_data()
+
+            converged = (self.error["Kb_rms"] < tol).bool()
+            if not converged and self.checkpoint and i % self.checkpoint == 0:
+                with self.metrics.phase("checkpoint"):
+                    self._checkpoint(state)
+            self._finish_cycle(
+                metrics.self_rss(),
+                minimization_steps=self.minimization_steps)
+            if converged:
+                break
+
+        logger.info("Fluctuation matching completed in {:.6f}".format(
+            time.time() - st))
+
+        # Update the parameters and write to file.
+        self._checkpoint(state)
+        self._write_results(fluct, state.average)
+
+    def _write_results(self, fluct, average):
+        """Write the internal coordinate and coordinate files.
+
+        Parameters
+        ----------
+        fluct : :class:`~numpy.ndarray`
+            Bond fluctuations
+        average : :class:`~numpy.ndarray`
+            Bond distances of the minimized structure
+        """
+        for key, values in (("avg_ic", average), ("fluct_ic", fluct)):
+            data = self.target["BONDS"][self.bond_def].copy(deep=True)
+            data["r_IJ"] = values
+            table = self._create_ic_table(self.universe, data)
+            with mda.Writer(self.filenames[key], **self.kwargs) as ic:
+                logger.info("Writing {}...".format(self.filenames[key]))
+                ic.write(table)
+
+        with mda.Writer(self.filenames["nma_crd"], dt=1.0,
+                        **self.kwargs) as crd:
+            logger.info("Writing {}...".format(self.filenames["nma_crd"]))
+            crd.write(self.universe.atoms)
@@ -0,0 +1,229 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+"""Quasi-harmonic thermodynamics of a coarse-grain trajectory.
+
+The frames are superimposed onto a reference structure, and the
+mass-weighted covariance of the coordinates is accumulated in one pass
+through the trajectory. Each eigenvalue :math:`\\lambda_k` of the
+mass-weighted covariance defines a quasi-harmonic frequency
+:math:`\\omega_k = \\sqrt{k_B T / \\lambda_k}`, whose entropy, enthalpy, and
+heat capacity are those of a quantum harmonic oscillator. As in the
+``thermo resi`` option of CHARMM, the contribution of each mode is divided
+among the residues according to the squared amplitudes of its eigenvector.
+
+Energies are given in kcal/mol, and entropies and heat capacities in
+kcal/(mol K).
+"""
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+import logging
+
+import numpy as np
+from scipy import (
+    constants,
+    linalg,
+    sparse,
+)
+
+logger = logging.getLogger(__name__)
+
+#: Gas constant in kcal/(mol K)
+R = constants.R / (constants.calorie * constants.kilo)
+
+
+def superpose(positions, reference):
+    """Superimpose coordinates onto a reference structure.
+
+    Parameters
+    ----------
+    positions : :class:`~numpy.ndarray`
+        Coordinates with shape (n_atoms, 3)
+    reference : :class:`~numpy.ndarray`
+        Reference coordinates with shape (n_atoms, 3)
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Coordinates translated and rotated to minimize the r.m.s.d. from the
+        reference
+    """
+    mobile = positions - positions.mean(axis=0)
+    center = reference.mean(axis=0)
+    u, _, vt = linalg.svd(np.dot(mobile.T, reference - center))
+    if linalg.det(np.dot(u, vt)) < 0.:
+        u[:, -1] = -u[:, -1]
+    return np.dot(mobile, np.dot(u, vt)) + center
+
+
+class Covariance(object):
+    """Covariance of the superimposed coordinates of a trajectory.
+
+    The displacements from the reference structure are collected in blocks
+    of frames, and each block is added to the sums as one matrix product.
+
+    Parameters
+    ----------
+    reference : :class:`~numpy.ndarray`
+        Reference coordinates with shape (n_atoms, 3)
+    block_size : int, optional
+        Number of frames per block
+    """
+
+    def __init__(self, reference, block_size=100):
+        self.reference = np.asarray(reference, dtype=np.float64)
+        size = self.reference.size
+        self.n_frames = 0
+        self._sum = np.zeros(size)
+        self._sumsq = np.zeros((size, size))
+        self._block = np.empty((block_size, size))
+        self._count = 0
+
+    def update(self, positions):
+        """Add a frame.
+
+        Parameters
+        ----------
+        positions : :class:`~numpy.ndarray`
+            Coordinates with shape (n_atoms, 3)
+        """
+        positions = superpose(
+            np.asarray(positions, dtype=np.float64), self.reference)
+        self._block[self._count] = (positions - self.reference).ravel()
+        self._count += 1
+        self.n_frames += 1
+        if self._count == self._block.shape[0]:
+            self._flush()
+
+    def _flush(self):
+        block = self._block[:self._count]
+        self._sum += block.sum(axis=0)
+        self._sumsq += np.dot(block.T, block)
+        self._count = 0
+
+    @property
+    def mean(self):
+        """Average coordinates with shape (n_atoms, 3)."""
+        self._flush()
+        return (self.reference.ravel() + self._sum / self.n_frames).reshape(
+            self.reference.shape)
+
+    @property
+    def covariance(self):
+        """Covariance matrix of the coordinates (3 n_atoms, 3 n_atoms)."""
+        self._flush()
+        mean = self._sum / self.n_frames
+        return self._sumsq / self.n_frames - np.outer(mean, mean)
+
+
+def modes(covariance, masses, temperature=300.):
+    """Determine the quasi-harmonic modes.
+
+    Parameters
+    ----------
+    covariance : :class:`~numpy.ndarray`
+        Covariance matrix of the coordinates (in Å\\ :sup:`2`)
+    masses : :class:`~numpy.ndarray`
+        Atomic masses (in amu)
+    temperature : float, optional
+        Temperature (in K)
+
+    Returns
+    -------
+    frequencies : :class:`~numpy.ndarray`
+        Frequencies (in cm\\ :sup:`-1`) in ascending order; modes without
+        fluctuation have an infinite frequency.
+    eigenvectors : :class:`~numpy.ndarray`
+        Normalized eigenvectors of the mass-weighted covariance in the
+        columns
+    """
+    weights = np.sqrt(np.repeat(masses, 3))
+    covariance = covariance * np.outer(weights, weights)
+    eigenvalues, eigenvectors = linalg.eigh(covariance)
+    eigenvalues, eigenvectors = eigenvalues[::-1], eigenvectors[:, ::-1]
+
+    # Eigenvalues near zero belong to the rigid-body motions removed by the
+    # superposition.
+    eigenvalues = eigenvalues * constants.atomic_mass * constants.angstrom**2
+    tiny = eigenvalues.max() * np.finfo(np.float64).eps * eigenvalues.size
+    kt = constants.k * temperature
+    with np.errstate(divide="ignore"):
+        omega = np.sqrt(kt / np.where(eigenvalues > tiny, eigenvalues, 0.))
+    frequencies = omega / (2. * np.pi * constants.c) * constants.centi
+    return frequencies, eigenvectors
+
+
+def mode_thermodynamics(frequencies, temperature=300.):
+    """Calculate the thermodynamic properties of harmonic oscillators.
+
+    Parameters
+    ----------
+    frequencies : :class:`~numpy.ndarray`
+        Frequencies (in cm\\ :sup:`-1`)
+    temperature : float, optional
+        Temperature (in K)
+
+    Returns
+    -------
+    entropy, enthalpy, heatcap : :class:`~numpy.ndarray`
+        Entropy, enthalpy including the zero-point energy, and heat capacity
+        of each mode; infinite frequencies contribute nothing.
+    """
+    x = (constants.h * constants.c * frequencies / constants.centi /
+         (constants.k * temperature))
+    finite = np.isfinite(x)
+    x = np.where(finite, x, 1.)
+    expm1 = np.expm1(x)
+    entropy = R * (x / expm1 - np.log(-np.expm1(-x)))
+    enthalpy = R * temperature * (0.5 * x + x / expm1)
+    heatcap = R * np.square(x) * np.exp(-x) / np.square(np.expm1(-x))
+    return tuple(np.where(finite, _, 0.) for _ in (entropy, enthalpy, heatcap))
+
+
+def residue_thermodynamics(eigenvectors, resindices, frequencies,
+                           temperature=300.):
+    """Divide the thermodynamic properties of the modes among the residues.
+
+    Parameters
+    ----------
+    eigenvectors : :class:`~numpy.ndarray`
+        Normalized eigenvectors of the mass-weighted covariance in the
+        columns
+    resindices : :class:`~numpy.ndarray`
+        Residue index of each atom
+    frequencies : :class:`~numpy.ndarray`
+        Frequencies (in cm\\ :sup:`-1`)
+    temperature : float, optional
+        Temperature (in K)
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Entropy, enthalpy, and heat capacity of each residue with shape
+        (n_residues, 3)
+    """
+    resindices = np.repeat(np.asarray(resindices), 3)
+    _, residues = np.unique(resindices, return_inverse=True)
+    membership = sparse.csr_matrix(
+        (np.ones(resindices.size), (residues, np.arange(resindices.size))))
+    amplitudes = membership.dot(np.square(eigenvectors))
+    values = np.stack(mode_thermodynamics(frequencies, temperature), axis=1)
+    return np.dot(amplitudes, values)
@@ -0,0 +1,187 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+"""A long-lived CHARMM process driven through standard input."""
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.builtins import open
+from future.utils import (
+    PY2,
+    native_str,
+)
+
+import logging
+import os
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+
+class CharmmSession(object):
+    """Keep CHARMM running and send it one block of commands at a time.
+
+    Each block is followed by an ``echo`` command with a numbered marker. The
+    block is complete once the marker appears in the standard output of
+    CHARMM. If CHARMM exits before printing the marker, a
+    :class:`~subprocess.CalledProcessError` is raised, just as
+    :func:`~subprocess.check_call` does for a single CHARMM run. All output is
+    copied to the log file.
+    """
+    marker = "FLUCTMATCH-END-OF-BLOCK"
+
+    def __init__(self, executable, logfile):
+        """
+        Parameters
+        ----------
+        executable : str
+            CHARMM executable file
+        logfile : str
+            File to which the CHARMM output is written
+        """
+        self.executable = executable
+        self.logfile = logfile
+        self._process = None
+        self._log = None
+        self._count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+            return
+        # Do not mask the original exception.
+        if self.is_running:
+            self._process.kill()
+        try:
+            self.close()
+        except subprocess.CalledProcessError:
+            pass
+
+    @property
+    def is_running(self):
+        """Whether the CHARMM process is still alive."""
+        return self._process is not None and self._process.poll() is None
+
+    @property
+    def pid(self):
+        """Process ID of CHARMM, or None if the session has not started."""
+        return None if self._process is None else self._process.pid
+
+    def start(self, script=""):
+        """Start CHARMM and run the setup commands.
+
+        Parameters
+        ----------
+        script : str, optional
+            Commands executed once at the beginning of the session
+        """
+        # Fortran runtimes buffer standard output when it is not a terminal.
+        env = os.environ.copy()
+        env.setdefault(
+            native_str("GFORTRAN_UNBUFFERED_PRECONNECTED"), native_str("y"))
+
+        logger.info("Starting a CHARMM session.")
+        self._log = open(self.logfile, mode="w")
+        self._process = subprocess.Popen(
+            [self.executable],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            bufsize=1,
+            env=env,
+        )
+        if script:
+            self.send(script)
+
+    def send(self, script):
+        """Send a block of commands and wait until CHARMM completes it.
+
+        Parameters
+        ----------
+        script : str
+            CHARMM commands
+
+        Raises
+        ------
+        :class:`~subprocess.CalledProcessError`
+            CHARMM exited before completing the commands.
+        """
+        self._count += 1
+        marker = "{}-{:d}".format(self.marker, self._count)
+        try:
+            self._process.stdin.write(script)
+            if not script.endswith("\n"):
+                self._process.stdin.write("\n")
+            self._process.stdin.write("echo {}\n".format(marker))
+            self._process.stdin.flush()
+        except (IOError, OSError):
+            pass  # CHARMM has exited; the return code is checked below.
+
+        for line in self._lines():
+            self._log.write(line)
+            if marker in line.upper():
+                self._log.flush()
+                return
+        self._log.flush()
+        returncode = self._process.wait()
+        logger.error("CHARMM exited with status {:d}. See {} for "
+                     "details.".format(returncode, self.logfile))
+        raise subprocess.CalledProcessError(returncode, self.executable)
+
+    def _lines(self):
+        """Lines of the standard output of CHARMM as text until it closes."""
+        for line in iter(self._process.stdout.readline, ""):
+            # Python 2 reads byte strings even with universal newlines.
+            yield line.decode("utf-8", "replace") if PY2 else line
+
+    def close(self):
+        """Stop CHARMM and close the log file.
+
+        Raises
+        ------
+        :class:`~subprocess.CalledProcessError`
+            CHARMM did not exit normally.
+        """
+        if self._process is None:
+            return
+        if self.is_running:
+            try:
+                self._process.stdin.write("stop\n")
+                self._process.stdin.flush()
+            except (IOError, OSError):
+                pass
+        try:
+            self._process.stdin.close()
+        except (IOError, OSError):
+            pass
+        for line in self._lines():
+            self._log.write(line)
+        self._process.stdout.close()
+        self._log.close()
+
+        returncode = self._process.wait()
+        self._process = None
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, self.executable)
+        logger.info("CHARMM session closed.")
@@ -0,0 +1,375 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+"""Force constant update strategies for self-consistent fluctuation matching.
+
+Each cycle of fluctuation matching evaluates the bond fluctuations for the
+current force constants and proposes new force constants. The original rule
+is a fixed-point iteration,
+
+.. math::
+
+    K_b^{new} = K_b - \\alpha k_B T
+        \\left(\\frac{1}{\\langle \\Delta r^2 \\rangle} -
+        \\frac{1}{\\langle \\Delta r^2 \\rangle_{target}}\\right),
+
+whose correction is treated as the residual :math:`f(K_b)` by the
+accelerated strategies. Force constants are never allowed to become
+negative.
+"""
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.builtins import (
+    dict,
+    super,
+)
+from future.utils import (
+    raise_with_traceback,
+    with_metaclass,
+)
+
+import abc
+import logging
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg as splinalg
+
+logger = logging.getLogger(__name__)
+
+
+class KbUpdate(with_metaclass(abc.ABCMeta, object)):
+    """Base class for force constant update strategies."""
+    name = None
+
+    # Whether the strategy uses the covariance between bond lengths
+    sensitivities = False
+
+    def __init__(self, scale, **kwargs):
+        """
+        Parameters
+        ----------
+        scale : float
+            Thermal energy multiplied by the bond factor (kcal^2/mol^2)
+        """
+        self.scale = scale
+
+    def __str__(self):
+        return self.name
+
+    def residual(self, fluct, target):
+        """Correction to the force constants by the fixed-point rule.
+
+        Parameters
+        ----------
+        fluct : :class:`~numpy.ndarray`
+            Bond fluctuations of the current cycle
+        target : :class:`~numpy.ndarray`
+            Target bond fluctuations
+
+        Returns
+        -------
+        :class:`~numpy.ndarray`
+        """
+        return -self.scale * (np.square(np.reciprocal(fluct)) -
+                              np.square(np.reciprocal(target)))
+
+    @abc.abstractmethod
+    def update(self, kb, fluct, target, coupling=None):
+        """Determine the force constants for the next cycle.
+
+        Parameters
+        ----------
+        kb : :class:`~numpy.ndarray`
+            Force constants of the current cycle
+        fluct : :class:`~numpy.ndarray`
+            Bond fluctuations of the current cycle
+        target : :class:`~numpy.ndarray`
+            Target bond fluctuations
+        coupling : :class:`~scipy.sparse.spmatrix`, optional
+            Covariance between the lengths of different bonds (A^2), used by
+            strategies with :attr:`sensitivities`
+
+        Returns
+        -------
+        :class:`~numpy.ndarray`
+            New force constants
+        """
+        pass
+
+
+class LinearUpdate(KbUpdate):
+    """Fixed-point iteration with a constant bond factor."""
+    name = "linear"
+
+    def update(self, kb, fluct, target, coupling=None):
+        return np.clip(kb + self.residual(fluct, target), 0., None)
+
+
+class AndersonUpdate(KbUpdate):
+    """Anderson mixing of the previous force constants and residuals."""
+    name = "anderson"
+
+    def __init__(self, scale, history=5, mixing=1.0, **kwargs):
+        """
+        Parameters
+        ----------
+        scale : float
+            Thermal energy multiplied by the bond factor (kcal^2/mol^2)
+        history : int, optional
+            Number of previous cycles used for the mixing
+        mixing : float, optional
+            Fraction of the residual added to the mixed force constants
+        """
+        super().__init__(scale, **kwargs)
+        self.history = history
+        self.mixing = mixing
+        self._kb = []
+        self._residuals = []
+
+    def __str__(self):
+        return "{}(history={:d}, mixing={:g})".format(
+            self.name, self.history, self.mixing)
+
+    def update(self, kb, fluct, target, coupling=None):
+        residual = self.residual(fluct, target)
+        self._kb.append(np.array(kb, dtype=np.float64))
+        self._residuals.append(residual)
+        if len(self._kb) > self.history + 1:
+            del self._kb[0]
+            del self._residuals[0]
+
+        new_kb = kb + self.mixing * residual
+        if len(self._kb) > 1:
+            dk = np.diff(self._kb, axis=0).T
+            df = np.diff(self._residuals, axis=0).T
+            gamma = np.linalg.lstsq(df, residual, rcond=None)[0]
+            new_kb -= np.dot(dk + self.mixing * df, gamma)
+
+        # Restart the history if the mixed step leaves the feasible region.
+        if np.any(new_kb < 0.):
+            self._kb = self._kb[-1:]
+            self._residuals = self._residuals[-1:]
+        return np.clip(new_kb, 0., None)
+
+
+class BroydenUpdate(KbUpdate):
+    """Damped step with a limited-memory Broyden inverse Jacobian.
+
+    The inverse Jacobian of the residual starts as :math:`-I`, which
+    reproduces the fixed-point rule, and receives one rank-one update from
+    each cycle (Broyden's first method).
+    """
+    name = "broyden"
+
+    def __init__(self, scale, history=10, damping=0.8, **kwargs):
+        """
+        Parameters
+        ----------
+        scale : float
+            Thermal energy multiplied by the bond factor (kcal^2/mol^2)
+        history : int, optional
+            Number of rank-one updates kept before restarting
+        damping : float, optional
+            Fraction of the Broyden step that is taken
+        """
+        super().__init__(scale, **kwargs)
+        self.history = history
+        self.damping = damping
+        self._u = []
+        self._v = []
+        self._kb = None
+        self._residual = None
+
+    def __str__(self):
+        return "{}(history={:d}, damping={:g})".format(
+            self.name, self.history, self.damping)
+
+    def _inverse_jacobian(self, vector, transpose=False):
+        result = -vector
+        for u, v in zip(self._u, self._v):
+            if transpose:
+                result = result + v * np.dot(u, vector)
+            else:
+                result = result + u * np.dot(v, vector)
+        return result
+
+    def update(self, kb, fluct, target, coupling=None):
+        kb = np.array(kb, dtype=np.float64)
+        residual = self.residual(fluct, target)
+        if self._kb is not None:
+            # Once the history is full, restart from -I with the current
+            # update.
+            if len(self._u) == self.history:
+                self._u, self._v = [], []
+            dk = kb - self._kb
+            df = residual - self._residual
+            g_df = self._inverse_jacobian(df)
+            denominator = np.dot(dk, g_df)
+            if abs(denominator) > np.finfo(np.float64).eps * np.dot(dk, dk):
+                self._u.append((dk - g_df) / denominator)
+                self._v.append(self._inverse_jacobian(dk, transpose=True))
+        self._kb = kb
+        self._residual = residual
+
+        new_kb = kb - self.damping * self._inverse_jacobian(residual)
+        if np.any(new_kb < 0.):
+            self._u, self._v = [], []
+        return np.clip(new_kb, 0., None)
+
+
+class NewtonUpdate(KbUpdate):
+    """Newton step using the analytical sensitivities of the fluctuations.
+
+    The Newton step solves for the root of the residual
+    :math:`r_a = 1 / \\langle \\Delta r_a^2 \\rangle -
+    1 / \\langle \\Delta r_a^2 \\rangle_{target}`, whose Jacobian follows from
+    the covariance :math:`C_{ab}` between the bond lengths,
+
+    .. math::
+
+        \\frac{\\partial r_a}{\\partial K_b} =
+            \\frac{2 C_{ab}^2}{k_B T C_{aa}^2}.
+
+    Covariances that are omitted from `coupling` truncate the Newton system
+    to a sparse one; without any coupling, the diagonal approximation is
+    used. Each step is confined to a trust region whose radius is relative
+    to the norm of the force constants and then projected onto
+    :math:`K_b \\ge 0`. A step that increases the residual is rejected and
+    retaken from the previous force constants with a smaller radius.
+    """
+    name = "newton"
+    sensitivities = True
+
+    def __init__(self, scale, kt=None, radius=0.5, **kwargs):
+        """
+        Parameters
+        ----------
+        scale : float
+            Thermal energy multiplied by the bond factor (kcal^2/mol^2)
+        kt : float
+            Thermal energy (kcal/mol)
+        radius : float, optional
+            Initial trust radius relative to the norm of the force constants
+        """
+        super().__init__(scale, **kwargs)
+        if kt is None:
+            raise ValueError("The Newton update requires the thermal energy.")
+        self.kt = kt
+        self.radius = radius
+        self.max_radius = max(1., radius)
+        self._previous = None
+
+    def __str__(self):
+        return "{}(radius={:g})".format(self.name, self.radius)
+
+    def _system(self, variance, coupling):
+        """Matrix S and row weights w of the Jacobian diag(w) S."""
+        diagonal = sparse.diags(np.square(variance))
+        if coupling is None:
+            matrix = diagonal
+        else:
+            matrix = sparse.csr_matrix(coupling).power(2) + diagonal
+        return matrix.tocsc(), 2. / (self.kt * np.square(variance))
+
+    def update(self, kb, fluct, target, coupling=None):
+        kb = np.array(kb, dtype=np.float64)
+        variance = np.square(fluct)
+        residual = np.reciprocal(variance) - np.square(np.reciprocal(target))
+        feasible = np.all(np.isfinite(residual))
+
+        # Compare the actual and the predicted reduction of the residual.
+        if self._previous is not None:
+            (previous_kb, previous_residual, previous_variance,
+             previous_coupling, predicted) = self._previous
+            actual = (np.dot(previous_residual, previous_residual) -
+                      np.dot(residual, residual)) if feasible else -np.inf
+            ratio = actual / predicted if predicted > 0. else 1.
+            if ratio < 0.25:
+                self.radius *= 0.25
+            elif ratio > 0.75:
+                self.radius = min(2. * self.radius, self.max_radius)
+            if ratio < 0.:
+                kb = previous_kb
+                residual = previous_residual
+                variance = previous_variance
+                coupling = previous_coupling
+
+        matrix, weight = self._system(variance, coupling)
+        step = splinalg.spsolve(matrix, -residual / weight)
+        if not np.all(np.isfinite(step)):
+            logger.warning("Singular Newton system; using the diagonal.")
+            matrix, weight = self._system(variance, None)
+            step = -residual / (weight * matrix.diagonal())
+
+        # Restrict the step to the trust region and to Kb >= 0.
+        limit = self.radius * np.linalg.norm(kb)
+        length = np.linalg.norm(step)
+        if length > limit:
+            step *= limit / length
+        new_kb = np.clip(kb + step, 0., None)
+
+        model = residual + weight * matrix.dot(new_kb - kb)
+        predicted = np.dot(residual, residual) - np.dot(model, model)
+        self._previous = (kb, residual, variance, coupling, predicted)
+        return new_kb
+
+
+UPDATES = dict(
+    linear=LinearUpdate,
+    anderson=AndersonUpdate,
+    broyden=BroydenUpdate,
+    newton=NewtonUpdate,
+)
+
+
+def create(name, scale, **kwargs):
+    """Create a force constant update strategy.
+
+    Parameters
+    ----------
+    name : {"linear", "anderson", "broyden", "newton"}
+        Update strategy
+    scale : float
+        Thermal energy multiplied by the bond factor (kcal^2/mol^2)
+    history : int, optional
+        Number of previous cycles used by the accelerated strategies
+    mixing : float, optional
+        Mixing parameter of Anderson mixing
+    damping : float, optional
+        Damping of the Broyden step
+    kt : float, optional
+        Thermal energy (kcal/mol) required by the Newton update
+    radius : float, optional
+        Initial relative trust radius of the Newton update
+
+    Returns
+    -------
+    :class:`KbUpdate`
+    """
+    try:
+        update = UPDATES[name.lower()]
+    except KeyError:
+        msg = ("{} is not an available update strategy. Please try "
+               "{}".format(name, ", ".join(sorted(UPDATES))))
+        logger.exception(msg)
+        raise_with_traceback(KeyError(msg))
+    return update(scale, **kwargs)
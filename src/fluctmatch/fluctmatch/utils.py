@@ -20,11 +20,15 @@ from __future__ import (
     print_function,
     unicode_literals,
 )
-from future.builtins import (dict, super)
-from future.utils import (PY2, native_str)
+from future.builtins import (dict, range, super)
+from future.utils import (PY2, native_str, with_metaclass)
 
+import abc
+import collections
 import logging
+import multiprocessing as mp
 import os
+import pickle
 import subprocess
 import tempfile
 import textwrap
@@ -44,7 +48,280 @@ if PY2:
 logger = logging.getLogger(__name__)
 
 
-class AverageStructure(analysis.AnalysisBase):
+def iter_blocks(atomgroup, n_frames=100, start=None, stop=None, step=None):
+    """Iterate over the coordinates of an AtomGroup in blocks of frames.
+
+    A coarse-grain trajectory maps each block of atomistic frames onto the
+    beads with one matrix product. Other trajectories are read frame by
+    frame.
+
+    Parameters
+    ----------
+    atomgroup : :class:`~MDAnalysis.Universe.AtomGroup`
+        An AtomGroup
+    n_frames : int, optional
+        Number of frames per block
+    start : int, optional
+        start frame
+    stop : int, optional
+        stop frame
+    step : int, optional
+        number of frames to skip between each frame
+
+    Yields
+    ------
+    :class:`~numpy.ndarray`
+        Coordinates with shape (n_frames, n_atoms, 3)
+    """
+    trajectory = atomgroup.universe.trajectory
+    if hasattr(trajectory, "iter_blocks"):
+        indices = atomgroup.indices
+        for positions in trajectory.iter_blocks(n_frames, start, stop, step):
+            yield positions[:, indices]
+        return
+
+    block = []
+    for _ in trajectory[start:stop:step]:
+        block.append(atomgroup.positions)
+        if len(block) == n_frames:
+            yield np.array(block)
+            block = []
+    if block:
+        yield np.array(block)
+
+
+def _strided_order(n_blocks):
+    """Order blocks so that every prefix spreads over the whole trajectory.
+
+    The blocks are visited in the order of the van der Corput sequence
+    (0, 1/2, 1/4, 3/4, ...), so the first blocks sample the beginning, the
+    middle, and the end of the trajectory before the gaps are filled.
+
+    Parameters
+    ----------
+    n_blocks : int
+        Number of blocks
+
+    Returns
+    -------
+    list of int
+        Each block index once
+    """
+    if n_blocks < 1:
+        return []
+    bits = max(1, int(np.ceil(np.log2(n_blocks))))
+    order = []
+    seen = set()
+    for k in range(2**bits):
+        reverse = int(format(k, "0{:d}b".format(bits))[::-1], 2)
+        index = reverse * n_blocks // 2**bits
+        if index not in seen:
+            seen.add(index)
+            order.append(index)
+    return order
+
+
+def _analyze_frames(args):
+    """Accumulate an analysis over a range of frames in a worker process.
+
+    Parameters
+    ----------
+    args : tuple
+        Pickled analysis, topology and trajectory files, weights of the
+        beads, (start, stop, step) of the frames, and the number of frames
+        per block
+
+    Returns
+    -------
+    :class:`_BlockAnalysis`
+        The analysis with the partial results of the frames
+    """
+    from fluctmatch.models.trajectory import open_blocks
+
+    state, sources, weights, frames, block_size = args
+    frames = range(*frames)
+    analysis = pickle.loads(state)
+    analysis._begin_range(frames.start)
+    for positions, _ in open_blocks(sources, weights, frames, block_size):
+        analysis._block(positions)
+    return analysis
+
+
+class _BlockAnalysis(with_metaclass(abc.ABCMeta, analysis.AnalysisBase)):
+    """Analysis of the trajectory in blocks of frames.
+
+    Subclasses implement `_block`, which receives the coordinates of all
+    atoms of the universe with shape (n_frames, n_atoms, 3).
+
+    With several workers, the frames are split into contiguous ranges. Each
+    worker process opens the trajectory files, accumulates the blocks of its
+    range into a copy of the analysis, and the copies are combined in the
+    order of the frames with `_merge`, which subclasses implement as well.
+
+    With a tolerance `tol`, the blocks are read in strided order (see
+    :func:`_strided_order`) by one process, and the analysis stops once the
+    relative error estimated by `_error` after at least `min_blocks` blocks
+    is at most `tol`. `frames_used` and `error` then report the number of
+    frames that were read and the last error estimate.
+    """
+
+    # Attributes that stay in the main process
+    _local = ("_ag", "_trajectory", "_pm")
+
+    def __init__(self,
+                 atomgroup,
+                 block_size=100,
+                 n_workers=1,
+                 tol=None,
+                 min_blocks=4,
+                 **kwargs):
+        super().__init__(atomgroup.universe.trajectory, **kwargs)
+        self._ag = atomgroup
+        self._block_size = block_size
+        self._n_workers = n_workers
+        self._tol = tol
+        self._min_blocks = max(2, min_blocks)
+        self.frames_used = 0
+        self.error = None
+
+    def __getstate__(self):
+        return {
+            key: value
+            for key, value in self.__dict__.items() if key not in self._local
+        }
+
+    def _begin_range(self, frame):
+        """Called before the blocks of a range of frames starting at `frame`.
+        """
+        pass
+
+    @abc.abstractmethod
+    def _block(self, positions):
+        """Accumulate a block of coordinates.
+
+        Parameters
+        ----------
+        positions : :class:`~numpy.ndarray`
+            Coordinates with shape (n_frames, n_atoms, 3)
+        """
+        pass
+
+    @abc.abstractmethod
+    def _merge(self, other):
+        """Combine the analysis of the following range of frames.
+
+        Parameters
+        ----------
+        other : :class:`_BlockAnalysis`
+            Analysis of a worker process
+        """
+        pass
+
+    @abc.abstractmethod
+    def _error(self):
+        """Relative error of the result from the blocks read so far."""
+        pass
+
+    def _frames(self):
+        return range(*slice(self.start, self.stop, self.step).indices(
+            self._trajectory.n_frames))
+
+    def run(self):
+        """Perform the calculation."""
+        from fluctmatch.models.trajectory import block_sources
+
+        self._prepare()
+        self.frames_used = 0
+        self.error = None
+        if self._tol is not None:
+            self._run_adaptive()
+            self._conclude()
+            return self
+
+        sources = None
+        if self._n_workers > 1:
+            sources = block_sources(self._ag.universe)
+            if sources is None:
+                logger.warning("The trajectory cannot be opened by other "
+                               "processes and is analyzed by one process.")
+        if sources is None:
+            self._begin_range(self.start)
+            for positions in iter_blocks(self._ag.universe.atoms,
+                                         self._block_size, self.start,
+                                         self.stop, self.step):
+                self._block(positions)
+                self.frames_used += positions.shape[0]
+        else:
+            self.frames_used = len(self._frames())
+            self._run_parallel(*sources)
+        self._conclude()
+        return self
+
+    def _run_adaptive(self):
+        frames = self._frames()
+        firsts = range(0, len(frames), self._block_size)
+        if self._n_workers > 1:
+            logger.info("The blocks are read by one process until the "
+                        "error is below {:g}.".format(self._tol))
+        for n_blocks, index in enumerate(_strided_order(len(firsts)), 1):
+            block = frames[firsts[index]:firsts[index] + self._block_size]
+            for positions in iter_blocks(self._ag.universe.atoms,
+                                         self._block_size, block.start,
+                                         block.stop, block.step):
+                self._block(positions)
+                self.frames_used += positions.shape[0]
+            if n_blocks >= self._min_blocks:
+                self.error = self._error()
+                if self.error <= self._tol:
+                    break
+        logger.info("{:d} of {:d} frames read; relative error {}".format(
+            self.frames_used, len(frames),
+            "n/a" if self.error is None else "{:.3g}".format(self.error)))
+
+    def _run_parallel(self, sources, weights):
+        frames = self._frames()
+        n_blocks = -(-len(frames) // self._block_size)
+        size = self._block_size * max(1, n_blocks // (4 * self._n_workers))
+        chunks = [
+            frames[first:first + size]
+            for first in range(0, len(frames), size)
+        ]
+
+        # Every worker starts from the prepared, still empty analysis.
+        state = pickle.dumps(self, pickle.HIGHEST_PROTOCOL)
+        tasks = [(state, sources, weights, (_.start, _.stop, _.step),
+                  self._block_size) for _ in chunks]
+        pool = mp.Pool(max(1, min(self._n_workers, len(chunks))))
+        try:
+            for partial in pool.imap(_analyze_frames, tasks):
+                self._merge(partial)
+            pool.close()
+            pool.join()
+        finally:
+            pool.terminate()
+
+
+def _bond_lengths(positions, atom1, atom2):
+    """Calculate the bond lengths of several frames.
+
+    Parameters
+    ----------
+    positions : :class:`~numpy.ndarray`
+        Coordinates with shape (n_frames, n_atoms, 3)
+    atom1, atom2 : :class:`~numpy.ndarray`
+        Atom indices of the bonds
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Bond lengths with shape (n_frames, n_bonds)
+    """
+    vectors = (positions[:, atom2].astype(np.float64) -
+               positions[:, atom1].astype(np.float64))
+    return np.sqrt(np.einsum("ijk,ijk->ij", vectors, vectors))
+
+
+class AverageStructure(_BlockAnalysis):
     """Calculate the average structure of a trajectory.
     """
 
@@ -60,108 +337,594 @@ class AverageStructure(analysis.AnalysisBase):
             stop frame of analysis
         step : int, optional
             number of frames to skip between each analysed frame
+        block_size : int, optional
+            number of frames read at once
+        n_workers : int, optional
+            number of processes that analyze the trajectory
         verbose : bool, optional
             Turn on verbosity
         """
-        super().__init__(atomgroup.universe.trajectory, **kwargs)
-        self._ag = atomgroup
-        self._nframes = atomgroup.universe.trajectory.n_frames
+        if kwargs.get("tol") is not None:
+            raise ValueError("The average structure requires all frames.")
+        super().__init__(atomgroup, **kwargs)
 
     def _prepare(self):
-        self.result = np.zeros_like(self._ag.positions)
+        self._indices = self._ag.indices
+        self._sum = np.zeros(self._ag.positions.shape)
+        self._count = 0
+
+    def _block(self, positions):
+        self._sum += positions[:, self._indices].sum(axis=0)
+        self._count += positions.shape[0]
+
+    def _merge(self, other):
+        self._sum += other._sum
+        self._count += other._count
 
-    def _single_frame(self):
-        self.result += self._ag.positions
+    def _error(self):
+        # Never called, because every frame is read.
+        return np.inf
 
     def _conclude(self):
-        self.result /= self._nframes
+        self.result = (self._sum / self._count).astype(np.float32)
 
 
-class BondAverage(analysis.AnalysisBase):
-    """Calculate the average bond length.
+class BondMoments(object):
+    """Mergeable central moments of the bond lengths.
+
+    Each block of frames is reduced to its count, mean, and sums of the
+    powers of the deviations from its mean, and the blocks are combined with
+    the pairwise update of Chan, Golub, and LeVeque, the block form of
+    Welford's algorithm. The result does not suffer from the cancellation of
+    the plain sum of squares and does not depend upon how the frames are
+    divided into blocks, so moments of different parts of a trajectory can
+    be determined independently and merged.
 
+    Parameters
+    ----------
+    n_bonds : int
+        Number of bonds
+    order : int, optional
+        Highest central moment (2, 3, or 4)
     """
 
-    def __init__(self, atomgroup, **kwargs):
+    def __init__(self, n_bonds, order=2):
+        if order not in (2, 3, 4):
+            raise ValueError("order must be 2, 3, or 4.")
+        self.order = order
+        self.count = 0
+        self.mean = np.zeros(n_bonds)
+        self._moments = np.zeros((order - 1, n_bonds))
+
+    def __repr__(self):
+        return "<BondMoments of {:d} bonds in {:d} frames>".format(
+            self.mean.size, self.count)
+
+    @property
+    def variance(self):
+        """Population variance of the bond lengths."""
+        return self._moments[0] / self.count
+
+    @property
+    def std(self):
+        """Population standard deviation of the bond lengths."""
+        return np.sqrt(self.variance)
+
+    @property
+    def skewness(self):
+        """Skewness of the bond lengths (requires order 3)."""
+        if self.order < 3:
+            raise AttributeError("The third moment was not accumulated.")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (np.sqrt(self.count) * self._moments[1] /
+                    np.power(self._moments[0], 1.5))
+
+    @property
+    def kurtosis(self):
+        """Excess kurtosis of the bond lengths (requires order 4)."""
+        if self.order < 4:
+            raise AttributeError("The fourth moment was not accumulated.")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (self.count * self._moments[2] /
+                    np.square(self._moments[0]) - 3.)
+
+    def update(self, bonds):
+        """Add the bond lengths of a block of frames.
+
+        Parameters
+        ----------
+        bonds : :class:`~numpy.ndarray`
+            Bond lengths with shape (n_frames, n_bonds)
+
+        Returns
+        -------
+        :class:`BondMoments`
+            The updated moments
+        """
+        block = BondMoments(self.mean.size, self.order)
+        block.count = bonds.shape[0]
+        if block.count == 0:
+            return self
+        block.mean = bonds.mean(axis=0)
+        deviations = bonds - block.mean
+        for i in range(self.order - 1):
+            block._moments[i] = np.power(deviations, i + 2).sum(axis=0)
+        return self.merge(block)
+
+    def merge(self, other):
+        """Combine the moments of another set of frames.
+
+        Parameters
+        ----------
+        other : :class:`BondMoments`
+            Moments of the same bonds in different frames
+
+        Returns
+        -------
+        :class:`BondMoments`
+            The updated moments
+        """
+        if other.order != self.order or other.mean.size != self.mean.size:
+            raise ValueError("The moments have different bonds or orders.")
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count = other.count
+            self.mean = other.mean.copy()
+            self._moments = other._moments.copy()
+            return self
+
+        na, nb = self.count, other.count
+        n = na + nb
+        delta = other.mean - self.mean
+        m2a, m2b = self._moments[0], other._moments[0]
+        moments = np.empty_like(self._moments)
+        moments[0] = m2a + m2b + np.square(delta) * na * nb / n
+        if self.order > 2:
+            m3a, m3b = self._moments[1], other._moments[1]
+            moments[1] = (m3a + m3b + np.power(delta, 3) * na * nb *
+                          (na - nb) / n**2 + 3. * delta *
+                          (na * m2b - nb * m2a) / n)
+        if self.order > 3:
+            m4a, m4b = self._moments[2], other._moments[2]
+            moments[2] = (m4a + m4b + np.power(delta, 4) * na * nb *
+                          (na**2 - na * nb + nb**2) / n**3 +
+                          6. * np.square(delta) *
+                          (na**2 * m2b + nb**2 * m2a) / n**2 + 4. * delta *
+                          (na * m3b - nb * m3a) / n)
+        self.mean = self.mean + delta * nb / n
+        self._moments = moments
+        self.count = n
+        return self
+
+
+class BondStats(_BlockAnalysis):
+    """Calculate the average and fluctuation of the bond lengths.
+
+    Both quantities are determined in one pass through the trajectory with
+    :class:`BondMoments`, which is available as the `moments` attribute after
+    the analysis. The atom indices of the bonds are determined once.
+
+    With a tolerance `tol`, the fluctuation of each bond is also determined
+    within every block. The standard error of the mean of these block
+    fluctuations relative to their mean, the largest of all bonds, is the
+    error estimate, so a trajectory that has converged well before its end
+    is only read in part.
+    """
+
+    def __init__(self, atomgroup, func="both", order=2, **kwargs):
         """
         Parameters
         ----------
         atomgroup : :class:`~MDAnalysis.Universe.AtomGroup`
             An AtomGroup
+        func : str, optional
+            "mean" for the average bond lengths, "std" for the bond
+            fluctuations, or "both"
+        order : int, optional
+            Highest central moment to accumulate; 3 and 4 also provide the
+            skewness and kurtosis of the `moments` attribute.
         start : int, optional
             start frame of analysis
         stop : int, optional
             stop frame of analysis
         step : int, optional
             number of frames to skip between each analysed frame
+        block_size : int, optional
+            number of frames read at once
+        n_workers : int, optional
+            number of processes that analyze the trajectory
+        tol : float, optional
+            relative error of the bond fluctuations at which the analysis
+            stops early; all frames are read if not given
+        min_blocks : int, optional
+            minimum number of blocks read before the analysis may stop
         verbose : bool, optional
             Turn on verbosity
         """
-        super().__init__(atomgroup.universe.trajectory, **kwargs)
-        self._ag = atomgroup
-        self._nframes = atomgroup.universe.trajectory.n_frames
+        super().__init__(atomgroup, **kwargs)
+        if func not in ("mean", "std", "both"):
+            raise ValueError("func must be 'mean', 'std', or 'both'.")
+        self._func = func
+        self._order = order
 
     def _prepare(self):
-        self.result = np.zeros_like(self._ag.bonds.bonds())
+        bonds = self._ag.bonds
+        self._atom1 = bonds.atom1.indices
+        self._atom2 = bonds.atom2.indices
+        self.moments = BondMoments(len(bonds), self._order)
+        self._fluct = BondMoments(len(bonds))
+
+    def _block(self, positions):
+        bonds = _bond_lengths(positions, self._atom1, self._atom2)
+        self.moments.update(bonds)
+        if self._tol is not None and bonds.shape[0] > 1:
+            self._fluct.update(bonds.std(axis=0)[np.newaxis])
+
+    def _merge(self, other):
+        self.moments.merge(other.moments)
+
+    def _error(self):
+        n_blocks = self._fluct.count
+        if n_blocks < 2:
+            return np.inf
+        # Standard error of the mean of the block fluctuations
+        error = np.sqrt(self._fluct.variance / (n_blocks - 1))
+        mean = self._fluct.mean
+        error = np.divide(
+            error, mean, out=np.zeros_like(error), where=mean > 0)
+        return float(error.max()) if error.size else 0.
+
+    def table(self, values):
+        """Tabulate a value per bond.
 
-    def _single_frame(self):
-        self.result += self._ag.bonds.bonds()
+        Parameters
+        ----------
+        values : :class:`~numpy.ndarray`
+            One value per bond
+
+        Returns
+        -------
+        :class:`~pandas.DataFrame`
+            Atom names I and J of the bonds and the values as r_IJ
+        """
+        bonds = self._ag.bonds
+        return pd.DataFrame(
+            dict(I=bonds.atom1.names, J=bonds.atom2.names, r_IJ=values),
+            columns=["I", "J", "r_IJ"])
 
     def _conclude(self):
-        self.result = np.rec.fromarrays(
-            [
-                self._ag.bonds.atom1.names,
-                self._ag.bonds.atom2.names,
-                self.result / self._nframes
-            ],
-            names=["I", "J", "r_IJ"]
-        )
-        self.result = pd.DataFrame.from_records(self.result)
+        values = dict(mean=(self.moments.mean, ), std=(self.moments.std, ))
+        values["both"] = values["mean"] + values["std"]
+        self.result = tuple(self.table(_) for _ in values[self._func])
+
 
+class BondAverage(BondStats):
+    """Calculate the average bond length.
+
+    """
 
-class BondStd(analysis.AnalysisBase):
+    def __init__(self, atomgroup, **kwargs):
+        """
+        Parameters
+        ----------
+        atomgroup : :class:`~MDAnalysis.Universe.AtomGroup`
+            An AtomGroup
+        start : int, optional
+            start frame of analysis
+        stop : int, optional
+            stop frame of analysis
+        step : int, optional
+            number of frames to skip between each analysed frame
+        block_size : int, optional
+            number of frames read at once
+        n_workers : int, optional
+            number of processes that analyze the trajectory
+        tol : float, optional
+            relative error of the bond fluctuations at which the analysis
+            stops early
+        min_blocks : int, optional
+            minimum number of blocks read before the analysis may stop
+        verbose : bool, optional
+            Turn on verbosity
+        """
+        super().__init__(atomgroup, func="mean", **kwargs)
+
+    def _conclude(self):
+        self.result = self.table(self.moments.mean)
+
+
+class BondStd(BondStats):
     """Calculate the fluctuation in bond lengths.
 
+    The fluctuation is taken about the average bond length of the same
+    frames, so the average no longer has to be determined beforehand. If an
+    average is given, the root-mean-square deviation from it,
+    :math:`\\sqrt{\\sigma^2 + (\\bar{r} - r_{avg})^2}`, is determined
+    instead.
     """
 
-    def __init__(self, atomgroup, average, **kwargs):
+    def __init__(self, atomgroup, average=None, **kwargs):
         """
         Parameters
         ----------
         atomgroup : :class:`~MDAnalysis.Universe.AtomGroup`
             An AtomGroup
-        average : float or ""lass:`~numpy.array`
-            Average bond length
+        average : float or :class:`~numpy.array`, optional
+            Average bond length about which the fluctuation is taken
         start : int, optional
             start frame of analysis
         stop : int, optional
             stop frame of analysis
         step : int, optional
             number of frames to skip between each analysed frame
+        block_size : int, optional
+            number of frames read at once
+        n_workers : int, optional
+            number of processes that analyze the trajectory
+        tol : float, optional
+            relative error of the bond fluctuations at which the analysis
+            stops early
+        min_blocks : int, optional
+            minimum number of blocks read before the analysis may stop
         verbose : bool, optional
             Turn on verbosity
         """
-        super().__init__(atomgroup.universe.trajectory, **kwargs)
-        self._ag = atomgroup
-        self._nframes = atomgroup.universe.trajectory.n_frames
+        super().__init__(atomgroup, func="std", **kwargs)
         self._average = average
 
+    def _conclude(self):
+        std = self.moments.std
+        if self._average is not None:
+            std = np.sqrt(
+                np.square(std) + np.square(self.moments.mean - self._average))
+        self.result = self.table(std)
+
+
+class WindowBondStats(BondStats):
+    """Calculate the bond averages and fluctuations of many windows at once.
+
+    The trajectory is read once from the beginning of the first window to
+    the end of the last one. For every frame :math:`f` that begins or ends a
+    window, the prefix sums
+
+    .. math::
+
+        P_f = \\sum_{t < f} (r_t - r_0), \\quad
+        Q_f = \\sum_{t < f} (r_t - r_0)^2
+
+    of each bond are kept, where :math:`r_0` is the bond length at the
+    current frame when the analysis starts. A window of frames
+    :math:`[a, b)` then has the average :math:`r_0 + (P_b - P_a) / n` and the
+    variance :math:`(Q_b - Q_a) / n - ((P_b - P_a) / n)^2` with
+    :math:`n = b - a`, so overlapping windows do not read any frame twice.
+    """
+
+    def __init__(self, atomgroup, windows, **kwargs):
+        """
+        Parameters
+        ----------
+        atomgroup : :class:`~MDAnalysis.Universe.AtomGroup`
+            An AtomGroup
+        windows : iterable of tuple
+            Name, first frame, and frame after the last one of each window
+        block_size : int, optional
+            number of frames read at once
+        n_workers : int, optional
+            number of processes that analyze the trajectory
+        verbose : bool, optional
+            Turn on verbosity
+        """
+        self._windows = [(name, int(start), int(stop))
+                         for name, start, stop in windows]
+        if not self._windows:
+            raise ValueError("At least one window is required.")
+        if any(start < 0 or stop <= start for _, start, stop in self._windows):
+            raise ValueError("Each window needs 0 <= start < stop.")
+        if kwargs.get("tol") is not None:
+            raise ValueError("The windows require all of their frames.")
+        kwargs.update(
+            start=min(_[1] for _ in self._windows),
+            stop=max(_[2] for _ in self._windows),
+            step=1)
+        super().__init__(atomgroup, **kwargs)
+
     def _prepare(self):
-        self.result = np.zeros_like(self._ag.bonds.bonds())
+        super()._prepare()
+        positions = self._ag.universe.atoms.positions[np.newaxis]
+        self._shift = _bond_lengths(positions, self._atom1, self._atom2)[0]
+        self._boundaries = np.unique(
+            [frame for _, start, stop in self._windows
+             for frame in (start, stop)])
+        self._begin_range(self.start)
+
+    def _begin_range(self, frame):
+        self._frame = frame
+        self._total = np.zeros((2, self._shift.size))
+        self._sums = dict()
+        if frame in self._boundaries:
+            self._sums[frame] = self._total.copy()
+
+    def _block(self, positions):
+        bonds = _bond_lengths(positions, self._atom1,
+                              self._atom2) - self._shift
+        sums = np.stack((bonds, np.square(bonds)), axis=1)
+        first = self._frame
+        last = first + bonds.shape[0]
+        inside = self._boundaries[(self._boundaries > first)
+                                  & (self._boundaries <= last)]
+        if inside.size:
+            prefix = np.cumsum(sums, axis=0)
+            for frame in inside:
+                self._sums[frame] = self._total + prefix[frame - first - 1]
+        self._total += sums.sum(axis=0)
+        self._frame = last
 
-    def _single_frame(self):
-        self.result += np.square(self._ag.bonds.bonds() - self._average)
+    def _merge(self, other):
+        # The sums of the other range start at zero at its first frame.
+        for frame, sums in other._sums.items():
+            self._sums.setdefault(frame, self._total + sums)
+        self._total += other._total
+        self._frame = other._frame
 
     def _conclude(self):
-        self.result = np.rec.fromarrays(
-            [
-                self._ag.bonds.atom1.names,
-                self._ag.bonds.atom2.names,
-                np.sqrt(self.result / self._nframes)
-            ],
-            names=["I", "J", "r_IJ"]
-        )
-        self.result = pd.DataFrame.from_records(self.result)
+        self.result = collections.OrderedDict()
+        for name, start, stop in self._windows:
+            if stop not in self._sums:
+                raise ValueError(
+                    "Window {} ends after the trajectory.".format(name))
+            n_frames = stop - start
+            mean, square = (self._sums[stop] - self._sums[start]) / n_frames
+            variance = np.maximum(square - np.square(mean), 0.)
+            self.result[name] = (self.table(self._shift + mean),
+                                 self.table(np.sqrt(variance)))
+
+
+def create_ic_table(universe, data, bond_def=("I", "J")):
+    """Create a table of internal coordinates with given bond lengths.
+
+    Parameters
+    ----------
+    universe : :class:`~MDAnalysis.Universe`
+        Coarse-grain universe
+    data : :class:`~pandas.DataFrame`
+        Bond names and values of r_IJ
+    bond_def : sequence of str, optional
+        Columns that identify a bond
+
+    Returns
+    -------
+    :class:`~pandas.DataFrame`
+        Internal coordinate table
+    """
+    from fluctmatch.intcor import utils as icutils
+
+    bond_def = list(bond_def)
+    data = data.set_index(bond_def)
+    table = icutils.create_empty_table(universe.atoms)
+    hdr = table.columns
+    table.set_index(bond_def, inplace=True)
+    table.drop(
+        [
+            "r_IJ",
+        ], axis=1, inplace=True)
+    table = pd.concat([table, data["r_IJ"]], axis=1)
+    return table.reset_index()[hdr]
+
+
+def write_window_targets(universe, windows, data_dir, **kwargs):
+    """Write the initial targets of every window from one trajectory pass.
+
+    The bond averages and fluctuations of each window are written to
+    `init.average.ic` and `init.fluct.ic` in the subdirectory of the window
+    within `data_dir`, as fluctuation matching with ``init="file"`` expects
+    them. The windows do not have to be split into trajectories.
+
+    Parameters
+    ----------
+    universe : :class:`~MDAnalysis.Universe`
+        Coarse-grain universe with the complete trajectory
+    windows : iterable of tuple
+        Name, first frame, and frame after the last one of each window
+    data_dir : str
+        Location of the window subdirectories
+    block_size : int, optional
+        Number of frames read at once (default: 100)
+    n_workers : int, optional
+        Number of processes that read the trajectory (default: 1)
+    extended, resid, title : optional
+        Options of the internal coordinate writer; any other keyword is
+        ignored
+
+    Returns
+    -------
+    dict
+        Subdirectory of each window
+    """
+    options = {
+        key: value
+        for key, value in kwargs.items()
+        if key in ("extended", "resid", "title")
+    }
+    stats = WindowBondStats(
+        universe.atoms,
+        windows,
+        block_size=kwargs.get("block_size", 100),
+        n_workers=kwargs.get("n_workers", 1)).run()
+    directories = dict()
+    for name, (average, fluct) in stats.result.items():
+        outdir = path.join(data_dir, "{}".format(name))
+        try:
+            os.makedirs(outdir)
+        except OSError:
+            pass
+        for filename, data in (("init.average.ic", average),
+                               ("init.fluct.ic", fluct)):
+            filename = path.join(outdir, filename)
+            with mda.Writer(native_str(filename), **options) as ic:
+                logger.info("Writing {}...".format(filename))
+                ic.write(create_ic_table(universe, data))
+        directories[name] = outdir
+    return directories
+
+
+def write_trajectory(universe, filename, start=None, stop=None, **kwargs):
+    """Write the trajectory of a universe.
+
+    Parameters
+    ----------
+    universe : :class:`~MDAnalysis.Universe` or :class:`~MDAnalysis.AtomGroup`
+        A collection of atoms in a universe or AtomGroup
+    filename : str
+        Trajectory file
+    start : int, optional
+        First frame
+    stop : int, optional
+        Frame after the last one
+    block_size
+        Number of frames of a coarse-grain trajectory mapped at once
+        (default: 100)
+    n_workers
+        Number of processes that map the coarse-grain trajectory; the frames
+        are still written in order by one process (default: 1)
+    tmpdir
+        Directory of the temporary files of the processes that map the
+        coarse-grain trajectory (default: the system temporary directory)
+    """
+    # Position the trajectory at the first frame for its time.
+    universe.trajectory[start or 0]
+    with mda.Writer(
+            native_str(filename),
+            universe.atoms.n_atoms,
+            istart=universe.trajectory.time,
+            remarks="Written by fluctmatch.") as trj:
+        logger.info("Writing the trajectory {}...".format(filename))
+        logger.warning("This may take a while depending upon the size and "
+                       "length of the trajectory.")
+        trajectory = universe.trajectory
+        n_frames = len(range(*slice(start, stop).indices(
+            trajectory.n_frames)))
+        if hasattr(trajectory, "iter_blocks"):
+            # Map blocks of atomistic frames onto the beads at once.
+            ts = trajectory.ts.copy()
+            with click.progressbar(length=n_frames) as bar:
+                for positions, boxes in trajectory.iter_blocks(
+                        kwargs.get("block_size", 100),
+                        start,
+                        stop,
+                        dimensions=True,
+                        n_workers=kwargs.get("n_workers", 1),
+                        tmpdir=kwargs.get("tmpdir")):
+                    for xyz, box in zip(positions, boxes):
+                        ts.positions = xyz
+                        ts.dimensions = box
+                        trj.write(ts)
+                    bar.update(positions.shape[0])
+        else:
+            with click.progressbar(trajectory[start:stop],
+                                   length=n_frames) as bar:
+                for ts in bar:
+                    trj.write(ts)
 
 
 def write_charmm_files(universe,
@@ -191,6 +954,19 @@ def write_charmm_files(universe,
         Include charge equilibration.
     title
         Title lines at the beginning of the file.
+    block_size
+        Number of frames of a coarse-grain trajectory mapped at once
+        (default: 100)
+    n_workers
+        Number of processes that map the coarse-grain trajectory and
+        determine the average structure; the frames are still written in
+        order by one process (default: 1)
+    tmpdir
+        Directory of the temporary files of the processes that map the
+        coarse-grain trajectory (default: the system temporary directory)
+    window
+        A :class:`~fluctmatch.fluctmatch.windows.Window` of the trajectory of
+        the universe. Only its frames are written and averaged.
     """
     from MDAnalysis.core import (
         topologyattrs, )
@@ -233,21 +1009,15 @@ def write_charmm_files(universe,
         logger.info("Writing {}...".format(filenames["psf_file"]))
         psf.write(universe)
 
+    window = kwargs.get("window")
+    start, stop = ((None, None) if window is None else
+                   (window.start, window.stop))
+
     # Write the new trajectory in Gromacs XTC format.
     if write_traj:
-        universe.trajectory.rewind()
-        with mda.Writer(
-                native_str(filenames["traj_file"]),
-                universe.atoms.n_atoms,
-            istart=universe.trajectory.time,
-                remarks="Written by fluctmatch.") as trj:
-            logger.info("Writing the trajectory {}...".format(
-                filenames["traj_file"]))
-            logger.warning("This may take a while depending upon the size and "
-                           "length of the trajectory.")
-            with click.progressbar(universe.trajectory) as bar:
-                for ts in bar:
-                    trj.write(ts)
+        write_trajectory(
+            universe, filenames["traj_file"], start=start, stop=stop,
+            **kwargs)
 
     # Write an XPLOR version of the PSF
     atomtypes = topologyattrs.Atomtypes(universe.atoms.names)
@@ -261,7 +1031,11 @@ def write_charmm_files(universe,
     logger.info("Determining the average structure of the trajectory. ")
     logger.warning("Note: This could take a while depending upon the "
                    "size of your trajectory.")
-    positions = AverageStructure(universe.atoms).run().result
+    positions = AverageStructure(
+        universe.atoms,
+        start=start,
+        stop=stop,
+        n_workers=kwargs.get("n_workers", 1)).run().result
     positions = positions.reshape((*positions.shape, 1))
 
     # Create a new universe.
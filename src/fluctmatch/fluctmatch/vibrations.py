@@ -0,0 +1,200 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+"""Read the normal modes written by CHARMM.
+
+The NMA script writes every mode with ``write normal card`` to the ``.vib``
+file. The card file consists of the title, a line of integers, the atomic
+masses, and then, for each mode, a line with the mode number and the
+frequency followed by the components of the eigenvector. Only the numbers
+with a decimal point are part of the masses and the eigenvectors, so the
+reader does not depend upon the column widths.
+
+Parsing a card file with thousands of modes is slow, so the frequencies and
+eigenvectors are cached in NumPy files next to the card file. The cache is
+used as long as it is newer than the card file, and the eigenvectors are
+returned as a read-only memory-mapped array.
+"""
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.builtins import open
+from future.utils import raise_with_traceback
+
+import logging
+import os
+import re
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_NUMBER = re.compile(r"[-+]?(?:\d+\.\d*|\.\d+)(?:[EeDd][-+]?\d+)?")
+
+
+def _is_mode(fields):
+    """Whether a line starts a mode (mode number and frequency)."""
+    return (len(fields) == 2 and fields[0].isdigit()
+            and _NUMBER.match(fields[1]) is not None)
+
+
+def _numbers(line):
+    """Floating point numbers of a line, including Fortran exponents."""
+    return [
+        float(_.replace("D", "E").replace("d", "e"))
+        for _ in _NUMBER.findall(line)
+    ]
+
+
+def _scan(filename):
+    """Determine the number of modes and atoms of a card file."""
+    n_modes = 0
+    n_atoms = 0
+    with open(filename) as vib:
+        for line in vib:
+            if line.startswith("*"):
+                continue
+            fields = line.split()
+            if _is_mode(fields):
+                n_modes += 1
+            elif n_modes == 0 and "." in line:
+                n_atoms += len(_NUMBER.findall(line))
+    return n_modes, n_atoms
+
+
+def _check(values, shape, mode):
+    if len(values) != shape[1]:
+        raise_with_traceback(
+            ValueError("Mode {:d} has {:d} components instead of {:d}.".format(
+                mode + 1, len(values), shape[1])))
+    return values
+
+
+def _parse(filename, frequencies, eigenvectors):
+    """Fill the frequencies and eigenvectors, and return the masses."""
+    shape = eigenvectors.shape
+    masses = []
+    mode = -1
+    values = []
+    with open(filename) as vib:
+        for line in vib:
+            if line.startswith("*"):
+                continue
+            fields = line.split()
+            if _is_mode(fields):
+                if mode >= 0:
+                    eigenvectors[mode] = _check(values, shape, mode)
+                mode += 1
+                frequencies[mode] = _numbers(fields[1])[0]
+                values = []
+            elif mode < 0:
+                masses.extend(_numbers(line))
+            else:
+                values.extend(_numbers(line))
+    if mode >= 0:
+        eigenvectors[mode] = _check(values, shape, mode)
+    return np.array(masses)
+
+
+def cache_files(filename):
+    """Names of the cache files of a card file.
+
+    Parameters
+    ----------
+    filename : str
+        Normal mode card file
+
+    Returns
+    -------
+    dict
+        NumPy files of the frequencies, masses, and eigenvectors
+    """
+    return {
+        key: "{}.{}.npy".format(filename, key)
+        for key in ("frequencies", "masses", "eigenvectors")
+    }
+
+
+def _cache_valid(filename, caches):
+    try:
+        mtime = os.stat(filename).st_mtime
+        return all(os.stat(_).st_mtime >= mtime for _ in caches.values())
+    except OSError:
+        return False
+
+
+def read_vib(filename, cache=True):
+    """Read a CHARMM normal mode card file.
+
+    Parameters
+    ----------
+    filename : str
+        Normal mode card file
+    cache : bool, optional
+        Use and create the cache files
+
+    Returns
+    -------
+    frequencies : :class:`~numpy.ndarray`
+        Frequencies (in cm\\ :sup:`-1`) of the modes
+    eigenvectors : :class:`~numpy.ndarray`
+        Eigenvectors with shape (n_modes, 3 n_atoms), memory-mapped if
+        cached
+    masses : :class:`~numpy.ndarray`
+        Atomic masses
+
+    Raises
+    ------
+    ValueError
+        The number of components of an eigenvector does not match the number
+        of atoms.
+    """
+    caches = cache_files(filename)
+    if cache and _cache_valid(filename, caches):
+        return (np.load(caches["frequencies"]),
+                np.load(caches["eigenvectors"], mmap_mode="r"),
+                np.load(caches["masses"]))
+
+    logger.info("Reading {}...".format(filename))
+    n_modes, n_atoms = _scan(filename)
+    shape = (n_modes, 3 * n_atoms)
+    if cache:
+        temporary = caches["eigenvectors"] + ".tmp"
+        eigenvectors = np.lib.format.open_memmap(
+            temporary, mode="w+", dtype=np.float64, shape=shape)
+    else:
+        eigenvectors = np.empty(shape)
+    frequencies = np.empty(n_modes)
+    try:
+        masses = _parse(filename, frequencies, eigenvectors)
+    except ValueError:
+        if cache:
+            del eigenvectors
+            os.remove(temporary)
+        raise
+
+    if cache:
+        eigenvectors.flush()
+        del eigenvectors
+        np.save(caches["frequencies"], frequencies)
+        np.save(caches["masses"], masses)
+        os.rename(temporary, caches["eigenvectors"])
+        eigenvectors = np.load(caches["eigenvectors"], mmap_mode="r")
+    return frequencies, eigenvectors, masses
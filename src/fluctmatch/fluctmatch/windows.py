@@ -0,0 +1,247 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+"""Virtual windows of a trajectory.
+
+Splitting a trajectory writes a copy of every window. A virtual window
+instead names a range of frames of a trajectory, and the programs that
+need the frames of the window read only that range of the trajectory.
+
+A manifest lists the windows of a data directory as JSON, e.g.::
+
+    {"windows": [{"name": "1", "start": 0, "stop": 10000,
+                  "trajectory": "/data/md.xtc",
+                  "cg_trajectory": "cg.dcd"}, ...]}
+
+where `start` is the first frame of the window counted from zero and `stop`
+is the frame after its last one. `trajectory` is the atomistic trajectory
+of the frames, and `cg_trajectory` is its coarse-grain trajectory with the
+same frames, which ``fluctmatch convert --manifest`` adds. Relative
+trajectory paths are relative to the manifest. The subdirectory of each
+window within the data directory holds its input and output files as usual.
+"""
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.builtins import (
+    open,
+    range,
+    str,
+    zip,
+)
+
+import collections
+import json
+import logging
+import math
+import os
+from os import path
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "windows.json"
+
+class Window(
+        collections.namedtuple(
+            "Window",
+            ["name", "start", "stop", "trajectory", "cg_trajectory"])):
+    """A range of frames of a trajectory.
+
+    Parameters
+    ----------
+    name : str
+        Name of the window and of its subdirectory
+    start : int
+        First frame, counted from zero
+    stop : int
+        Frame after the last frame
+    trajectory : str
+        Atomistic trajectory file
+    cg_trajectory : str, optional
+        Coarse-grain trajectory file with the same frames
+    """
+    __slots__ = ()
+
+    def __new__(cls, name, start, stop, trajectory, cg_trajectory=None):
+        return super(Window, cls).__new__(cls, name, start, stop, trajectory,
+                                          cg_trajectory)
+
+
+def half_overlapping(start, stop, window_size, trajectory):
+    """Windows that overlap by half of their size.
+
+    The windows are the same as those that `splittraj` writes.
+
+    Parameters
+    ----------
+    start : int
+        First frame, counted from one
+    stop : int
+        Last frame, counted from one
+    window_size : int
+        Number of frames per window
+    trajectory : str
+        Trajectory file
+
+    Returns
+    -------
+    list of :class:`Window`
+    """
+    half_size = window_size // 2
+    beg = start - half_size if start >= window_size else start
+    values = zip(
+        range(beg, stop + 1, half_size),
+        range(beg + window_size - 1, stop + 1, half_size))
+    return [
+        Window("{:d}".format(y // half_size - 1), x - 1, y, trajectory)
+        for x, y in values
+    ]
+
+
+def time_frames(windows, time, dt):
+    """Windows of frames from windows of times.
+
+    Given in times, the windows of :func:`half_overlapping` are those that
+    ``gmx trjconv -b -e`` writes: window `w` holds the frames whose times lie
+    between ``w.start + 1`` and ``w.stop``.
+
+    Parameters
+    ----------
+    windows : iterable of :class:`Window`
+        Windows in times (ps)
+    time : float
+        Time of the first frame of the trajectory (ps)
+    dt : float
+        Time between frames (ps)
+
+    Returns
+    -------
+    list of :class:`Window`
+    """
+    # Tolerance for times that are rounded in the trajectory file
+    eps = 1.e-3
+    frames = []
+    for window in windows:
+        first = int(math.ceil((window.start + 1 - time) / dt - eps))
+        last = int(math.floor((window.stop - time) / dt + eps))
+        frames.append(window._replace(start=max(first, 0), stop=last + 1))
+    return frames
+
+
+def cg_trajectory(window):
+    """Coarse-grain trajectory of a window.
+
+    Parameters
+    ----------
+    window : :class:`Window`
+        Window of a manifest
+
+    Returns
+    -------
+    str
+        Coarse-grain trajectory file
+
+    Raises
+    ------
+    ValueError
+        If the manifest has no coarse-grain trajectory
+    """
+    if window.cg_trajectory is None:
+        raise ValueError(
+            "Window {} has no coarse-grain trajectory. Please convert the "
+            "windows with 'fluctmatch convert --manifest'.".format(
+                window.name))
+    return window.cg_trajectory
+
+
+def write_manifest(filename, windows):
+    """Write the manifest of the windows.
+
+    Parameters
+    ----------
+    filename : str
+        Manifest file
+    windows : iterable of :class:`Window`
+        Windows
+    """
+    manifest = dict(windows=[])
+    for window in windows:
+        item = dict(
+            name="{}".format(window.name),
+            start=int(window.start),
+            stop=int(window.stop),
+            trajectory=window.trajectory)
+        if window.cg_trajectory is not None:
+            item["cg_trajectory"] = window.cg_trajectory
+        manifest["windows"].append(item)
+    with open(filename + ".tmp", "w") as output:
+        output.write(str(json.dumps(manifest, indent=2)))
+    os.rename(filename + ".tmp", filename)
+    logger.info("Wrote {:d} windows to {}.".format(
+        len(manifest["windows"]), filename))
+
+
+def read_manifest(filename):
+    """Read the windows of a manifest.
+
+    Parameters
+    ----------
+    filename : str
+        Manifest file
+
+    Returns
+    -------
+    :class:`~collections.OrderedDict`
+        :class:`Window` by name
+    """
+    with open(filename) as manifest:
+        data = json.load(manifest)
+    directory = path.dirname(path.abspath(filename))
+    windows = collections.OrderedDict()
+    for item in data["windows"]:
+        cg_file = item.get("cg_trajectory")
+        window = Window("{}".format(item["name"]), int(item["start"]),
+                        int(item["stop"]),
+                        path.join(directory, item["trajectory"]),
+                        None if cg_file is None else path.join(
+                            directory, cg_file))
+        if not 0 <= window.start < window.stop:
+            raise ValueError("Window {} has no frames.".format(window.name))
+        windows[window.name] = window
+    return windows
+
+
+def find_manifest(datadir):
+    """Windows of the manifest in a data directory, if any.
+
+    Parameters
+    ----------
+    datadir : str
+        Data directory
+
+    Returns
+    -------
+    :class:`~collections.OrderedDict`
+        :class:`Window` by name; empty without a manifest
+    """
+    filename = path.join(datadir, MANIFEST)
+    if not path.exists(filename):
+        return collections.OrderedDict()
+    return read_manifest(filename)
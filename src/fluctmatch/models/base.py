@@ -26,12 +26,11 @@ from __future__ import (
 from future.builtins import super, zip
 from future.utils import (
     raise_with_traceback,
-    viewitems,
+    string_types,
     with_metaclass,
 )
 
 import abc
-import itertools
 import logging
 import string
 
@@ -46,6 +45,7 @@ from MDAnalysis.topology import base as topbase
 from MDAnalysis.topology import guessers
 from fluctmatch import (_DESCRIBE, _MODELS)
 from fluctmatch.models import trajectory
+from fluctmatch.models.cache import TrajectoryCache
 
 logger = logging.getLogger(__name__)
 
@@ -160,12 +160,22 @@ class ModelBase(with_metaclass(_ModelMeta, mda.Universe)):
                    OT*"}
         would split residues into 2 beads containing the C-alpha atom and the
         sidechain.
+
+        The bead coordinates are stored in a
+        :class:`~fluctmatch.models.cache.TrajectoryCache` given by the cache
+        keyword, which may also be a directory or True for the default
+        directory.
         """
         # Coarse grained Universe
         # Make a blank Universe for myself.
         super().__init__()
 
         self._com = kwargs.pop("com", True)
+        self._cache = kwargs.pop("cache", None)
+        if self._cache is True:
+            self._cache = TrajectoryCache()
+        elif isinstance(self._cache, string_types):
+            self._cache = TrajectoryCache(self._cache)
 
         # Atomistic Universe
         try:
@@ -202,12 +212,52 @@ class ModelBase(with_metaclass(_ModelMeta, mda.Universe)):
         # This replaces load_new in a traditional Universe
         try:
             self.trajectory = trajectory._Trajectory(
-                self.atu, mapping, n_atoms=self.atoms.n_atoms, com=self._com)
+                self.atu,
+                mapping,
+                n_atoms=self.atoms.n_atoms,
+                com=self._com,
+                cache=self._cache)
         except (IOError, TypeError) as exc:
             raise_with_traceback(
                 RuntimeError("Unable to open {}".format(
                     self.atu.trajectory.filename)))
 
+    def _map_beads(self, mapping):
+        """Determine the atomic attributes of the beads.
+
+        Each selection of the mapping is evaluated once over the atomistic
+        universe (see :func:`~fluctmatch.models.trajectory.select_beads`),
+        and the masses and charges of the beads are summed over their atoms
+        with :func:`numpy.add.reduceat`.
+
+        Parameters
+        ----------
+        mapping : dict
+            Mapping definitions per bead
+
+        Returns
+        -------
+        atomids, atomnames, resids, resnames, segids, charges, masses
+            Arrays with one value per bead
+        """
+        atoms = self.atu.atoms
+        atomids, indices, starts = trajectory.select_beads(atoms, mapping)
+        first = indices[starts]
+
+        atomnames = np.asarray(list(mapping), dtype=np.object)
+        atomnames = atomnames[atomids % len(mapping)]
+        resids = atoms.resids[first]
+        resnames = atoms.resnames[first]
+        segids, inverse = np.unique(atoms.segids[first], return_inverse=True)
+        segids = np.asarray([_.split("_")[-1] for _ in segids],
+                            dtype=np.object)[inverse]
+        try:
+            charges = np.add.reduceat(atoms.charges[indices], starts)
+        except AttributeError:
+            charges = np.zeros(atomids.size)
+        masses = np.add.reduceat(atoms.masses[indices], starts)
+        return atomids, atomnames, resids, resnames, segids, charges, masses
+
     def _apply_map(self, mapping):
         """Apply the mapping scheme to the beads.
 
@@ -220,36 +270,9 @@ class ModelBase(with_metaclass(_ModelMeta, mda.Universe)):
         -------
         :class:`~MDAnalysis.core.topology.Topology` defining the new universe.
         """
-        # Allocate arrays
-        _beads = []
-        atomnames = []
-        atomids = []
-        resids = []
-        resnames = []
-        segids = []
-        charges = []
-        masses = []
-
-        residues = self.atu.atoms.split("residue")
-        select_residues = enumerate(
-            itertools.product(residues, viewitems(mapping)))
-        for i, (res, (name, selection)) in select_residues:
-            bead = res.select_atoms(selection)
-            if bead:
-                _beads.append(bead)
-                atomnames.append(name)
-                atomids.append(i)
-                resids.append(bead.resids[0])
-                resnames.append(bead.resnames[0])
-                segids.append(bead.segids[0].split("_")[-1])
-                try:
-                    charges.append(bead.total_charge())
-                except AttributeError:
-                    charges.append(0.)
-                masses.append(bead.total_mass())
-
-        _beads = np.array(_beads)
-        n_atoms = len(_beads)
+        (atomids, atomnames, resids, resnames, segids, charges,
+         masses) = self._map_beads(mapping)
+        n_atoms = atomids.size
 
         # Atom
         # _beads = topattrs._Beads(_beads)
@@ -343,6 +366,10 @@ class ModelBase(with_metaclass(_ModelMeta, mda.Universe)):
 def Merge(*args):
     """Combine multiple coarse-grain systems into one.
 
+    The trajectory of the merged universe reads the trajectories of the
+    systems together and concatenates their coordinates only on demand, so
+    no frames are held in memory.
+
     Parameters
     ----------
     args : iterable of either :class:`~MDAnalysis.Universe` or :class:`~MDAnalysis.AtomGroup`
@@ -352,10 +379,6 @@ def Merge(*args):
     :class:`~MDAnalysis.Universe`
         A merged universe.
     """
-    from MDAnalysis.coordinates.memory import MemoryReader
-
-    logger.warning("This might take a while depending upon the number of "
-                   "trajectory frames.")
     if not all([
         u.universe.trajectory.n_frames ==
         args[0].universe.trajectory.n_frames
@@ -364,17 +387,11 @@ def Merge(*args):
         logger.error("The trajectories are not the same length.")
         raise ValueError("The trajectories are not the same length.")
     ag = [_.atoms for _ in args]
-    unit_cell = np.mean([_._unitcell for _ in args[0].trajectory], axis=0)
     universe = mda.Merge(*ag)
 
     if args[0].universe.trajectory.n_frames > 1:
-        traj = (_.trajectory for _ in args)
-        coordinates = [
-            np.concatenate([_.positions for _ in ts], axis=0)
-            for ts in zip(*traj)
-        ]
-        coordinates = np.array(coordinates)
-        if universe.atoms.n_atoms != coordinates.shape[1]:
+        universe.trajectory = trajectory._MergedTrajectory(ag)
+        if universe.atoms.n_atoms != universe.trajectory.n_atoms:
             logger.error(
                 "The number of sites does not match the number of coordinates."
             )
@@ -382,14 +399,7 @@ def Merge(*args):
                 "The number of sites does not match the number of coordinates."
             )
         logger.info("The new universe has {1} beads in {0} frames.".format(
-            *coordinates.shape))
-
-        universe.load_new(coordinates, format=MemoryReader)
-        logger.warning(
-            "The new trajectory will is assigned an average unit cell "
-            "for the entire trajectory. This is currently a limitation "
-            "implemented by MDAnalysis.")
-        universe.trajectory.ts._unitcell = unit_cell
+            universe.trajectory.n_frames, universe.trajectory.n_atoms))
     return universe
 
 
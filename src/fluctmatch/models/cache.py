@@ -0,0 +1,301 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+"""On-disk cache of coarse-grain trajectories.
+
+Mapping an atomistic trajectory onto the beads requires reading every
+atomistic frame. The bead coordinates of a complete trajectory are therefore
+stored as float32 NumPy files, and later universes with the same atomistic
+files, mapping, and center of mass/geometry read them as memory-mapped arrays
+instead.
+
+An entry is identified by a SHA-1 digest of the topology and trajectory
+files (path, size, and modification time), the mapping, and the weights of
+the atoms of each bead, so a modified input file or a different model never
+reuses an entry. Entries are stored in the cache directory as
+``<key>.positions.npy`` and ``<key>.boxes.npy``. The least recently used
+entries are removed whenever the cache exceeds its maximum size.
+"""
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.builtins import str
+from future.utils import native_str
+
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+from os import path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = path.join(
+    os.environ.get("XDG_CACHE_HOME", path.join(path.expanduser("~"),
+                                               ".cache")), "fluctmatch")
+MAX_SIZE = 10 * 1024**3
+
+
+def _as_list(filenames):
+    if isinstance(filenames, (list, tuple)):
+        return list(filenames)
+    return [filenames]
+
+
+def _update_files(digest, filenames):
+    for filename in _as_list(filenames):
+        filename = path.abspath(filename)
+        stat = os.stat(filename)
+        digest.update(
+            "{}:{:d}:{!r}\n".format(filename, stat.st_size,
+                                    stat.st_mtime).encode("utf-8"))
+
+
+def _update_mapping(digest, mapping):
+    if isinstance(mapping, dict):
+        for key in sorted(mapping):
+            digest.update("{}=".format(key).encode("utf-8"))
+            _update_mapping(digest, mapping[key])
+            digest.update(b";")
+    else:
+        digest.update(str(mapping).encode("utf-8"))
+
+
+class TrajectoryCache(object):
+    """Size-bounded cache of coarse-grain trajectories.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Location of the cache (default: ``$XDG_CACHE_HOME/fluctmatch``)
+    max_size : int, optional
+        Maximum size of the cache in bytes
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_size=MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        try:
+            os.makedirs(self.directory)
+        except OSError:
+            pass
+
+    def __repr__(self):
+        return "<TrajectoryCache {} ({:d} of {:d} bytes)>".format(
+            self.directory, self.size, self.max_size)
+
+    def _filenames(self, key):
+        prefix = path.join(self.directory, key)
+        return dict(
+            positions=".".join((prefix, "positions", "npy")),
+            boxes=".".join((prefix, "boxes", "npy")),
+        )
+
+    def key(self, topology, trajectory, mapping, weights, com=True):
+        """Digest that identifies a coarse-grain trajectory.
+
+        Parameters
+        ----------
+        topology : str
+            Atomistic topology file
+        trajectory : str or list of str
+            Atomistic trajectory file(s)
+        mapping : dict
+            Definitions of the beads
+        weights : :class:`~scipy.sparse.csr_matrix`
+            Weights of the atoms of each bead
+        com : bool, optional
+            Center of mass or center of geometry
+
+        Returns
+        -------
+        str
+            Hexadecimal SHA-1 digest
+        """
+        digest = hashlib.sha1()
+        _update_files(digest, topology)
+        _update_files(digest, trajectory)
+        _update_mapping(digest, mapping)
+        digest.update("com={!r}\n".format(bool(com)).encode("utf-8"))
+        weights = weights.tocsr()
+        for array in (weights.indptr, weights.indices, weights.data):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Coarse-grain trajectory of an entry.
+
+        Parameters
+        ----------
+        key : str
+            Digest of the entry
+
+        Returns
+        -------
+        tuple or None
+            Read-only memory-mapped bead coordinates with shape
+            (n_frames, n_beads, 3) and the unit cells, or None if the cache
+            has no entry
+        """
+        filenames = self._filenames(key)
+        try:
+            positions = np.load(filenames["positions"], mmap_mode="r")
+            boxes = np.load(filenames["boxes"])
+        except (IOError, OSError, ValueError):
+            return None
+        if positions.shape[0] != boxes.shape[0]:
+            logger.warning("Removing the inconsistent cache entry {}.".format(
+                key))
+            self.remove(key)
+            return None
+
+        # The modification time orders the entries for eviction.
+        for filename in filenames.values():
+            try:
+                os.utime(filename, None)
+            except OSError:
+                pass
+        return positions, boxes
+
+    def put(self, key, blocks, n_frames, n_beads):
+        """Store a coarse-grain trajectory while it is mapped.
+
+        The blocks are passed through unchanged. The entry is only stored
+        once every frame was written, so an interrupted iteration does not
+        leave an incomplete entry.
+
+        Parameters
+        ----------
+        key : str
+            Digest of the entry
+        blocks : iterable
+            Bead coordinates and unit cells of consecutive blocks of frames
+        n_frames : int
+            Number of frames of the trajectory
+        n_beads : int
+            Number of beads
+
+        Yields
+        ------
+        positions, boxes : :class:`~numpy.ndarray`
+            The blocks
+        """
+        filenames = self._filenames(key)
+        needed = n_frames * (n_beads * 3 + 6) * 4
+        if needed > self.max_size:
+            logger.info("The trajectory is larger than the cache.")
+            for block in blocks:
+                yield block
+            return
+
+        fd, filename = tempfile.mkstemp(
+            suffix=".npy", prefix=native_str(key), dir=self.directory)
+        os.close(fd)
+        boxes = np.zeros((n_frames, 6), dtype=np.float32)
+        stored = 0
+        try:
+            positions = np.lib.format.open_memmap(
+                filename,
+                mode="w+",
+                dtype=np.float32,
+                shape=(n_frames, n_beads, 3))
+            for block in blocks:
+                size = block[0].shape[0]
+                positions[stored:stored + size] = block[0]
+                boxes[stored:stored + size] = block[1]
+                stored += size
+                yield block
+            positions.flush()
+            del positions
+            if stored == n_frames:
+                np.save(filenames["boxes"], boxes)
+                os.rename(filename, filenames["positions"])
+                logger.info("Cached the coarse-grain trajectory as {}.".format(
+                    filenames["positions"]))
+                self.evict(keep=key)
+        finally:
+            if path.exists(filename):
+                os.remove(filename)
+
+    def remove(self, key):
+        """Remove an entry.
+
+        Parameters
+        ----------
+        key : str
+            Digest of the entry
+        """
+        for filename in self._filenames(key).values():
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+    def entries(self):
+        """Entries from the least to the most recently used.
+
+        Returns
+        -------
+        list of tuple
+            Digest, last use, and size in bytes of each entry
+        """
+        entries = []
+        pattern = path.join(self.directory, "*.positions.npy")
+        for filename in glob.glob(pattern):
+            key = path.basename(filename).split(".")[0]
+            try:
+                stats = [os.stat(_) for _ in self._filenames(key).values()]
+            except OSError:
+                continue
+            entries.append((key, max(_.st_mtime for _ in stats),
+                            sum(_.st_size for _ in stats)))
+        return sorted(entries, key=lambda entry: entry[1])
+
+    @property
+    def size(self):
+        """Total size of the entries in bytes."""
+        return sum(_[2] for _ in self.entries())
+
+    def evict(self, keep=None):
+        """Remove the least recently used entries until the cache fits.
+
+        Parameters
+        ----------
+        keep : str, optional
+            Digest of an entry that is never removed
+        """
+        entries = self.entries()
+        size = sum(_[2] for _ in entries)
+        for key, _, nbytes in entries:
+            if size <= self.max_size:
+                break
+            if key == keep:
+                continue
+            logger.info("Evicting {} from the trajectory cache.".format(key))
+            self.remove(key)
+            size -= nbytes
+
+    def clear(self):
+        """Remove every entry."""
+        for key, _, _ in self.entries():
+            self.remove(key)
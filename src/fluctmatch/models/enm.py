@@ -40,12 +40,14 @@ class Enm(ModelBase):
 
     Determines the interactions between beads via distance cutoffs `rmin` and
     `rmax`. The atoms and residues are also renamed to prevent name collision
-    when working with fluctuation matching.
+    when working with fluctuation matching. The average structure used for
+    the cutoffs is determined by `n_workers` processes.
     """
     model = "ENM"
     describe = "Elastic network model"
 
     def __init__(self, *args, **kwargs):
+        self._n_workers = kwargs.pop("n_workers", 1)
         super().__init__(*args, **kwargs)
         self._rmin = kwargs.get("rmin", 0.)
         self._rmax = kwargs.get("rmax", 10.)
@@ -84,7 +86,8 @@ class Enm(ModelBase):
             self._add_impropers()
 
     def _add_bonds(self):
-        positions = fmutils.AverageStructure(self.atu.atoms).run().result
+        positions = fmutils.AverageStructure(
+            self.atu.atoms, n_workers=self._n_workers).run().result
         distmat = distance_array(positions, positions, backend="OpenMP")
         if self._rmin > 0.:
             a0, a1 = np.where((distmat >= self._rmin) &
@@ -24,9 +24,7 @@ from future.builtins import (
     dict,
     zip,
 )
-from future.utils import viewitems
 
-import itertools
 from collections import OrderedDict
 
 from MDAnalysis.core import (
@@ -267,40 +265,10 @@ class Polar(ModelBase):
         -------
         :class:`~MDAnalysis.core.topology.Topology` defining the new universe.
         """
-        # Allocate arrays
-        _beads = []
-        atomnames = []
-        atomids = []
-        resids = []
-        resnames = []
-        segids = []
-        charges = []
-        masses = []
-
-        residues = self.atu.atoms.split("residue")
-        select_residues = enumerate(
-            itertools.product(residues, viewitems(mapping)))
-        for i, (res, (name, selection)) in select_residues:
-            if name != "CB":
-                bead = res.select_atoms(selection)
-            else:
-                bead = res.select_atoms(
-                    selection.get(res.resname[0], "hsidechain and not name H*"))
-            if bead:
-                _beads.append(bead)
-                atomnames.append(name)
-                atomids.append(i)
-                resids.append(bead.resids[0])
-                resnames.append(bead.resnames[0])
-                segids.append(bead.segids[0].split("_")[-1])
-                try:
-                    charges.append(bead.total_charge())
-                except AttributeError:
-                    charges.append(0.)
-                masses.append(bead.total_mass())
-
-        _beads = np.array(_beads)
-        n_atoms = len(_beads)
+        # The side chain selection of CB depends on the residue name.
+        (atomids, atomnames, resids, resnames, segids, charges,
+         masses) = self._map_beads(mapping)
+        n_atoms = atomids.size
 
         # Atom
         # _beads = topattrs._Beads(_beads)
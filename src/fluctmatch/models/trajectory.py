@@ -23,12 +23,259 @@ from __future__ import (
     print_function,
     unicode_literals,
 )
+from future.builtins import (
+    range,
+    zip,
+)
 from future.utils import viewitems
 
+import collections
 import itertools
+import logging
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+from os import path
 
+import numpy as np
 import MDAnalysis
 from MDAnalysis.coordinates import base
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+
+def select_beads(atoms, mapping, default="hsidechain and not name H*"):
+    """Determine the atoms of every bead of a coarse-grain mapping.
+
+    Each selection of the mapping is evaluated once over all atoms instead
+    of once per residue, and the selected atoms are grouped into beads by
+    their residue with NumPy. The beads are ordered by residue and then by
+    the order of the mapping, the atoms of a bead by their index, as if the
+    selections had been applied to each residue in turn; this holds for all
+    selections of single atoms, such as names, types, or residue names.
+
+    Parameters
+    ----------
+    atoms : :class:`~MDAnalysis.AtomGroup`
+        Atomistic atoms
+    mapping : dict
+        Selection string of each bead name, or a dict with a selection
+        string per residue name
+    default : str, optional
+        Selection for residue names missing from a dict of selections
+
+    Returns
+    -------
+    ids : :class:`~numpy.ndarray`
+        Index of each bead among all pairs of residue and bead name
+    indices : :class:`~numpy.ndarray`
+        Atom indices of the beads, one bead after the other
+    starts : :class:`~numpy.ndarray`
+        Position of the first atom of each bead in `indices`
+    """
+    residues = np.unique(atoms.resindices)
+    keys = []
+    indices = []
+    for i, (_, selection) in enumerate(viewitems(mapping)):
+        if isinstance(selection, dict):
+            resnames = atoms.resnames
+            groups = [(value, np.in1d(resnames, [
+                name for name in selection if selection[name] == value
+            ])) for value in set(selection.values())]
+            groups.append((default, ~np.in1d(resnames, list(selection))))
+            groups = [
+                atoms[mask].select_atoms(value) for value, mask in groups
+                if mask.any()
+            ]
+        else:
+            groups = [atoms.select_atoms(selection)]
+        for group in groups:
+            positions = np.searchsorted(residues, group.resindices)
+            keys.append(positions * len(mapping) + i)
+            indices.append(group.indices)
+    if not keys:
+        return (np.zeros(0, dtype=np.intp), ) * 3
+
+    keys = np.concatenate(keys)
+    indices = np.concatenate(indices)
+    order = np.lexsort((indices, keys))
+    keys = keys[order]
+    indices = indices[order]
+    ids, starts = np.unique(keys, return_index=True)
+    return ids, indices, starts
+
+
+def map_positions(weights, positions):
+    """Map atomistic coordinates of several frames onto the beads.
+
+    Parameters
+    ----------
+    weights : :class:`~scipy.sparse.csr_matrix`
+        Weights of the atoms with shape (n_beads, n_atoms)
+    positions : :class:`~numpy.ndarray`
+        Atomistic coordinates with shape (n_frames, n_atoms, 3)
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Bead coordinates with shape (n_frames, n_beads, 3)
+    """
+    n_frames, n_atoms, _ = positions.shape
+    columns = positions.transpose((1, 0, 2)).reshape((n_atoms, -1))
+    beads = weights.dot(columns)
+    beads = beads.reshape((-1, n_frames, 3)).transpose((1, 0, 2))
+    return beads.astype(np.float32)
+
+
+def _read_frames(reader, frames, positions, boxes):
+    """Read the coordinates and unit cells of a range of frames.
+
+    Parameters
+    ----------
+    reader : :class:`~MDAnalysis.coordinates.base.ReaderBase`
+        Atomistic trajectory
+    frames : range
+        Frames to read
+    positions : :class:`~numpy.ndarray`
+        Array for the coordinates with at least len(frames) rows
+    boxes : :class:`~numpy.ndarray`
+        Array for the unit cells with at least len(frames) rows
+    """
+    for i, ts in enumerate(reader[frames.start:frames.stop:frames.step]):
+        positions[i] = ts.positions
+        if ts.dimensions is not None:
+            boxes[i] = ts.dimensions
+
+
+def _read_blocks(reader, frames, n_frames):
+    """Read the coordinates and unit cells of a range of frames in blocks.
+
+    Parameters
+    ----------
+    reader : :class:`~MDAnalysis.coordinates.base.ReaderBase`
+        Trajectory
+    frames : range
+        Frames to read
+    n_frames : int
+        Number of frames per block
+
+    Yields
+    ------
+    positions : :class:`~numpy.ndarray`
+        Coordinates with shape (n_frames, n_atoms, 3); the array is reused
+        for the next block.
+    boxes : :class:`~numpy.ndarray`
+        Unit cells with shape (n_frames, 6)
+    """
+    positions = np.empty((min(n_frames, len(frames)), reader.ts.n_atoms, 3),
+                         dtype=np.float32)
+    boxes = np.zeros((positions.shape[0], 6), dtype=np.float32)
+    for first in range(0, len(frames), n_frames):
+        block = frames[first:first + n_frames]
+        _read_frames(reader, block, positions, boxes)
+        yield positions[:len(block)], boxes[:len(block)].copy()
+
+
+def open_blocks(sources, weights, frames, n_frames):
+    """Open a trajectory and iterate over a range of frames in blocks.
+
+    Worker processes use this to read their part of a trajectory with a
+    reader of their own.
+
+    Parameters
+    ----------
+    sources : tuple
+        Topology and trajectory files
+    weights : :class:`~scipy.sparse.csr_matrix` or None
+        Weights that map the atoms onto the beads, or None for the atomistic
+        coordinates
+    frames : range
+        Frames to read
+    n_frames : int
+        Number of frames per block
+
+    Yields
+    ------
+    positions : :class:`~numpy.ndarray`
+        Coordinates with shape (n_frames, n_atoms or n_beads, 3)
+    boxes : :class:`~numpy.ndarray`
+        Unit cells with shape (n_frames, 6)
+    """
+    universe = MDAnalysis.Universe(*sources)
+    try:
+        for positions, boxes in _read_blocks(universe.trajectory, frames,
+                                             n_frames):
+            if weights is not None:
+                positions = map_positions(weights, positions)
+            yield positions, boxes
+    finally:
+        universe.trajectory.close()
+
+
+def block_sources(universe):
+    """Files and weights with which another process reads a universe.
+
+    Parameters
+    ----------
+    universe : :class:`~MDAnalysis.Universe`
+        An atomistic or coarse-grain universe
+
+    Returns
+    -------
+    tuple or None
+        Arguments `sources` and `weights` of :func:`open_blocks`, or None if
+        the trajectory cannot be opened again or is read from the cache
+    """
+    trajectory = universe.trajectory
+    if isinstance(trajectory, _Trajectory):
+        sources = trajectory._sources()
+        if sources is None or trajectory._cached is not None:
+            return None
+        return sources, trajectory._position_weights
+
+    topology = getattr(universe, "filename", None)
+    filenames = (getattr(trajectory, "filenames", None)
+                 or getattr(trajectory, "filename", None))
+    if topology is None or filenames is None:
+        return None
+    return (topology, filenames), None
+
+
+def _map_frames(args):
+    """Map a range of atomistic frames onto the beads in a worker process.
+
+    Parameters
+    ----------
+    args : tuple
+        Topology and trajectory files, weights, (start, stop, step) of the
+        frames, number of frames per block, and the NumPy file for the bead
+        coordinates
+
+    Returns
+    -------
+    filename : str
+        NumPy file with the bead coordinates
+    boxes : :class:`~numpy.ndarray`
+        Unit cells of the frames
+    """
+    sources, weights, frames, n_frames, filename = args
+    frames = range(*frames)
+    beads = np.lib.format.open_memmap(
+        filename,
+        mode="w+",
+        dtype=np.float32,
+        shape=(len(frames), weights.shape[0], 3))
+    boxes = np.zeros((len(frames), 6), dtype=np.float32)
+    first = 0
+    for positions, block in open_blocks(sources, weights, frames, n_frames):
+        beads[first:first + positions.shape[0]] = positions
+        boxes[first:first + positions.shape[0]] = block
+        first += positions.shape[0]
+    beads.flush()
+    del beads
+    return filename, boxes
 
 
 class _Trajectory(base.ReaderBase):
@@ -39,9 +286,20 @@ class _Trajectory(base.ReaderBase):
 
     Would also probably work as a standalone thingy for writing out
     coarse grained trajectories.
+
+    The beads are determined once. Each bead property is a weighted sum over
+    its atoms, so the positions, velocities, and forces of all beads are
+    calculated with one sparse matrix product per frame. The positions are
+    weighted by mass (center of mass) or uniformly (center of geometry), and
+    the velocities and forces are summed.
+
+    With a :class:`~fluctmatch.models.cache.TrajectoryCache`, the bead
+    coordinates of a complete pass over the trajectory are stored on disk,
+    and later blocks of frames are read from the memory-mapped cache instead
+    of the atomistic trajectory.
     """
 
-    def __init__(self, universe, mapping, n_atoms=1, com=True):
+    def __init__(self, universe, mapping, n_atoms=1, com=True, cache=None):
         """
 
         Parameters
@@ -57,6 +315,8 @@ class _Trajectory(base.ReaderBase):
             value of MDAnalysis.core.flags [‘convert_lengths’].
         com : bool, optional
             Calculate center of mass or center of geometry per bead definition.
+        cache : :class:`~fluctmatch.models.cache.TrajectoryCache`, optional
+            Cache of the bead coordinates.
         kwargs : dict, optional
             Additonal arguments for use within the MDAnalysis coordinate reader.
         """
@@ -64,23 +324,37 @@ class _Trajectory(base.ReaderBase):
         self._t = universe.trajectory
         self.__dict__.update(universe.trajectory.__dict__)
         self._mapping = mapping
-        residue_selection = itertools.product(self._u.residues,
-                                              viewitems(self._mapping))
-
-        self._beads = []
-        for res, (key, selection) in residue_selection:
-            if key != "CB":
-                self._beads.append(res.atoms.select_atoms(selection))
-            elif key == "CB":
-                if isinstance(selection, dict):
-                    value = selection.get(res.resname,
-                                          "hsidechain and not name H*")
-                    self._beads.append(res.atoms.select_atoms(value))
-                else:
-                    self._beads.append(res.atoms.select_atoms(selection))
-            self._beads = [_ for _ in self._beads if _]
+        _, self._indices, self._starts = select_beads(self._u.atoms,
+                                                      self._mapping)
 
         self.com = com
+        sizes = np.diff(np.append(self._starts, self._indices.size))
+        if com:
+            masses = self._u.universe.atoms.masses[self._indices]
+            totals = np.add.reduceat(masses, self._starts)
+            self._position_weights = self._weight_matrix(
+                masses / np.repeat(totals, sizes))
+        else:
+            self._position_weights = self._weight_matrix(
+                np.repeat(1. / sizes, sizes))
+        self._sum_weights = self._weight_matrix(
+            np.ones(self._indices.size))
+
+        self._cache = cache
+        self._cache_key = None
+        self._cached = None
+        sources = self._sources()
+        if cache is not None and sources is None:
+            logger.warning("The atomistic universe was not read from files "
+                           "and cannot be cached.")
+        elif cache is not None:
+            self._cache_key = cache.key(sources[0], sources[1], mapping,
+                                        self._position_weights, com)
+            self._cached = cache.get(self._cache_key)
+            if self._cached is not None:
+                logger.info("Reading the coarse-grain trajectory from the "
+                            "cache.")
+        self._time0 = self._t.ts.time - self._t.ts.frame * self._t.ts.dt
         self._auxs = self._t._auxs
         try:
             self._frame = self._t._frame
@@ -116,7 +390,7 @@ class _Trajectory(base.ReaderBase):
                 yield self._read_next_timestep()
             except StopIteration:
                 self._reopen()
-                raise StopIteration
+                return
 
     def __len__(self):
         #         return self.n_frames
@@ -125,6 +399,33 @@ class _Trajectory(base.ReaderBase):
     def __repr__(self):
         return "<CG Trajectory doing {:d} beads >".format(self.n_atoms)
 
+    @property
+    def _beads(self):
+        """The atoms of each bead."""
+        atoms = self._u.universe.atoms
+        return [atoms[_] for _ in np.split(self._indices, self._starts[1:])]
+
+    def _weight_matrix(self, weights):
+        """Create a sparse matrix that maps atomic values onto the beads.
+
+        Parameters
+        ----------
+        weights : :class:`~numpy.ndarray`
+            Weights of the atoms of the beads in the order of their indices
+
+        Returns
+        -------
+        :class:`~scipy.sparse.csr_matrix`
+            Weights with shape (n_beads, n_atoms of the atomistic system)
+        """
+        n_beads = self._starts.size
+        rows = np.repeat(
+            np.arange(n_beads),
+            np.diff(np.append(self._starts, self._indices.size)))
+        return sparse.csr_matrix(
+            (weights, (rows, self._indices)),
+            shape=(n_beads, self._t.ts.n_atoms))
+
     def _fill_ts(self, other_ts):
         """Rip information from atomistic TS into our ts
 
@@ -144,40 +445,205 @@ class _Trajectory(base.ReaderBase):
             self.ts.dimensions[:dim] = other_ts.dimensions
         self.ts.dt = other_ts.dt
 
-        residues = self._u.atoms.split("residue")
-        if self.ts.has_positions:
-            if self.com:
-                self.ts._pos[:] = [
-                    bead.center_of_mass() for bead in self._beads
-                ]
-            else:
-                self.ts._pos[:] = [
-                    bead.center_of_geometry() for bead in self._beads
-                ]
-
-        residue_selection = itertools.product(residues, viewitems(
-            self._mapping))
+        if self.ts.has_positions and self._cached is not None:
+            self.ts._pos[:] = self._cached[0][other_ts.frame]
+        elif self.ts.has_positions:
+            self.ts._pos[:] = self._map(other_ts.positions[np.newaxis])[0]
         if self.ts.has_velocities:
-            try:
-                self.ts._velocities[:] = [
-                    res.select_atoms(selection).velocities.sum()
-                    for res, (_, selection) in residue_selection
-                    if res.select_atoms(selection)
-                ]
-            except ValueError:
-                pass
-
+            self.ts._velocities[:] = self._sum_weights.dot(
+                other_ts.velocities)
         if self.ts.has_forces:
-            try:
-                self.ts._forces[:] = [
-                    res.select_atoms(selection).forces.sum()
-                    for res, (_, selection) in residue_selection
-                    if res.select_atoms(selection)
-                ]
-            except ValueError:
-                pass
+            self.ts._forces[:] = self._sum_weights.dot(other_ts.forces)
+
+    def _map(self, positions):
+        """Map atomistic coordinates of several frames onto the beads.
+
+        Parameters
+        ----------
+        positions : :class:`~numpy.ndarray`
+            Atomistic coordinates with shape (n_frames, n_atoms, 3)
+
+        Returns
+        -------
+        :class:`~numpy.ndarray`
+            Bead coordinates with shape (n_frames, n_beads, 3)
+        """
+        return map_positions(self._position_weights, positions)
+
+    def _sources(self):
+        """Topology and trajectory files of the atomistic universe.
+
+        Returns
+        -------
+        tuple or None
+            Arguments to open the atomistic universe again, or None if it was
+            not created from files
+        """
+        topology = getattr(self._u, "filename", None)
+        trajectory = (getattr(self._t, "filenames", None)
+                      or getattr(self._t, "filename", None))
+        if topology is None or trajectory is None:
+            return None
+        return topology, trajectory
+
+    def iter_blocks(self,
+                    n_frames=100,
+                    start=None,
+                    stop=None,
+                    step=None,
+                    dimensions=False,
+                    n_workers=1,
+                    tmpdir=None):
+        """Iterate over the bead coordinates in blocks of frames.
+
+        The atomistic coordinates of a block are read into one array and
+        mapped onto the beads with one matrix product.
+
+        With several workers, each worker process opens the atomistic
+        trajectory, maps a contiguous range of frames, and stores the bead
+        coordinates in a temporary file. A worker starts a new range only
+        after the oldest one has been read, which bounds the temporary files
+        to about one range per worker. The blocks are returned in the order
+        of the frames and are identical to those of a single process.
+
+        A pass over every frame is stored in the cache of the trajectory, if
+        any, and cached frames are returned as views of the memory-mapped
+        cache.
+
+        Parameters
+        ----------
+        n_frames : int, optional
+            Number of frames per block
+        start : int, optional
+            First frame
+        stop : int, optional
+            Frame at which to stop
+        step : int, optional
+            Number of frames between frames of a block
+        dimensions : bool, optional
+            Also return the unit cell of each frame
+        n_workers : int, optional
+            Number of worker processes
+        tmpdir : str, optional
+            Directory of the temporary files of the workers (default: the
+            system temporary directory)
+
+        Yields
+        ------
+        positions : :class:`~numpy.ndarray`
+            Bead coordinates with shape (n_frames, n_beads, 3); the last
+            block may be shorter.
+        dimensions : :class:`~numpy.ndarray`
+            Unit cells with shape (n_frames, 6), if requested
+        """
+        frames = range(*slice(start, stop, step).indices(self.n_frames))
+        sources = self._sources()
+        if n_workers > 1 and sources is None:
+            logger.warning("The atomistic universe was not read from files. "
+                           "The trajectory is mapped by one process.")
+        if self._cached is not None:
+            blocks = self._cached_blocks(frames, n_frames)
+        elif (n_workers > 1 and sources is not None
+              and len(frames) > n_frames):
+            blocks = self._parallel_blocks(frames, n_frames, n_workers,
+                                           sources, tmpdir)
+        else:
+            blocks = self._serial_blocks(frames, n_frames)
+        complete = len(frames) == self.n_frames and frames.step == 1
+        if self._cached is None and self._cache_key is not None and complete:
+            blocks = self._cache.put(self._cache_key, blocks, self.n_frames,
+                                     self._position_weights.shape[0])
+        try:
+            for beads, boxes in blocks:
+                if dimensions:
+                    yield beads, boxes
+                else:
+                    yield beads
+            if self._cached is None and self._cache_key is not None:
+                self._cached = self._cache.get(self._cache_key)
+        finally:
+            blocks.close()
+            self._reopen()
+
+    def _cached_blocks(self, frames, n_frames):
+        positions, boxes = self._cached
+        for first in range(0, len(frames), n_frames):
+            block = frames[first:first + n_frames]
+            yield (positions[block.start:block.stop:block.step],
+                   boxes[block.start:block.stop:block.step])
+
+    def _serial_blocks(self, frames, n_frames):
+        for positions, boxes in _read_blocks(self._t, frames, n_frames):
+            yield self._map(positions), boxes
+
+    def _parallel_blocks(self, frames, n_frames, n_workers, sources,
+                         tmpdir=None):
+        # Several ranges per worker balance the load, and each range is a
+        # multiple of the block size.
+        n_blocks = -(-len(frames) // n_frames)
+        size = n_frames * max(1, n_blocks // (4 * n_workers))
+        tmpdir = tempfile.mkdtemp(prefix="cgtraj", dir=tmpdir)
+        chunks = [frames[first:first + size]
+                  for first in range(0, len(frames), size)]
+        tasks = iter([(sources, self._position_weights,
+                       (chunk.start, chunk.stop, chunk.step), n_frames,
+                       path.join(tmpdir, "{:d}.npy".format(i)))
+                      for i, chunk in enumerate(chunks)])
+        pool = mp.Pool(n_workers)
+        try:
+            # Only one range per worker is submitted ahead of the one being
+            # read, so at most n_workers + 1 ranges are on disk.
+            pending = collections.deque(
+                pool.apply_async(_map_frames, (task, ))
+                for task in itertools.islice(tasks, n_workers))
+            while pending:
+                filename, boxes = pending.popleft().get()
+                for task in itertools.islice(tasks, 1):
+                    pending.append(pool.apply_async(_map_frames, (task, )))
+                positions = np.load(filename, mmap_mode="r")
+                for first in range(0, positions.shape[0], n_frames):
+                    yield (np.array(positions[first:first + n_frames]),
+                           boxes[first:first + n_frames])
+                del positions
+                os.remove(filename)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    @property
+    def _from_cache(self):
+        """Whether frames are read from the cache only.
+
+        The cache holds the positions and the unit cells, so the atomistic
+        trajectory is still read for velocities or forces.
+        """
+        return (self._cached is not None and not self.ts.has_velocities
+                and not self.ts.has_forces)
+
+    def _fill_cached(self, frame):
+        """Fill our ts with a frame of the cache.
+
+        Parameters
+        ----------
+        frame : int
+            Frame of the trajectory
+        """
+        positions, boxes = self._cached
+        self.ts.frame = frame
+        self.ts.time = self._time0 + frame * self.ts.dt
+        self.ts.dimensions = boxes[frame]
+        if self.ts.has_positions:
+            self.ts._pos[:] = positions[frame]
 
     def _read_next_timestep(self, ts=None):
+        if self._from_cache:
+            if self.ts.frame + 1 >= self.n_frames:
+                raise StopIteration
+            self._fill_cached(self.ts.frame + 1)
+            return self.ts
+
         # Get the next TS from the atom trajectory
         at_ts = self._t.next()
 
@@ -185,6 +651,10 @@ class _Trajectory(base.ReaderBase):
         return self.ts
 
     def _read_frame(self, frame):
+        if self._from_cache:
+            self._fill_cached(frame)
+            return self.ts
+
         self._t._read_frame(frame)
         self._fill_ts(self._t.ts)
 
@@ -217,3 +687,181 @@ class _Trajectory(base.ReaderBase):
     @property
     def n_frames(self):
         return self._t.n_frames
+
+
+class _MergedTrajectory(base.ReaderBase):
+    """Trajectory of several coarse-grain systems combined into one.
+
+    The component trajectories are kept open and advanced together, and the
+    coordinates of their atoms are concatenated for the current frame or
+    for a block of frames only when requested. The memory does not depend
+    upon the length of the trajectory. The unit cell is the one of the
+    first component.
+    """
+
+    def __init__(self, atomgroups):
+        """
+
+        Parameters
+        ----------
+        atomgroups : list of :class:`~MDAnalysis.AtomGroup`
+            Atoms of each component in the order of the merged universe.
+        """
+        self._trajectories = [_.universe.trajectory for _ in atomgroups]
+        self._indices = [_.indices for _ in atomgroups]
+        self._offsets = np.cumsum([0] + [len(_) for _ in self._indices])
+        first = self._trajectories[0]
+
+        self.filename = None
+        self.n_atoms = int(self._offsets[-1])
+        self.format = first.format
+        self.units.update(first.units)
+        self.convert_units = MDAnalysis.core.flags["convert_lengths"]
+        self._auxs = {}
+        self.fixed = getattr(first, "fixed", False)
+        self.periodic = getattr(first, "periodic", True)
+
+        self.ts = self._Timestep(self.n_atoms, positions=True)
+        self._fill_ts()
+
+    def __iter__(self):
+        self._reopen()
+
+        yield self.ts
+        while True:
+            try:
+                yield self._read_next_timestep()
+            except (StopIteration, EOFError, IOError):
+                self._reopen()
+                return
+
+    def __len__(self):
+        return self.n_frames
+
+    def __repr__(self):
+        return "<Merged CG Trajectory of {:d} systems with {:d} beads>".format(
+            len(self._trajectories), self.n_atoms)
+
+    def _fill_ts(self):
+        """Combine the current frames of the components into our ts."""
+        other_ts = self._trajectories[0].ts
+        self.ts.frame = other_ts.frame
+        self.ts.time = other_ts.time
+        self.ts.dt = other_ts.dt
+        try:
+            self.ts.dimensions = other_ts.dimensions
+        except (TypeError, ValueError):
+            pass
+        for trajectory, indices, first, last in zip(
+                self._trajectories, self._indices, self._offsets[:-1],
+                self._offsets[1:]):
+            self.ts._pos[first:last] = trajectory.ts.positions[indices]
+
+    def iter_blocks(self,
+                    n_frames=100,
+                    start=None,
+                    stop=None,
+                    step=None,
+                    dimensions=False,
+                    n_workers=1,
+                    tmpdir=None):
+        """Iterate over the coordinates in blocks of frames.
+
+        Each component returns a block of its frames, which are then
+        concatenated.
+
+        Parameters
+        ----------
+        n_frames : int, optional
+            Number of frames per block
+        start : int, optional
+            First frame
+        stop : int, optional
+            Frame at which to stop
+        step : int, optional
+            Number of frames between frames of a block
+        dimensions : bool, optional
+            Also return the unit cell of each frame
+        n_workers : int, optional
+            Number of worker processes of each coarse-grain component
+        tmpdir : str, optional
+            Directory of the temporary files of the workers
+
+        Yields
+        ------
+        positions : :class:`~numpy.ndarray`
+            Coordinates with shape (n_frames, n_atoms, 3); the last block may
+            be shorter.
+        dimensions : :class:`~numpy.ndarray`
+            Unit cells with shape (n_frames, 6), if requested
+        """
+        frames = range(*slice(start, stop, step).indices(self.n_frames))
+        blocks = []
+        for trajectory in self._trajectories:
+            if hasattr(trajectory, "iter_blocks"):
+                blocks.append(
+                    trajectory.iter_blocks(
+                        n_frames,
+                        frames.start,
+                        frames.stop,
+                        frames.step,
+                        dimensions=True,
+                        n_workers=n_workers,
+                        tmpdir=tmpdir))
+            else:
+                blocks.append(_read_blocks(trajectory, frames, n_frames))
+        try:
+            for parts in zip(*blocks):
+                positions = np.concatenate(
+                    [
+                        block[:, indices]
+                        for (block, _), indices in zip(parts, self._indices)
+                    ],
+                    axis=1)
+                if dimensions:
+                    yield positions, parts[0][1]
+                else:
+                    yield positions
+        finally:
+            for block in blocks:
+                block.close()
+            self._reopen()
+
+    def _read_next_timestep(self, ts=None):
+        for trajectory in self._trajectories:
+            trajectory._read_next_timestep()
+        self._fill_ts()
+        return self.ts
+
+    def _read_frame(self, frame):
+        for trajectory in self._trajectories:
+            trajectory._read_frame(frame)
+        self._fill_ts()
+        return self.ts
+
+    def _reopen(self):
+        self._read_frame(0)
+
+    def close(self):
+        """Close the component trajectories."""
+        for trajectory in self._trajectories:
+            trajectory.close()
+
+    def rewind(self):
+        """Position at beginning of trajectory"""
+        self._reopen()
+
+    @property
+    def dimensions(self):
+        """unitcell dimensions (*A*, *B*, *C*, *alpha*, *beta*, *gamma*)
+        """
+        return self.ts.dimensions
+
+    @property
+    def dt(self):
+        """timestep between frames"""
+        return self.ts.dt
+
+    @property
+    def n_frames(self):
+        return self._trajectories[0].n_frames
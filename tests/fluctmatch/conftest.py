@@ -0,0 +1,49 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import numpy as np
+import pytest
+from scipy.spatial.distance import (
+    pdist,
+    squareform,
+)
+
+
+@pytest.fixture
+def network():
+    """Random elastic network of 20 atoms with a 14 A cutoff.
+
+    Returns
+    -------
+    positions, bonds, kb, b0
+        Coordinates, atom indices of the bonds, force constants, and
+        equilibrium distances
+    """
+    rng = np.random.RandomState(0)
+    positions = rng.normal(scale=5.0, size=(20, 3))
+    distances = squareform(pdist(positions))
+    i, j = np.where((distances > 0.) & (distances < 14.0))
+    bonds = np.stack([i[i < j], j[i < j]], axis=1)
+    kb = rng.uniform(0.5, 2.0, size=bonds.shape[0])
+    b0 = distances[bonds[:, 0], bonds[:, 1]]
+    return positions, bonds, kb, b0
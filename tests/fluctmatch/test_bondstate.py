@@ -0,0 +1,122 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.builtins import open
+from future.utils import native_str
+
+import numpy as np
+import pandas as pd
+from numpy import testing
+from fluctmatch.fluctmatch import bondstate
+
+
+def _tables():
+    names = ["A{:d}".format(_) for _ in range(5)]
+    target = pd.DataFrame(
+        dict(
+            I=names[:-1],
+            J=names[1:],
+            Kb=[0.1, 0.2, 0.3, 0.4],
+            b0=[3.8, 3.9, 4.0, 4.1]),
+        columns=["I", "J", "Kb", "b0"])
+    parameters = target.iloc[::-1].reset_index(drop=True)
+    parameters["Kb"] = [4., 3., 2., 1.]
+    return target, parameters
+
+
+def test_from_tables():
+    target, parameters = _tables()
+    state = bondstate.BondState.from_tables(parameters, target)
+    testing.assert_allclose(state.kb, [1., 2., 3., 4.])
+    testing.assert_allclose(state.target_fluct, target["Kb"])
+    testing.assert_allclose(state.target_avg, target["b0"])
+    table = state.to_table(kb=np.zeros(4))
+    assert list(table.columns) == ["I", "J", "Kb", "b0"]
+    testing.assert_array_equal(table["I"], target["I"])
+    testing.assert_allclose(table["Kb"], 0.)
+
+
+def test_take():
+    target, parameters = _tables()
+    state = bondstate.BondState.from_tables(parameters, target)
+    table = target.iloc[[2, 0, 3, 1]].reset_index(drop=True)
+    table["r_IJ"] = table["b0"] + 1.
+    testing.assert_allclose(
+        state.take(table),
+        target["b0"] + 1.,
+        err_msg=native_str("Internal coordinates are in the wrong order."),
+    )
+    table["r_IJ"] += 1.
+    testing.assert_allclose(state.take(table), target["b0"] + 2.)
+
+
+def test_bond_parameter_file(tmpdir):
+    target, parameters = _tables()
+    state = bondstate.BondState.from_tables(parameters, target)
+    filename = tmpdir.join("fluctmatch.prm").strpath
+    with open(filename, "wb") as prmfile:
+        prmfile.write("* Title\n\nBONDS\n".encode())
+        np.savetxt(
+            prmfile,
+            state.to_table(),
+            fmt=native_str("%-6s %-6s %10.4f%10.4f"))
+        prmfile.write("\nEND\n".encode())
+
+    bondstate.BondParameterFile(filename, state.index).write(
+        state.kb * 2., state.b0)
+    with open(filename) as prmfile:
+        lines = prmfile.readlines()
+    assert lines[:3] == ["* Title\n", "\n", "BONDS\n"]
+    assert lines[-2:] == ["\n", "END\n"]
+    bonds = [_.split() for _ in lines[3:-2]]
+    testing.assert_array_equal([_[0] for _ in bonds], target["I"])
+    testing.assert_allclose([float(_[2]) for _ in bonds], state.kb * 2.)
+
+
+def test_checkpoint(tmpdir):
+    target, parameters = _tables()
+    state = bondstate.BondState.from_tables(parameters, target)
+    state.average = state.target_avg + 0.1
+    sections = dict(
+        ATOMS=pd.DataFrame(
+            dict(
+                hdr=["MASS"] * 5,
+                type=np.arange(5),
+                atom=["A{:d}".format(_) for _ in range(5)],
+                mass=np.full(5, 12.011)),
+            columns=["hdr", "type", "atom", "mass"]),
+        BONDS=state.to_table())
+    errors = [[1, 0.5, 0.1, 0.01], [2, 0.25, 0.05, 0.01]]
+    filename = tmpdir.join("fluctmatch.checkpoint.npz").strpath
+    bondstate.save_checkpoint(filename, state, sections, errors)
+
+    new, tables, history = bondstate.load_checkpoint(filename)
+    testing.assert_equal(new.index.tolist(), state.index.tolist())
+    for attr in ("kb", "b0", "target_fluct", "target_avg", "average"):
+        testing.assert_allclose(getattr(new, attr), getattr(state, attr))
+    testing.assert_allclose(history, errors)
+    assert sorted(tables) == ["ATOMS", "BONDS"]
+    testing.assert_equal(tables["ATOMS"].columns.tolist(),
+                         sections["ATOMS"].columns.tolist())
+    testing.assert_equal(tables["ATOMS"]["atom"].tolist(),
+                         sections["ATOMS"]["atom"].tolist())
+    testing.assert_allclose(tables["BONDS"]["Kb"], state.kb)
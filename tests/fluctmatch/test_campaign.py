@@ -0,0 +1,121 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.builtins import open
+
+import json
+import os
+from os import path
+
+from fluctmatch.fluctmatch import campaign
+
+
+class _Engine(object):
+    """Stand-in for a fluctuation matching engine."""
+
+    def __init__(self, topology, trajectory, outdir=None, **kwargs):
+        self.outdir = outdir
+        self.filenames = dict(
+            dynamic_prm=path.join(outdir, "fluctmatch.dist.prm"))
+
+    def initialize(self, nma_exec=None, restart=False, warm_start=None):
+        with open(path.join(self.outdir, "restart"), "a") as restart_file:
+            restart_file.write("{}\n".format(restart))
+        with open(path.join(self.outdir, "warm_start"), "w") as warm_file:
+            warm_file.write("{}".format(warm_start))
+        if path.exists(path.join(self.outdir, "fail")):
+            raise RuntimeError("Failure requested.")
+        if path.exists(path.join(self.outdir, "crash")):
+            os._exit(1)
+
+    def run(self, nma_exec=None, tol=1.e-4, n_cycles=250):
+        with open(path.join(self.outdir, "done"), "w") as done:
+            done.write("done\n")
+
+
+def _campaign(tmpdir, monkeypatch, **kwargs):
+    monkeypatch.setitem(campaign.ENGINES, "TEST", _Engine)
+    for window in ("1", "2", "10"):
+        directory = tmpdir.mkdir(window)
+        directory.join("fluctmatch.xplor.psf").write(
+            "PSF\n\n       3 !NATOM\n")
+    tmpdir.join("1").join("fail").write("")
+    kwargs.setdefault("n_workers", 2)
+    return campaign.Campaign(tmpdir.strpath, engine="TEST", **kwargs)
+
+
+def test_windows(tmpdir, monkeypatch):
+    fm_campaign = _campaign(tmpdir, monkeypatch)
+    tmpdir.mkdir("empty")
+    windows = [path.basename(_) for _ in fm_campaign.windows]
+    assert windows == ["1", "2", "10"]
+    assert fm_campaign.pool_size(fm_campaign.windows) == 2
+
+
+def test_resume(tmpdir, monkeypatch):
+    fm_campaign = _campaign(tmpdir, monkeypatch)
+    table = fm_campaign.run()
+    assert list(table.index) == ["1", "2", "10"]
+    assert list(table["status"]) == ["failed", "done", "done"]
+    with open(tmpdir.join(campaign.Campaign.status_file).strpath) as status:
+        assert json.load(status)["1"]["error"].startswith("RuntimeError")
+
+    # Only the failed window runs again, and it restarts from its files.
+    tmpdir.join("1").join("fail").remove()
+    table = fm_campaign.run()
+    assert list(table["status"]) == ["done", "done", "done"]
+    assert tmpdir.join("1").join("restart").read() == "False\nTrue\n"
+    assert tmpdir.join("2").join("restart").read() == "False\n"
+
+
+def test_warm_start(tmpdir, monkeypatch):
+    fm_campaign = _campaign(tmpdir, monkeypatch, n_workers=1, warm_start=True)
+    tmpdir.join("1").join("fail").remove()
+    table = fm_campaign.run()
+    assert list(table["status"]) == ["done", "done", "done"]
+    assert tmpdir.join("1").join("warm_start").read() == "None"
+    assert tmpdir.join("2").join("warm_start").read() == (
+        tmpdir.join("1").join("fluctmatch.dist.prm").strpath)
+    assert tmpdir.join("10").join("warm_start").read() == (
+        tmpdir.join("2").join("fluctmatch.dist.prm").strpath)
+
+
+def test_lost_worker(tmpdir, monkeypatch):
+    monkeypatch.setattr(campaign.Campaign, "poll_interval", 0.1)
+    fm_campaign = _campaign(tmpdir, monkeypatch)
+    tmpdir.join("2").join("crash").write("")
+    table = fm_campaign.run()
+    assert list(table["status"]) == ["failed", "failed", "done"]
+    assert "exited" in table.loc["2", "error"]
+
+
+def test_restart(tmpdir, monkeypatch):
+    fm_campaign = _campaign(tmpdir, monkeypatch, restart=True)
+    fm_campaign.run()
+    assert tmpdir.join("2").join("restart").read() == "True\n"
+
+
+def test_unpicklable_arguments(tmpdir, monkeypatch):
+    fm_campaign = _campaign(tmpdir, monkeypatch, callback=lambda _: None)
+    table = fm_campaign.run()
+    assert list(table["status"]) == ["failed", "failed", "failed"]
+    assert not tmpdir.join("2").join("restart").check()
@@ -0,0 +1,122 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import numpy as np
+import pandas as pd
+import MDAnalysis as mda
+from click.testing import CliRunner
+from numpy import testing
+from fluctmatch.commands import cmd_convert
+from fluctmatch.fluctmatch import charmmfluctmatch
+from fluctmatch.fluctmatch import windows
+from ..datafiles import (
+    TPR,
+    XTC,
+)
+
+
+def test_warm_start(tmpdir):
+    filename = tmpdir.join("neighbor.dist.prm")
+    filename.write("* Neighboring window\n\n"
+                   "BONDS\n"
+                   "A1     A2         5.0000    3.8000\n"
+                   "A3     A4         7.0000    3.8000\n\n"
+                   "END\n")
+    cfm = charmmfluctmatch.CharmmFluctMatch(outdir=tmpdir.strpath)
+    cfm.parameters["BONDS"] = pd.DataFrame(
+        dict(I=["A1", "A2"], J=["A2", "A3"], Kb=[1., 2.], b0=[3.8, 3.9]),
+        columns=["I", "J", "Kb", "b0"])
+    cfm._warm_start(filename.strpath)
+    testing.assert_allclose(cfm.parameters["BONDS"]["Kb"], [5., 2.])
+    testing.assert_allclose(cfm.parameters["BONDS"]["b0"], [3.8, 3.9])
+
+
+def test_minimization_steps(tmpdir):
+    # Progress lines are printed every NPRINT (10) steps, while the final
+    # reports give the last step of each minimization.
+    log = tmpdir.join("fluctmatch.log")
+    log.write(
+        " CHARMM>    mini   sd nstep 100\n"
+        "MINI MIN: Cycle      ENERgy      Delta-E         GRMS    Step-size\n"
+        "MINI>        0    -12.34567      0.00000      1.23456      0.02000\n"
+        "MINI>       10    -15.67890      3.33323      0.98765      0.00864\n"
+        "MINI>      100    -20.12345      0.00012      0.12345      0.00123\n"
+        " STEEPD> Minimization exiting with number of steps limit (    100)"
+        " exceeded.\n"
+        "STPD END>    100    -20.12345     0.00012      0.12345     0.00123\n"
+        " CHARMM>    mini abnr nstep 2000\n"
+        "MINI>        0    -20.12345      0.00000      0.12345      0.00000\n"
+        "MINI>       10    -21.00000      0.87655      0.01234      0.00100\n"
+        "MINI>       20    -21.00100      0.00100      0.00098      0.00010\n"
+        " ABNR> Minimization exiting with gradient tolerance (  0.0010000)"
+        " satisfied.\n"
+        "ABNR END>     23    -21.00101     0.00001     0.00087     0.00010\n"
+    )
+    assert charmmfluctmatch._minimization_steps(log.strpath) == 123
+
+    # Without the final reports, the progress lines are counted.
+    log.write("MINI>        0    -12.34567      0.00000      1.23456\n"
+              "MINI>       10    -15.67890      3.33323      0.98765\n"
+              "MINI>        0    -15.67890      0.00000      0.98765\n"
+              "MINI>       20    -16.00000      0.32110      0.12345\n")
+    assert charmmfluctmatch._minimization_steps(log.strpath) == 30
+
+
+def test_manifest_windows(tmpdir):
+    # A manifest of the atomistic trajectory, as 'splittraj --manifest'
+    # writes it.
+    datadir = tmpdir.mkdir("data")
+    manifest = datadir.join(windows.MANIFEST).strpath
+    n_frames = mda.Universe(TPR, XTC).trajectory.n_frames
+    windows.write_manifest(manifest, [
+        windows.Window("1", 0, n_frames // 2, XTC),
+        windows.Window("2", n_frames // 2, n_frames, XTC),
+    ])
+
+    result = CliRunner().invoke(cmd_convert.cli, [
+        "-s", TPR, "-f", XTC, "-l", tmpdir.join("convert.log").strpath,
+        "-o", datadir.strpath, "-p", "fluctmatch", "-m", "CALPHA",
+        "--manifest", manifest
+    ])
+    assert result.exit_code == 0, result.output
+
+    cg_file = datadir.join("fluctmatch.dcd").strpath
+    cg_universe = mda.Universe(
+        datadir.join("1", "fluctmatch.xplor.psf").strpath, cg_file)
+    assert cg_universe.trajectory.n_frames == n_frames
+    bonds = np.array(
+        [cg_universe.bonds.bonds() for _ in cg_universe.trajectory])
+    for name, window in windows.read_manifest(manifest).items():
+        assert window.cg_trajectory == cg_file
+        outdir = datadir.join(name).strpath
+        cfm = charmmfluctmatch.CharmmFluctMatch(
+            datadir.join(name, "fluctmatch.xplor.psf").strpath,
+            outdir=outdir,
+            window=window,
+            init="python")
+        assert cfm.filenames["traj_file"] == cg_file
+        cfm.initialize()
+        testing.assert_allclose(
+            cfm.target["BONDS"]["b0"],
+            bonds[window.start:window.stop].mean(axis=0),
+            rtol=1e-5)
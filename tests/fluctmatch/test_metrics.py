@@ -0,0 +1,99 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.builtins import open
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from numpy import testing
+from fluctmatch.fluctmatch import metrics
+
+
+def test_cycle_metrics(tmpdir):
+    filename = tmpdir.join("metrics.jsonl").strpath
+    records = []
+    cycle = metrics.CycleMetrics(filename, records.append)
+    for step in (1, 2):
+        with cycle.phase("charmm"):
+            sum(range(1000))
+        with cycle.phase("update"):
+            pass
+        with cycle.phase("update"):
+            pass
+        cycle.finish(step, rss=1024, Kb_rms=0.5 / step, fluct_rms=0.1)
+
+    with open(filename) as jsonl:
+        lines = [json.loads(_) for _ in jsonl]
+    assert len(lines) == len(records) == 2
+    for line, record in zip(lines, records):
+        assert line["step"] == record["step"]
+        assert sorted(line["phases"]) == ["charmm", "update"]
+        assert line["rss"] == 1024
+        assert line["wall"] >= sum(_["wall"] for _ in line["phases"].values())
+    testing.assert_allclose([_["Kb_rms"] for _ in lines], [0.5, 0.25])
+
+
+def test_add_cpu():
+    cycle = metrics.CycleMetrics()
+    with cycle.phase("charmm"):
+        pass
+    cycle.add_cpu("charmm", 10.)
+    cycle.add_cpu("charmm", None)
+    record = cycle.finish(1)
+    assert record["phases"]["charmm"]["cpu"] >= 10.
+    assert record["cpu"] >= 10.
+
+
+def test_rss():
+    assert metrics.self_rss() > 0
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/stat"),
+                    reason="requires /proc")
+def test_running_process():
+    process = subprocess.Popen(
+        [sys.executable, "-c", "import sys; sys.stdin.read()"],
+        stdin=subprocess.PIPE)
+    try:
+        assert metrics.child_rss(process.pid) > 0
+        metrics.reset_child_rss(process.pid)
+        assert metrics.child_rss(process.pid) > 0
+        assert metrics.process_cpu_time(process.pid) >= 0.
+    finally:
+        process.communicate()
+    assert metrics.child_rss(process.pid) is None
+    assert metrics.process_cpu_time(process.pid) is None
+
+
+def test_check_call():
+    rss, cpu = metrics.check_call(
+        [sys.executable, "-c", "sum(range(10 ** 6))"])
+    if hasattr(os, "wait4"):
+        assert rss > 0
+        assert cpu > 0.
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        metrics.check_call([sys.executable, "-c", "exit(3)"])
+    assert excinfo.value.returncode == 3
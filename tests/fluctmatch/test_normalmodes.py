@@ -0,0 +1,120 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.utils import native_str
+
+import numpy as np
+from numpy import testing
+from fluctmatch.fluctmatch import normalmodes
+
+
+def test_hessian_finite_difference(network):
+    positions, bonds, kb, b0 = network
+    b0 *= 1.02
+    positions, _ = normalmodes.minimize(positions, bonds, kb, b0)
+    hessian = normalmodes.hessian(positions, bonds, kb, b0)
+
+    eps = 1.e-6
+    _, gradient = normalmodes.energy(positions.ravel(), bonds, kb, b0)
+    numerical = np.zeros_like(hessian)
+    for k in range(hessian.shape[0]):
+        coordinates = positions.ravel().copy()
+        coordinates[k] += eps
+        numerical[:, k] = (normalmodes.energy(coordinates, bonds, kb, b0)[1]
+                           - gradient) / eps
+    testing.assert_allclose(
+        hessian,
+        numerical,
+        atol=1.e-4,
+        err_msg=native_str("Hessian does not match the gradient."),
+    )
+
+
+def test_bond_fluctuations(network):
+    positions, bonds, kb, b0 = network
+    hessian = normalmodes.hessian(positions, bonds, kb, b0)
+    cov = normalmodes.covariance(hessian)
+    fluct = normalmodes.bond_fluctuations(cov, positions, bonds, 0.6)
+
+    vectors, lengths = normalmodes.bond_vectors(positions, bonds)
+    n_dim = hessian.shape[0]
+    projection = np.zeros((bonds.shape[0], n_dim))
+    for k, (i, j) in enumerate(bonds):
+        projection[k, 3 * i:3 * i + 3] = -vectors[k] / lengths[k]
+        projection[k, 3 * j:3 * j + 3] = vectors[k] / lengths[k]
+    expected = np.sqrt(0.6 * np.einsum(
+        "bi,ij,bj->b", projection, np.linalg.pinv(hessian, rcond=1.e-10),
+        projection))
+    testing.assert_allclose(
+        fluct,
+        expected,
+        rtol=1.e-6,
+        err_msg=native_str("Bond fluctuations don't match."),
+    )
+
+
+def test_sparse_bond_fluctuations(network):
+    positions, bonds, kb, b0 = network
+    hessian = normalmodes.hessian(positions, bonds, kb, b0)
+    cov = normalmodes.covariance(hessian)
+    fluct = normalmodes.bond_fluctuations(cov, positions, bonds, 0.6)
+
+    hessian = normalmodes.hessian(positions, bonds, kb, b0, dense=False)
+    sparse_fluct = normalmodes.sparse_bond_fluctuations(
+        hessian, positions, bonds, 0.6, batch_size=7)
+    testing.assert_allclose(
+        sparse_fluct,
+        fluct,
+        rtol=1.e-6,
+        err_msg=native_str("Sparse and dense fluctuations don't match."),
+    )
+
+
+def test_bond_covariance(network):
+    positions, bonds, kb, b0 = network
+    hessian = normalmodes.hessian(positions, bonds, kb, b0)
+    cov = normalmodes.covariance(hessian)
+    pairs = normalmodes.bond_pairs(positions, bonds, 8.0)
+    coupling = normalmodes.bond_covariance(cov, positions, bonds, 0.6, pairs)
+
+    vectors, lengths = normalmodes.bond_vectors(positions, bonds)
+    projection = np.zeros((bonds.shape[0], hessian.shape[0]))
+    for k, (i, j) in enumerate(bonds):
+        projection[k, 3 * i:3 * i + 3] = -vectors[k] / lengths[k]
+        projection[k, 3 * j:3 * j + 3] = vectors[k] / lengths[k]
+    expected = 0.6 * np.dot(np.dot(projection, cov), projection.T)
+    testing.assert_allclose(
+        coupling,
+        expected[pairs[:, 0], pairs[:, 1]],
+        atol=1.e-10,
+        err_msg=native_str("Bond covariances don't match."),
+    )
+
+    hessian = normalmodes.hessian(positions, bonds, kb, b0, dense=False)
+    _, sparse_coupling = normalmodes.sparse_bond_fluctuations(
+        hessian, positions, bonds, 0.6, batch_size=7, pairs=pairs)
+    testing.assert_allclose(
+        sparse_coupling,
+        coupling,
+        atol=1.e-10,
+        err_msg=native_str("Sparse and dense covariances don't match."),
+    )
@@ -0,0 +1,101 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import numpy as np
+from numpy import testing
+from scipy import (
+    constants,
+    stats,
+)
+from fluctmatch.fluctmatch import quasiharmonic
+
+
+def _trajectory(n_frames=50, n_atoms=8, seed=7):
+    random = np.random.RandomState(seed)
+    reference = random.uniform(-10., 10., (n_atoms, 3))
+    rotations = stats.special_ortho_group.rvs(3, size=n_frames,
+                                              random_state=random)
+    frames = [
+        np.dot(reference + random.normal(0., 0.3, reference.shape), _) +
+        random.uniform(-5., 5., 3) for _ in rotations
+    ]
+    return reference, frames
+
+
+def test_superpose():
+    reference, _ = _trajectory()
+    rotation = stats.special_ortho_group.rvs(3, random_state=3)
+    positions = np.dot(reference, rotation) + [1., 2., 3.]
+    testing.assert_allclose(
+        quasiharmonic.superpose(positions, reference), reference, atol=1e-10)
+
+
+def test_covariance():
+    reference, frames = _trajectory()
+    aligned = np.array(
+        [quasiharmonic.superpose(_, reference).ravel() for _ in frames])
+    cov = quasiharmonic.Covariance(reference, block_size=7)
+    for positions in frames:
+        cov.update(positions)
+    assert cov.n_frames == len(frames)
+    testing.assert_allclose(
+        cov.covariance, np.cov(aligned, rowvar=False, bias=True), atol=1e-10)
+    testing.assert_allclose(
+        cov.mean.ravel(), aligned.mean(axis=0), atol=1e-10)
+
+
+def test_mode_thermodynamics():
+    # A low frequency approaches the classical limit.
+    temperature = 300.
+    entropy, enthalpy, heatcap = quasiharmonic.mode_thermodynamics(
+        np.array([1.e-3, np.inf]), temperature)
+    testing.assert_allclose(heatcap, [quasiharmonic.R, 0.], rtol=1e-6)
+    testing.assert_allclose(
+        enthalpy, [quasiharmonic.R * temperature, 0.], rtol=1e-6)
+    assert entropy[0] > 0. and entropy[1] == 0.
+
+
+def test_residue_thermodynamics():
+    reference, frames = _trajectory()
+    cov = quasiharmonic.Covariance(reference)
+    for positions in frames:
+        cov.update(positions)
+    masses = np.linspace(12., 16., reference.shape[0])
+    frequencies, vectors = quasiharmonic.modes(cov.covariance, masses)
+
+    # Six rigid-body motions are removed by the superposition.
+    assert np.isinf(frequencies).sum() == 6
+    values = quasiharmonic.residue_thermodynamics(
+        vectors, [0, 0, 0, 1, 1, 2, 2, 2], frequencies)
+    total = np.sum(quasiharmonic.mode_thermodynamics(frequencies), axis=1)
+    assert values.shape == (3, 3)
+    testing.assert_allclose(values.sum(axis=0), total)
+
+    # Frequency of a single oscillator of unit mass
+    kt = constants.k * 300.
+    variance = np.diag([1.e-2, 0., 0.])
+    frequencies, _ = quasiharmonic.modes(variance, [1.])
+    omega = np.sqrt(
+        kt / (1.e-2 * constants.atomic_mass * constants.angstrom**2))
+    testing.assert_allclose(
+        frequencies[0], omega / (2. * np.pi * constants.c) * constants.centi)
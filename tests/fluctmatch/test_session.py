@@ -0,0 +1,80 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import os
+import stat
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from fluctmatch.fluctmatch import session
+
+# Echoes each command like CHARMM and handles `echo`, `stop`, and `fail`.
+_STANDIN = """
+    import sys
+
+    for line in iter(sys.stdin.readline, ""):
+        sys.stdout.write(" CHARMM>    " + line)
+        words = line.split()
+        if not words:
+            continue
+        command = words[0].lower()
+        if command == "echo":
+            sys.stdout.write(" ".join(words[1:]) + "\\n")
+        elif command == "stop":
+            sys.exit(0)
+        elif command == "fail":
+            sys.exit(4)
+        sys.stdout.flush()
+    """
+
+
+@pytest.fixture()
+def charmm(tmpdir):
+    executable = str(tmpdir.join("charmm"))
+    with open(executable, "w") as standin:
+        standin.write("#!{}\n".format(sys.executable))
+        standin.write(textwrap.dedent(_STANDIN))
+    os.chmod(executable, os.stat(executable).st_mode | stat.S_IEXEC)
+    return executable
+
+
+def test_session_cycles(charmm, tmpdir):
+    logfile = str(tmpdir.join("charmm.log"))
+    with session.CharmmSession(charmm, logfile) as nma:
+        nma.start("read rtf card\n")
+        for _ in range(3):
+            nma.send("read para card\nvibran\nend")
+        assert nma.is_running
+    assert not nma.is_running
+    with open(logfile) as log:
+        assert log.read().count("read para card") == 3
+
+
+def test_session_error(charmm, tmpdir):
+    logfile = str(tmpdir.join("charmm.log"))
+    with pytest.raises(subprocess.CalledProcessError):
+        with session.CharmmSession(charmm, logfile) as nma:
+            nma.start("read rtf card\n")
+            nma.send("fail\n")
@@ -0,0 +1,101 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.utils import native_str
+
+import numpy as np
+import pytest
+from numpy import testing
+from scipy import sparse
+from fluctmatch.fluctmatch import (
+    normalmodes,
+    updates,
+)
+
+KT = 0.6
+SCALE = KT * 0.02
+
+
+def _fluctuations(positions, bonds, kb, b0, pairs):
+    hessian = normalmodes.hessian(positions, bonds, kb, b0)
+    cov = normalmodes.covariance(hessian)
+    fluct = normalmodes.bond_fluctuations(cov, positions, bonds, KT)
+    coupling = normalmodes.bond_covariance(cov, positions, bonds, KT, pairs)
+    coupling = sparse.coo_matrix(
+        (coupling, (pairs[:, 0], pairs[:, 1])), shape=(bonds.shape[0], ) * 2)
+    return fluct, (coupling + coupling.T).tocsr()
+
+
+def _cycles(network, strategy, tol=1.e-4, n_cycles=200):
+    positions, bonds, kb, b0 = network
+    pairs = normalmodes.bond_pairs(positions, bonds, 10.0)
+    target, _ = _fluctuations(positions, bonds, kb, b0, pairs)
+    kb = KT / np.square(target)
+    for i in range(1, n_cycles + 1):
+        fluct, coupling = _fluctuations(positions, bonds, kb, b0, pairs)
+        new_kb = strategy.update(kb, fluct, target, coupling=coupling)
+        if np.sqrt(np.mean(np.square(new_kb - kb))) < tol:
+            return i
+        kb = new_kb
+    return n_cycles
+
+
+def test_linear_update():
+    kb = np.array([1.0, 2.0, 0.01])
+    fluct = np.array([0.5, 0.4, 0.1])
+    target = np.array([0.4, 0.4, 0.5])
+    expected = kb - SCALE * (1. / fluct**2 - 1. / target**2)
+    expected = np.clip(expected, 0., None)
+    testing.assert_allclose(
+        updates.create("linear", SCALE).update(kb, fluct, target),
+        expected,
+        err_msg=native_str("Linear update differs from the original rule."),
+    )
+
+
+@pytest.mark.parametrize("name", ["anderson", "broyden"])
+def test_accelerated_update(network, name):
+    linear = _cycles(network, updates.create("linear", SCALE))
+    accelerated = _cycles(network, updates.create(name, SCALE))
+    assert accelerated < linear
+
+
+def test_newton_update(network):
+    newton = updates.create("newton", SCALE, kt=KT)
+    assert _cycles(network, newton) < 20
+    assert np.all(newton._previous[0] >= 0.)
+
+
+def test_unknown_update():
+    with pytest.raises(KeyError):
+        updates.create("unknown", SCALE)
+
+
+def test_broyden_restart():
+    broyden = updates.create("broyden", SCALE, history=2)
+    rng = np.random.RandomState(1)
+    target = rng.uniform(0.3, 0.6, size=5)
+    kb = np.ones(5)
+    for i in range(4):
+        kb = broyden.update(kb, target * (1. + 0.1 / (i + 1)), target)
+    # The third update restarts the history and is kept.
+    assert len(broyden._u) == 1
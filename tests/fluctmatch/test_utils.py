@@ -24,8 +24,10 @@ from future.utils import native_str
 
 import numpy as np
 import MDAnalysis as mda
+import pytest
 from numpy import testing
 from fluctmatch.fluctmatch import utils as fmutils
+from fluctmatch.models import protein
 from ..datafiles import (
     TPR,
     XTC,
@@ -68,6 +70,18 @@ def test_bond_fluctuation():
     )
 
 
+def test_bond_std_average():
+    universe = mda.Universe(TPR, XTC)
+    bonds = np.array([universe.bonds.bonds() for _ in universe.trajectory])
+    average = bonds[0]
+    std = fmutils.BondStd(universe, average=average).run().result
+    testing.assert_allclose(
+        std["r_IJ"],
+        np.sqrt(np.mean(np.square(bonds - average), axis=0)),
+        rtol=1e-5,
+    )
+
+
 def test_bond_all_stats():
     universe = mda.Universe(TPR, XTC)
     bond_average = np.mean(
@@ -84,3 +98,120 @@ def test_bond_all_stats():
         bond_average,
         err_msg=native_str("Bond averages don't match."),
     )
+
+
+def test_bond_moments():
+    bonds = 10. + np.random.RandomState(1).rand(50, 4)
+    moments = fmutils.BondMoments(4, order=4)
+    for i in range(0, 50, 7):
+        moments.update(bonds[i:i + 7])
+    merged = fmutils.BondMoments(4, order=4).update(bonds[:20]).merge(
+        fmutils.BondMoments(4, order=4).update(bonds[20:]))
+
+    deviations = bonds - bonds.mean(axis=0)
+    variance = np.mean(deviations**2, axis=0)
+    for _ in (moments, merged):
+        assert _.count == 50
+        testing.assert_allclose(_.mean, bonds.mean(axis=0))
+        testing.assert_allclose(_.std, bonds.std(axis=0))
+        testing.assert_allclose(
+            _.skewness,
+            np.mean(deviations**3, axis=0) / variance**1.5)
+        testing.assert_allclose(
+            _.kurtosis,
+            np.mean(deviations**4, axis=0) / variance**2 - 3.)
+
+
+def test_parallel_analysis():
+    universe = mda.Universe(TPR, XTC)
+    positions = fmutils.AverageStructure(universe.atoms).run().result
+    testing.assert_allclose(
+        fmutils.AverageStructure(universe.atoms, block_size=2,
+                                 n_workers=2).run().result,
+        positions,
+        rtol=1e-6,
+    )
+
+    average, std = fmutils.BondStats(universe).run().result
+    parallel = fmutils.BondStats(universe, block_size=2,
+                                 n_workers=2).run().result
+    testing.assert_allclose(parallel[0]["r_IJ"], average["r_IJ"])
+    testing.assert_allclose(parallel[1]["r_IJ"], std["r_IJ"], rtol=1e-6)
+
+
+def test_write_parallel_trajectory(tmpdir):
+    cg_universe = protein.Calpha(TPR, XTC)
+    for n_workers in (1, 2):
+        fmutils.write_charmm_files(
+            cg_universe,
+            outdir=tmpdir.join(str(n_workers)).strpath,
+            block_size=2,
+            n_workers=n_workers,
+            tmpdir=tmpdir.strpath)
+    serial, parallel = (tmpdir.join(_, "cg.dcd").read_binary()
+                        for _ in ("1", "2"))
+    assert serial == parallel
+
+
+def test_window_bond_stats():
+    universe = mda.Universe(TPR, XTC)
+    bonds = np.array([universe.bonds.bonds() for _ in universe.trajectory])
+    n_frames = bonds.shape[0]
+    windows = [(0, 0, n_frames // 2), (1, n_frames // 4, 3 * n_frames // 4),
+               (2, n_frames // 2, n_frames)]
+    stats = fmutils.WindowBondStats(universe, windows, block_size=3).run()
+    for name, start, stop in windows:
+        average, fluct = stats.result[name]
+        testing.assert_allclose(average["r_IJ"],
+                                bonds[start:stop].mean(axis=0))
+        testing.assert_allclose(
+            fluct["r_IJ"], bonds[start:stop].std(axis=0), rtol=1e-5)
+
+
+def test_window_targets(tmpdir):
+    cg_universe = protein.Calpha(TPR, XTC)
+    n_frames = cg_universe.trajectory.n_frames
+    windows = [("1", 0, n_frames // 2), ("2", n_frames // 2, n_frames)]
+    # Options of the coarse-grain files are not given to the IC writer.
+    directories = fmutils.write_window_targets(
+        cg_universe, windows, tmpdir.strpath, block_size=3, n_workers=1,
+        write_traj=False, charmm_version=41, extended=True, resid=True)
+    for name, _, _ in windows:
+        assert directories[name] == tmpdir.join(name).strpath
+        for filename in ("init.average.ic", "init.fluct.ic"):
+            assert tmpdir.join(name, filename).check(file=True)
+
+
+def test_strided_order():
+    for n_blocks in (1, 2, 5, 8, 13):
+        order = fmutils._strided_order(n_blocks)
+        assert sorted(order) == list(range(n_blocks))
+        assert order[:2] == [0, n_blocks // 2][:n_blocks]
+
+
+def test_adaptive_bond_stats():
+    universe = mda.Universe(TPR, XTC)
+    bonds = np.array([universe.bonds.bonds() for _ in universe.trajectory])
+    n_frames = bonds.shape[0]
+
+    stats = fmutils.BondStats(universe, block_size=2, tol=0.).run()
+    assert stats.frames_used == n_frames
+    assert np.isfinite(stats.error)
+    testing.assert_allclose(stats.result[0]["r_IJ"], bonds.mean(axis=0))
+    testing.assert_allclose(
+        stats.result[1]["r_IJ"], bonds.std(axis=0), rtol=1e-5)
+
+    stats = fmutils.BondStats(
+        universe, block_size=2, tol=np.inf, min_blocks=2).run()
+    order = fmutils._strided_order(-(-n_frames // 2))[:2]
+    used = np.concatenate([bonds[2 * _:2 * _ + 2] for _ in order])
+    assert stats.frames_used == used.shape[0]
+    testing.assert_allclose(stats.result[0]["r_IJ"], used.mean(axis=0))
+    testing.assert_allclose(
+        stats.result[1]["r_IJ"], used.std(axis=0), rtol=1e-5)
+
+    # The average structure and the windows use all of their frames.
+    with pytest.raises(ValueError):
+        fmutils.AverageStructure(universe.atoms, tol=0.1)
+    with pytest.raises(ValueError):
+        fmutils.WindowBondStats(universe, [(0, 0, n_frames)], tol=0.1)
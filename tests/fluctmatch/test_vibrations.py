@@ -0,0 +1,97 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.builtins import open
+
+import os
+
+import numpy as np
+import pytest
+from numpy import testing
+from fluctmatch.fluctmatch import vibrations
+
+
+def _write_vib(filename, frequencies, eigenvectors, masses):
+    with open(filename, mode="w") as vib:
+        vib.write("* NORMAL MODES\n*\n")
+        vib.write("{:8d}{:8d}\n".format(len(frequencies), masses.size))
+        for i in range(0, masses.size, 6):
+            vib.write("".join("{:12.5f}".format(_)
+                              for _ in masses[i:i + 6]) + "\n")
+        for i, (freq, vector) in enumerate(zip(frequencies, eigenvectors)):
+            vib.write("{:5d}{:12.6f}\n".format(i + 1, freq))
+            for j in range(0, vector.size, 6):
+                vib.write("".join("{:12.8f}".format(_)
+                                  for _ in vector[j:j + 6]) + "\n")
+
+
+def _modes(n_atoms=5, seed=3):
+    random = np.random.RandomState(seed)
+    frequencies = np.sort(random.uniform(-1., 100., 3 * n_atoms))
+    eigenvectors = np.linalg.qr(random.normal(size=(3 * n_atoms,
+                                                    3 * n_atoms)))[0].T
+    masses = random.uniform(10., 20., n_atoms)
+    return frequencies, eigenvectors, masses
+
+
+def test_read_vib(tmpdir):
+    frequencies, eigenvectors, masses = _modes()
+    filename = tmpdir.join("fluctmatch.vib").strpath
+    _write_vib(filename, frequencies, eigenvectors, masses)
+
+    freq, vectors, mass = vibrations.read_vib(filename, cache=False)
+    testing.assert_allclose(freq, frequencies, atol=1e-6)
+    testing.assert_allclose(vectors, eigenvectors, atol=1e-8)
+    testing.assert_allclose(mass, masses, atol=1e-5)
+    assert not os.path.exists(
+        vibrations.cache_files(filename)["eigenvectors"])
+
+    freq, vectors, _ = vibrations.read_vib(filename)
+    assert isinstance(vectors, np.memmap)
+    testing.assert_allclose(vectors, eigenvectors, atol=1e-8)
+    assert all(os.path.exists(_)
+               for _ in vibrations.cache_files(filename).values())
+
+    # The cache is read instead of the card file.
+    with open(filename, mode="w") as vib:
+        vib.write("* EMPTY\n")
+    os.utime(filename, (0, 0))
+    cached, vectors, _ = vibrations.read_vib(filename)
+    testing.assert_allclose(cached, freq)
+    assert vectors.shape == eigenvectors.shape
+
+
+def test_read_vib_truncated(tmpdir):
+    frequencies, eigenvectors, masses = _modes()
+    filename = tmpdir.join("fluctmatch.vib").strpath
+    _write_vib(filename, frequencies, eigenvectors[:, :-1], masses)
+    with pytest.raises(ValueError):
+        vibrations.read_vib(filename, cache=False)
+
+
+def test_truncated_cache(tmpdir):
+    frequencies, eigenvectors, masses = _modes()
+    filename = tmpdir.join("fluctmatch.vib").strpath
+    _write_vib(filename, frequencies, eigenvectors[:, :-1], masses)
+    with pytest.raises(ValueError):
+        vibrations.read_vib(filename)
+    assert tmpdir.listdir() == [tmpdir.join("fluctmatch.vib")]
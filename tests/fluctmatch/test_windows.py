@@ -0,0 +1,73 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import pytest
+from fluctmatch.fluctmatch import windows
+
+
+def test_half_overlapping():
+    virtual = windows.half_overlapping(1, 40, 20, "cg.dcd")
+    assert [(_.name, _.start, _.stop) for _ in virtual] == [
+        ("1", 0, 20),
+        ("2", 10, 30),
+        ("3", 20, 40),
+    ]
+    assert all(_.trajectory == "cg.dcd" for _ in virtual)
+
+
+def test_manifest(tmpdir):
+    virtual = windows.half_overlapping(1, 40, 20, "cg.dcd")
+    assert not windows.find_manifest(tmpdir.strpath)
+
+    filename = tmpdir.join(windows.MANIFEST).strpath
+    windows.write_manifest(filename, virtual)
+    manifest = windows.find_manifest(tmpdir.strpath)
+    assert list(manifest) == ["1", "2", "3"]
+    assert manifest["2"] == windows.Window("2", 10, 30,
+                                           tmpdir.join("cg.dcd").strpath)
+    with pytest.raises(ValueError):
+        windows.cg_trajectory(manifest["2"])
+
+    windows.write_manifest(
+        filename,
+        [_._replace(cg_trajectory="fluctmatch.dcd") for _ in virtual])
+    manifest = windows.find_manifest(tmpdir.strpath)
+    assert (windows.cg_trajectory(manifest["2"]) ==
+            tmpdir.join("fluctmatch.dcd").strpath)
+
+
+def test_time_frames():
+    # Windows of 'splittraj -b 1 -e 40 -w 20' in ps
+    virtual = windows.half_overlapping(1, 40, 20, "md.xtc")
+    frames = windows.time_frames(virtual, 0., 1.)
+    assert [(_.name, _.start, _.stop) for _ in frames] == [
+        ("1", 1, 21),
+        ("2", 11, 31),
+        ("3", 21, 41),
+    ]
+    frames = windows.time_frames(virtual, 0., 2.)
+    assert [(_.name, _.start, _.stop) for _ in frames] == [
+        ("1", 1, 11),
+        ("2", 6, 16),
+        ("3", 11, 21),
+    ]
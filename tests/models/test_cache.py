@@ -0,0 +1,101 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import os
+
+import numpy as np
+import pytest
+from numpy import testing
+from scipy import sparse
+from fluctmatch.models.cache import TrajectoryCache
+
+
+@pytest.fixture
+def files(tmpdir):
+    topology = tmpdir.join("md.tpr")
+    trajectory = tmpdir.join("md.xtc")
+    topology.write("topology")
+    trajectory.write("trajectory")
+    return topology.strpath, trajectory.strpath
+
+
+def _blocks(positions, n_frames=2):
+    boxes = np.ones((positions.shape[0], 6), dtype=np.float32)
+    for first in range(0, positions.shape[0], n_frames):
+        yield (positions[first:first + n_frames],
+               boxes[first:first + n_frames])
+
+
+def test_key(tmpdir, files):
+    weights = sparse.csr_matrix(np.eye(3))
+    mapping = dict(CA="name CA")
+    cache = TrajectoryCache(tmpdir.join("cache").strpath)
+    key = cache.key(files[0], files[1], mapping, weights)
+    assert key == cache.key(files[0], [files[1]], mapping, weights)
+    assert key != cache.key(files[0], files[1], mapping, weights, com=False)
+    assert key != cache.key(files[0], files[1], dict(CA="name C"), weights)
+    assert key != cache.key(files[0], files[1], mapping, 2 * weights)
+
+    stat = os.stat(files[1])
+    os.utime(files[1], (stat.st_atime, stat.st_mtime + 10))
+    assert key != cache.key(files[0], files[1], mapping, weights)
+
+
+def test_put_get(tmpdir):
+    cache = TrajectoryCache(tmpdir.join("cache").strpath)
+    positions = np.random.rand(5, 4, 3).astype(np.float32)
+    assert cache.get("key") is None
+
+    blocks = cache.put("key", _blocks(positions), 5, 4)
+    next(blocks)
+    blocks.close()
+    assert cache.get("key") is None
+    assert not os.listdir(cache.directory)
+
+    stored = np.concatenate(
+        [_[0] for _ in cache.put("key", _blocks(positions), 5, 4)])
+    testing.assert_array_equal(stored, positions)
+    cached, boxes = cache.get("key")
+    assert isinstance(cached, np.memmap)
+    testing.assert_array_equal(cached, positions)
+    testing.assert_array_equal(boxes, np.ones((5, 6)))
+
+
+def test_evict(tmpdir):
+    positions = np.zeros((4, 10, 3), dtype=np.float32)
+    cache = TrajectoryCache(tmpdir.strpath)
+    for key in ("a", "b", "c"):
+        list(cache.put(key, _blocks(positions), 4, 10))
+    cache.max_size = cache.size
+    stat = os.stat(cache._filenames("a")["positions"])
+    for key, age in zip("abc", (10, 30, 20)):
+        for filename in cache._filenames(key).values():
+            os.utime(filename, (stat.st_atime, stat.st_mtime - age))
+    cache.get("a")
+
+    list(cache.put("d", _blocks(positions), 4, 10))
+    assert [_[0] for _ in cache.entries()] == ["c", "a", "d"]
+    assert cache.size <= cache.max_size
+
+    cache.clear()
+    assert cache.size == 0
@@ -0,0 +1,152 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding: utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
+#
+# fluctmatch --- https://github.com/tclick/python-fluctmatch
+# Copyright (c) 2013-2017 The fluctmatch Development Team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# Released under the New BSD license.
+#
+# Please cite your use of fluctmatch in published work:
+#
+# Timothy H. Click, Nixon Raj, and Jhih-Wei Chu.
+# Calculation of Enzyme Fluctuograms from All-Atom Molecular Dynamics
+# Simulation. Meth Enzymology. 578 (2016), 327-342,
+# doi:10.1016/bs.mie.2016.05.024.
+#
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+from future.utils import native_str
+
+import itertools
+
+import numpy as np
+import MDAnalysis as mda
+from numpy import testing
+from fluctmatch.models import protein
+from fluctmatch.models import trajectory
+from fluctmatch.models.cache import TrajectoryCache
+from tests.datafiles import (
+    PDB_prot,
+    TPR,
+    XTC,
+)
+
+
+def test_trajectory_positions():
+    cg_universe = protein.Calpha(TPR, XTC)
+    beads = cg_universe.trajectory._beads
+    for _ in cg_universe.trajectory:
+        testing.assert_allclose(
+            cg_universe.atoms.positions,
+            [bead.center_of_mass() for bead in beads],
+            rtol=1e-5,
+            err_msg=native_str("The coordinates do not match."),
+        )
+
+
+def test_trajectory_weights():
+    cg_universe = protein.Calpha(TPR, XTC, com=False)
+    weights = cg_universe.trajectory._position_weights
+    testing.assert_allclose(
+        np.asarray(weights.sum(axis=1)).ravel(),
+        np.ones(cg_universe.atoms.n_atoms),
+        err_msg=native_str("The weights of a bead do not sum to one."),
+    )
+    testing.assert_allclose(
+        cg_universe.atoms.positions,
+        [bead.center_of_geometry() for bead in cg_universe.trajectory._beads],
+        rtol=1e-5,
+        err_msg=native_str("The coordinates do not match."),
+    )
+
+
+def test_iter_blocks():
+    cg_universe = protein.Calpha(TPR, XTC)
+    positions = np.array(
+        [cg_universe.atoms.positions for _ in cg_universe.trajectory])
+    blocks = list(cg_universe.trajectory.iter_blocks(n_frames=3))
+    assert all(_.shape[1:] == positions.shape[1:] for _ in blocks)
+    testing.assert_array_equal(
+        np.concatenate(blocks),
+        positions,
+        err_msg=native_str("The coordinates do not match."),
+    )
+
+    blocks = list(cg_universe.trajectory.iter_blocks(n_frames=2, step=2))
+    testing.assert_array_equal(np.concatenate(blocks), positions[::2])
+
+
+def test_iter_blocks_parallel():
+    cg_universe = protein.Calpha(TPR, XTC)
+    trajectory = cg_universe.trajectory
+    positions, boxes = zip(*trajectory.iter_blocks(n_frames=2,
+                                                   dimensions=True))
+    parallel = list(trajectory.iter_blocks(n_frames=2, dimensions=True,
+                                           n_workers=2))
+    testing.assert_array_equal(np.concatenate([_[0] for _ in parallel]),
+                               np.concatenate(positions))
+    testing.assert_array_equal(np.concatenate([_[1] for _ in parallel]),
+                               np.concatenate(boxes))
+
+
+def test_cached_trajectory(tmpdir):
+    cache = TrajectoryCache(tmpdir.strpath)
+    cg_universe = protein.Calpha(TPR, XTC, cache=cache)
+    positions = np.concatenate(list(cg_universe.trajectory.iter_blocks(2)))
+    assert len(cache.entries()) == 1
+
+    cg_universe = protein.Calpha(TPR, XTC, cache=cache)
+    assert cg_universe.trajectory._cached is not None
+    testing.assert_array_equal(
+        np.concatenate(list(cg_universe.trajectory.iter_blocks(2))),
+        positions)
+    for ts in cg_universe.trajectory:
+        testing.assert_array_equal(ts.positions, positions[ts.frame])
+
+
+def test_cached_frames(tmpdir, monkeypatch):
+    cache = TrajectoryCache(tmpdir.strpath)
+    cg_universe = protein.Calpha(TPR, XTC, cache=cache)
+    positions, boxes = (np.concatenate(_) for _ in zip(
+        *cg_universe.trajectory.iter_blocks(2, dimensions=True)))
+
+    # The atomistic trajectory is not read once the cache is warm.
+    cg_universe = protein.Calpha(TPR, XTC, cache=cache)
+    atomistic = cg_universe.trajectory._t
+    frame = atomistic.ts.frame
+
+    def _fail(*args):
+        raise AssertionError("The atomistic trajectory was read.")
+
+    for name in ("next", "_read_next_timestep", "_read_frame", "rewind"):
+        monkeypatch.setattr(atomistic, name, _fail)
+    frames = [ts.frame for ts in cg_universe.trajectory]
+    assert frames == list(range(positions.shape[0]))
+    ts = cg_universe.trajectory[3]
+    testing.assert_array_equal(ts.positions, positions[3])
+    testing.assert_allclose(ts.dimensions, boxes[3])
+    assert atomistic.ts.frame == frame
+
+
+def test_select_beads():
+    aa_universe = mda.Universe(PDB_prot)
+    mapping = protein.Polar(PDB_prot)._mapping
+    beads = []
+    for i, (res, (name, selection)) in enumerate(
+            itertools.product(aa_universe.residues, mapping.items())):
+        if isinstance(selection, dict):
+            selection = selection.get(res.resname,
+                                      "hsidechain and not name H*")
+        bead = res.atoms.select_atoms(selection)
+        if bead:
+            beads.append((i, bead.indices))
+
+    ids, indices, starts = trajectory.select_beads(aa_universe.atoms, mapping)
+    testing.assert_equal(ids, [_[0] for _ in beads])
+    testing.assert_equal(
+        np.split(indices, starts[1:]), [_[1] for _ in beads])
@@ -22,6 +22,7 @@ from __future__ import (
 )
 from future.utils import native_str
 
+import numpy as np
 from numpy import testing
 from fluctmatch.models import (
     protein,
@@ -34,7 +35,7 @@ from fluctmatch.models.base import (
     rename_universe,
 )
 from fluctmatch.models.selection import *
-from tests.datafiles import (PDB_prot, TIP3P, IONS)
+from tests.datafiles import (PDB_prot, TIP3P, IONS, TPR, XTC)
 
 
 def test_universe():
@@ -85,6 +86,24 @@ def test_merge_topology():
     assert cg_universe.dihedrals == prot.universe.dihedrals
 
 
+def test_merge_trajectory():
+    calpha = protein.Calpha(TPR, XTC)
+    caside = protein.Caside(TPR, XTC)
+
+    cg_universe = Merge(calpha, caside)
+    for ts in cg_universe.trajectory:
+        positions = np.concatenate(
+            (calpha.atoms.positions, caside.atoms.positions), axis=0)
+        testing.assert_allclose(
+            ts.positions,
+            positions,
+            err_msg=native_str("Coordinates don't match."),
+        )
+    blocks = np.concatenate(list(cg_universe.trajectory.iter_blocks(2)))
+    testing.assert_allclose(blocks[-1], positions)
+    assert blocks.shape[0] == cg_universe.trajectory.n_frames
+
+
 def test_rename_universe():
     cg_universe = protein.Ncsc(PDB_prot)
     rename_universe(cg_universe)